@@ -1,11 +1,22 @@
 import os
+import time
 import logging
-from flask import Flask
+from flask import Flask, Response, g, render_template, request, session
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, configure_mappers
 from werkzeug.middleware.proxy_fix import ProxyFix
-from datetime import datetime
+
+from config import Config
+from utils.database import (ReplicaPool, RoutingSession, WRITER_BIND, add_missing_columns, configure_sqlite_engine,
+                            is_sqlite_file, replica_binds, sqlite_writer_bind)
+from utils.async_reads import AsyncReader
+from utils.fragment_cache import FragmentCache, FragmentCacheExtension
+from utils.profiling import MemoryTracer, RequestProfiler
+from utils.rate_limit import LatencyMonitor, StaleCache, TokenBucketStore, parse_rate_limits
+from signals import posts_changed, posts_published
+from services import counter_service, tag_service
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -13,43 +24,210 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
-# Initialize Flask app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "your-secret-key-here")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
-
-# Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///uzbek_news.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-}
-
 # Initialize extensions
-db = SQLAlchemy(model_class=Base)
-db.init_app(app)
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'admin_login'
+login_manager.login_view = 'main.admin_login'
 login_manager.login_message = 'Iltimos, tizimga kiring'
 
-# Import models and routes
+# Import models
 from models.user import User
 from models.post import Post
+from models.translation import TranslationMemory
+from models.gemini_usage import GeminiCall, GeminiUsageDaily
+from models.trending import TrendingScore
+from models.analytics import ViewStatHourly, ViewStatDaily, ViewLogSegment
+from models.post_signature import PostSignature
+from models.post_counter import PostCounter
+from models.tag import Tag
+from models.telegram_delivery import TelegramDelivery
+from models.archived_post import ArchivedPost
+
+# Keep post tags in step with the keywords field
+tag_service.watch_keywords(RoutingSession)
 
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-# Import routes
-from routes import *
+def create_app(config_overrides=None):
+    """Create and configure a Flask application instance"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.secret_key = os.environ.get("SESSION_SECRET", "your-secret-key-here")
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+    # Configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///uzbek_news.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+    }
+    if config_overrides:
+        app.config.update(config_overrides)
+
+    # SQLite production profile: WAL + pragmas and a single writer connection
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    sqlite_profile = app.config['SQLITE_WAL'] and is_sqlite_file(database_uri)
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    if sqlite_profile:
+        binds[WRITER_BIND] = sqlite_writer_bind(database_uri, app.config)
+
+    # Read replicas for public read-only views
+    replicas = replica_binds(app.config['DATABASE_REPLICA_URLS'])
+    binds.update(replicas)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            if app.config['SQLITE_WAL'] and is_sqlite_file(str(engine.url)):
+                configure_sqlite_engine(engine, app.config)
+        if replicas:
+            pool = ReplicaPool(replicas, app.config['REPLICA_HEALTH_INTERVAL'],
+                               app.config['REPLICA_RETRY_AFTER'])
+            pool.watch(db.engines)
+            app.extensions['read_replicas'] = pool
+        if app.config['ASYNC_READS']:
+            url = app.config['ASYNC_DATABASE_URL'] or db.engine.url.render_as_string(hide_password=False)
+            reader = AsyncReader.create(url, app.config['ASYNC_POOL_SIZE'], app.config['ASYNC_READ_TIMEOUT'],
+                                        replicas)
+            if reader:
+                app.extensions['async_reads'] = reader
+    login_manager.init_app(app)
+    init_template_caches(app)
+    init_rate_limiting(app)
+    init_static_export(app)
+    init_profiling(app)
+
+    # Register routes and CLI commands
+    from routes import bp
+    from commands import register_commands
+    app.register_blueprint(bp)
+    register_commands(app)
+
+    # Create tables once per process tree. Under a pre-fork server this runs in
+    # the master (preload_app) and workers inherit the result.
+    if app.config['DB_AUTO_CREATE']:
+        with app.app_context():
+            init_database()
+
+    return app
+
+def init_template_caches(app):
+    """Set up the on-disk bytecode cache and the {% cache %} fragment cache"""
+    directory = app.config['JINJA_BYTECODE_CACHE_DIR']
+    if directory:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        except OSError as e:
+            logging.warning(f"Jinja bytecode cache disabled: {e}")
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config['FRAGMENT_CACHE_ENABLED']:
+        cache = FragmentCache(app.config['FRAGMENT_CACHE_TTL'], app.config['FRAGMENT_CACHE_STAMP'])
+        app.jinja_env.fragment_cache = cache
+        # Shared sidebars list posts, so any publish or admin change drops them
+        posts_published.connect(cache.invalidate, sender=app, weak=False)
+        posts_changed.connect(cache.invalidate, sender=app, weak=False)
+
+def init_profiling(app):
+    """Hooks for the admin-controlled request profiler; a cached stat() per second when idle"""
+    directory = app.config['PROFILING_DIR']
+    profiler = RequestProfiler(directory, sample_interval=app.config['PROFILE_SAMPLE_INTERVAL_MS'] / 1000)
+    app.extensions['profiler'] = profiler
+    app.extensions['memory_tracer'] = MemoryTracer(directory)
+
+    @app.before_request
+    def start_profile():
+        profiler.begin_request(request.endpoint)
+
+    @app.teardown_request
+    def finish_profile(exception=None):
+        profiler.end_request()
 
-# Create tables
-with app.app_context():
+def init_static_export(app):
+    """Re-render exported pages of posts as they are published, edited or removed"""
+    from services.static_export import StaticExporter
+
+    if not app.config['STATIC_EXPORT_ENABLED']:
+        return
+    exporter = StaticExporter(app, app.config['STATIC_EXPORT_DIR'], app.config['SITE_URL'])
+    app.extensions['static_export'] = exporter
+    # Connected after the fragment cache, so its shared blocks are dropped first
+    posts_published.connect(exporter.on_posts_changed, sender=app, weak=False)
+    posts_changed.connect(exporter.on_posts_changed, sender=app, weak=False)
+
+def init_rate_limiting(app):
+    """Per-client token buckets and load shedding for the expensive public pages"""
+    from flask_login import current_user
+    from utils.helpers import get_current_language
+
+    limits = parse_rate_limits(app.config['RATE_LIMITS'])
+    if not limits or not (app.config['RATE_LIMIT_ENABLED'] or app.config['LOAD_SHED_ENABLED']):
+        return
+    store = TokenBucketStore(app.config['RATE_LIMIT_STORE']) if app.config['RATE_LIMIT_ENABLED'] else None
+    monitor = stale = None
+    if app.config['LOAD_SHED_ENABLED']:
+        monitor = LatencyMonitor(app.config['LOAD_SHED_LATENCY_MS'])
+        stale = StaleCache(app.config['LOAD_SHED_CACHE_ENTRIES'])
+    app.extensions['load_monitor'] = monitor
+
+    def throttled(endpoint):
+        return endpoint in limits and request.method == 'GET' and not current_user.is_authenticated
+
+    def monitored(endpoint):
+        """Public read-only pages; only their response time feeds the monitor"""
+        view = app.view_functions.get(endpoint)
+        return throttled(endpoint) and getattr(view, 'use_read_replica', False)
+
+    def too_many_requests(retry_after):
+        response = Response(render_template('errors/429.html', config=Config), 429)
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    @app.before_request
+    def throttle():
+        if not throttled(request.endpoint):
+            return None
+        if store is not None:
+            capacity, rate = limits[request.endpoint]
+            # ProxyFix has already put the client address from X-Forwarded-For here
+            allowed, retry_after = store.take(f"{request.endpoint}:{request.remote_addr}", capacity, rate)
+            if not allowed:
+                return too_many_requests(retry_after)
+        if monitor is not None and monitor.overloaded():
+            cached = stale.get(f"{get_current_language()}:{request.full_path}")
+            if cached is not None:
+                body, mimetype = cached
+                return Response(body, mimetype=mimetype, headers={'X-Cache': 'stale'})
+            return too_many_requests(monitor.window)
+        if monitor is not None and monitored(request.endpoint):
+            g.load_timer = time.perf_counter()
+        return None
+
+    @app.after_request
+    def remember_response(response):
+        started = g.pop('load_timer', None)
+        if started is None:
+            return response
+        monitor.record((time.perf_counter() - started) * 1000)
+        # Flashes rendered into the page or cookies set by it belong to this visitor
+        if (response.status_code == 200 and not response.is_streamed and 'X-Cache' not in response.headers
+                and not session.modified and '_flashes' not in session and 'Set-Cookie' not in response.headers):
+            stale.set(f"{get_current_language()}:{request.full_path}", response.get_data(), response.mimetype)
+        return response
+
+def init_database():
+    """Create tables and the default admin user"""
     db.create_all()
-    
+    add_missing_columns(db)
+    counter_service.install_triggers(db)
+    tag_service.install_triggers(db)
+
     # Create default admin user if not exists
     admin = User.query.filter_by(username='Akramjon').first()
     if not admin:
@@ -62,5 +240,36 @@ with app.app_context():
         db.session.commit()
         logging.info("Default admin user created: Akramjon/Gisobot201415")
 
+def warm_up(app):
+    """Compile templates and prime ORM/SQL caches before workers are forked"""
+    with app.app_context():
+        configure_mappers()
+        for name in app.jinja_env.list_templates(extensions=['html']):
+            try:
+                app.jinja_env.get_template(name)
+            except Exception as e:
+                logging.warning(f"Failed to precompile template {name}: {e}")
+
+    # Render the home page once so its queries and template are hot
+    with app.test_client() as client:
+        response = client.get('/')
+        logging.info(f"Warm-up request finished with status {response.status_code}")
+
+    dispose_engines(app, close=True)
+
+def dispose_engines(app, close=False):
+    """Drop pooled connections inherited from a parent process
+
+    Call with ``close=False`` in a freshly forked worker so the parent's
+    sockets/file handles are left untouched and new connections are opened,
+    and with ``close=True`` when this process is done with them, which also
+    shuts down the async read engines it started.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+    if close and 'async_reads' in app.extensions:
+        app.extensions['async_reads'].dispose()
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,42 @@
+"""Public pages with the sync session vs the async read path (ASYNC_READS=1)
+
+Needs the async driver (aiosqlite + greenlet, or asyncpg with --database).
+The gain grows with per-query latency, so SQLite on local disk is the worst
+case and a networked PostgreSQL the best:
+
+    python -m benchmarks.bench_async_reads --posts 2000 --concurrency 64
+    python -m benchmarks.bench_async_reads --database postgresql://localhost/uzbeknews
+"""
+import argparse
+from urllib.parse import quote
+
+from benchmarks.common import (make_database, sample_paths, start_gunicorn, stop_process,
+                               run_load, print_result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--database', help='existing database URL instead of a seeded SQLite file')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    url = args.database or make_database(args.posts)
+    paths = sample_paths(url) + [f'/qidiruv?q={quote("yangilik")}', f'/viloyat/{quote("Toshkent")}']
+    print(f"Database: {url}, {len(paths)} distinct paths, concurrency {args.concurrency}")
+
+    for label, enabled in (('sync session', '0'), ('async reads', '1')):
+        proc, port = start_gunicorn(url, args.workers, threads=args.threads, extra_env={'ASYNC_READS': enabled})
+        try:
+            run_load(port, paths, concurrency=args.concurrency, duration=2.0)  # warm-up
+            result = run_load(port, paths, concurrency=args.concurrency, duration=args.duration)
+        finally:
+            stop_process(proc)
+        print_result(label, result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Batch generation and Telegram distribution against the local fakes
+
+No credentials are needed: Gemini and Telegram are replaced by the seeded
+stand-ins from services/fakes.py, so runs with the same flags are repeatable.
+
+    python -m benchmarks.bench_generation --topics 30 --concurrency 3 --rate-limit 0.05 --server-errors 0.05
+"""
+import time
+import argparse
+
+from benchmarks.common import make_database, create_bench_app, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topics', type=int, default=30)
+    parser.add_argument('--concurrency', type=int, default=3)
+    parser.add_argument('--rpm', type=int, default=600)
+    parser.add_argument('--latency-ms', type=float, default=800, help='median Gemini latency')
+    parser.add_argument('--sigma', type=float, default=0.5, help='log-normal sigma of the latency')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='share of Gemini calls failing with 429')
+    parser.add_argument('--server-errors', type=float, default=0.0, help='share of Gemini calls failing with 503')
+    parser.add_argument('--malformed', type=float, default=0.0, help='share of Gemini replies with broken JSON')
+    parser.add_argument('--posts', type=int, default=40, help='posts to announce on Telegram')
+    parser.add_argument('--telegram-latency-ms', type=float, default=150)
+    parser.add_argument('--retry-after', type=float, default=0.0, help='share of Telegram sends failing with RetryAfter')
+    parser.add_argument('--channels', type=int, default=1, help='Telegram channels, alternating Uzbek and Russian')
+    parser.add_argument('--telegram-concurrency', type=int, default=8)
+    parser.add_argument('--chat-interval', type=float, default=0.0, help='seconds between messages to one chat')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--recordings', help='JSON-lines file written with GEMINI_RECORD_PATH')
+    args = parser.parse_args()
+
+    url = make_database(args.posts)
+    app = create_bench_app(url)
+
+    from services.fakes import FakeGeminiClient, FakeTelegramBot, LatencyProfile, load_recordings
+    from services.gemini_service import GeminiService
+    from services.telegram_service import TelegramService
+    from services.telegram_fanout import Channel, ChannelRegistry, FanoutSender
+    from services.batch_service import BatchGenerator, summarize_results
+    from services.scheduler_service import PublishScheduler
+    from models.post import Post
+    from models.telegram_delivery import TelegramDelivery
+    from config import Config
+
+    client = FakeGeminiClient(
+        recordings=load_recordings(args.recordings) if args.recordings else None,
+        latency=LatencyProfile(args.latency_ms, args.sigma),
+        rate_limit_rate=args.rate_limit,
+        server_error_rate=args.server_errors,
+        malformed_rate=args.malformed,
+        seed=args.seed,
+    )
+    gemini = GeminiService(client=client)
+    generator = BatchGenerator(gemini, concurrency=args.concurrency, rpm=args.rpm, tpm=10_000_000, app=app)
+    items = [{'topic': f"Mavzu {i}", 'category': Config.UZBEK_CATEGORIES[i % len(Config.UZBEK_CATEGORIES)],
+              'region': None} for i in range(args.topics)]
+
+    started = time.perf_counter()
+    results = generator.run(items)
+    summary = summarize_results(results, time.perf_counter() - started)
+    latencies = sorted(result['latency_ms'] for result in results)
+    print(f"Generation: {summary['succeeded']}/{summary['total']} ok in {summary['elapsed_s']} s "
+          f"({summary['total'] / max(summary['elapsed_s'], 0.001):.2f} articles/s), "
+          f"p50 {percentile(latencies, 50)} ms, p95 {summary['p95_ms']} ms, p99 {percentile(latencies, 99)} ms")
+    metrics = gemini.metrics()
+    print(f"Gemini calls: {dict(client.calls)}; retries spent {metrics['retries_spent']}, "
+          f"denied {metrics['retries_denied']}, breaker {metrics['breaker_state']}")
+
+    bot = FakeTelegramBot(latency=LatencyProfile(args.telegram_latency_ms, 0.4),
+                          retry_after_rate=args.retry_after, seed=args.seed)
+    telegram = TelegramService(bot=bot)
+    channels = [Channel(f'@fake_channel_{n}', language='ru' if n % 2 else 'uz') for n in range(args.channels)]
+    fanout = FanoutSender(telegram, ChannelRegistry(channels), concurrency=args.telegram_concurrency,
+                          chat_interval=args.chat_interval)
+    scheduler = PublishScheduler(app, fanout, digest_min_posts=Config.TELEGRAM_DIGEST_MIN_POSTS,
+                                 digest_max_posts=Config.TELEGRAM_DIGEST_MAX_POSTS)
+    with app.app_context():
+        posts = Post.query.filter_by(published=True).limit(args.posts).all()
+        for post in posts:
+            post.telegram_posted = False
+        TelegramDelivery.query.delete()
+        started = time.perf_counter()
+        scheduler.announce(posts)
+        elapsed = time.perf_counter() - started
+        announced = sum(1 for post in posts if post.telegram_posted)
+    print(f"Telegram: {announced}/{len(posts)} posts announced in {len(bot.sent)} messages "
+          f"in {elapsed:.2f} s; calls {dict(bot.calls)}")
+
+
+if __name__ == '__main__':
+    main()
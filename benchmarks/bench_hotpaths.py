@@ -0,0 +1,226 @@
+"""Micro-benchmarks of the helpers, formatters and parsers called many times per request
+
+Each case runs on generated Uzbek and Russian article bodies of three sizes.
+A case is calibrated to run for at least --min-time per round and timed for
+--rounds rounds, like pytest-benchmark; results are compared with the
+baselines in benchmarks/baselines/hotpaths.json and the run exits with
+status 1 when a case got slower than the threshold allows:
+
+    python -m benchmarks.bench_hotpaths
+    python -m benchmarks.bench_hotpaths -k excerpt --rounds 50
+    python -m benchmarks.bench_hotpaths --save    # store this machine's numbers as the baselines
+
+Baselines are only meaningful on the machine and Python they were saved
+with; save them before an optimization and compare after it.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from benchmarks.common import ROOT
+
+BASELINES = os.path.join(ROOT, 'benchmarks', 'baselines', 'hotpaths.json')
+
+# Paragraphs per article size
+SIZES = {'short': 3, 'medium': 10, 'long': 40}
+
+SENTENCES_UZ = [
+    "O'zbekiston Respublikasi Prezidenti bugun Toshkentda xorijiy investorlar bilan uchrashuv o'tkazdi.",
+    "Uchrashuvda energetika, transport va raqamli iqtisodiyot sohalaridagi qo'shma loyihalar muhokama qilindi.",
+    "Mutaxassislarning fikricha, bu tashabbuslar mintaqa iqtisodiyotiga ijobiy ta'sir ko'rsatadi.",
+    "Samarqand viloyatida yangi sanoat zonasi ishga tushirilib, 1 200 dan ortiq ish o'rni yaratildi.",
+    "Ta'lim vazirligi maktablarda informatika darslarini kengaytirish rejasini e'lon qildi.",
+    "Farg'ona vodiysida paxta hosilini yig'ish ishlari rejadagidan ikki hafta oldin yakunlandi.",
+    "Markaziy bank asosiy stavkani 14 foiz darajasida saqlab qolish to'g'risida qaror qabul qildi.",
+    "Sport yangiliklari: O'zbekiston terma jamoasi Osiyo kubogining keyingi bosqichiga yo'l oldi.",
+    "Sog'liqni saqlash vazirligi qishloq joylarida yangi poliklinikalar qurilishini boshladi.",
+    "Buxoro shahrida xalqaro hunarmandlar festivali bo'lib o'tdi va unda 30 dan ortiq davlat ishtirok etdi.",
+]
+
+SENTENCES_RU = [
+    "Президент Республики Узбекистан сегодня провёл в Ташкенте встречу с иностранными инвесторами.",
+    "На встрече обсуждались совместные проекты в энергетике, транспорте и цифровой экономике.",
+    "По мнению экспертов, эти инициативы положительно скажутся на экономике региона.",
+    "В Самаркандской области запущена новая промышленная зона, создано более 1 200 рабочих мест.",
+    "Министерство образования объявило о расширении уроков информатики в школах.",
+    "В Ферганской долине сбор хлопка завершился на две недели раньше запланированного срока.",
+    "Центральный банк принял решение сохранить основную ставку на уровне 14 процентов.",
+    "Новости спорта: сборная Узбекистана вышла в следующий этап Кубка Азии.",
+    "Министерство здравоохранения начало строительство новых поликлиник в сельской местности.",
+    "В Бухаре прошёл международный фестиваль ремесленников с участием более 30 стран.",
+]
+
+
+def make_article(sentences, paragraphs, rng):
+    """HTML body of `paragraphs` paragraphs, as stored in posts.content_uz/content_ru"""
+    body = []
+    for _ in range(paragraphs):
+        chosen = rng.sample(sentences, rng.randint(3, 6))
+        chosen[0] = f"<strong>{chosen[0]}</strong>"
+        body.append(f"<p>{' '.join(chosen)}</p>")
+    return '\n'.join(body)
+
+
+def gemini_reply(content_uz, content_ru):
+    """A structured article reply as GeminiService receives it"""
+    return json.dumps({
+        'title_uz': "Toshkentda xorijiy investorlar bilan uchrashuv bo'lib o'tdi",
+        'title_ru': "В Ташкенте прошла встреча с иностранными инвесторами",
+        'content_uz': content_uz,
+        'content_ru': content_ru,
+        'telegram_uz': content_uz[:300],
+        'meta_title': "Investorlar bilan uchrashuv",
+        'meta_description': content_uz[:150],
+        'keywords': "investitsiya, toshkent, iqtisodiyot",
+    }, ensure_ascii=False, indent=2)
+
+
+def build_cases():
+    """[(name, callable)] for every hot path and article size"""
+    from utils.helpers import (UzbekTextProcessor, calculate_reading_time, create_excerpt, format_uzbek_date,
+                               generate_meta_description)
+    from services.gemini_service import GeminiService, parse_json_response
+    from services.telegram_service import TelegramService
+
+    rng = random.Random(42)
+    processor = UzbekTextProcessor()
+    telegram = TelegramService(bot=SimpleNamespace())
+    cases = [
+        ('format_uzbek_date[naive]', lambda: format_uzbek_date(datetime(2024, 5, 17, 9, 30))),
+        ('format_uzbek_date[aware]', lambda: format_uzbek_date(datetime(2024, 5, 17, 4, 30, tzinfo=timezone.utc))),
+    ]
+    for size, paragraphs in SIZES.items():
+        content_uz = make_article(SENTENCES_UZ, paragraphs, rng)
+        content_ru = make_article(SENTENCES_RU, paragraphs, rng)
+        plain_uz = content_uz.replace('<p>', '').replace('</p>', '')
+        post = SimpleNamespace(title_uz="Toshkentda investorlar bilan uchrashuv", content_uz=content_uz,
+                               category="Iqtisodiyot", get_absolute_url=lambda: '/yangilik/toshkent-investorlar')
+        reply = gemini_reply(content_uz, content_ru)
+        fenced = f"```json\n{reply}\n```"
+        wrapped = f"Mana so'ralgan maqola:\n{reply}\nQo'shimcha savollar bo'lsa, yozing."
+        streamed = reply[:len(reply) * 2 // 3]
+        cases += [
+            (f'create_excerpt[{size}-uz]', lambda c=content_uz: create_excerpt(c, 150)),
+            (f'create_excerpt[{size}-ru]', lambda c=content_ru: create_excerpt(c, 150)),
+            (f'generate_meta_description[{size}-uz]', lambda c=content_uz: generate_meta_description(c)),
+            (f'generate_meta_description[{size}-ru]', lambda c=content_ru: generate_meta_description(c)),
+            (f'calculate_reading_time[{size}-uz]', lambda c=content_uz: calculate_reading_time(c)),
+            (f'extract_keywords[{size}-uz]', lambda c=plain_uz: processor.extract_keywords(c)),
+            (f'telegram_format_message[{size}]', lambda p=post: telegram._format_message(p, 'https://uzbeknews.uz')),
+            (f'parse_json_response[{size}-plain]', lambda r=reply: parse_json_response(r)),
+            (f'parse_json_response[{size}-fenced]', lambda r=fenced: parse_json_response(r)),
+            (f'parse_json_response[{size}-prose]', lambda r=wrapped: parse_json_response(r)),
+            (f'extract_partial_field[{size}]',
+             lambda r=streamed: GeminiService.extract_partial_field(r, 'content_ru')),
+        ]
+    return cases
+
+
+def measure(func, rounds, min_time):
+    """Per-call timings in microseconds, one per round"""
+    func()  # warm-up
+    number = 1
+    while True:
+        elapsed = time_calls(func, number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.2))
+    timings = [time_calls(func, number) / number * 1e6 for _ in range(rounds)]
+    return {
+        'min_us': min(timings),
+        'median_us': statistics.median(timings),
+        'mean_us': statistics.fmean(timings),
+        'stddev_us': statistics.stdev(timings) if rounds > 1 else 0.0,
+        'rounds': rounds,
+        'iterations': number,
+    }
+
+
+def time_calls(func, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+
+def load_baselines(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baselines(path, results, previous):
+    merged = dict((previous or {}).get('results', {}))
+    merged.update({name: {'min_us': round(stats['min_us'], 3), 'median_us': round(stats['median_us'], 3)}
+                   for name, stats in results.items()})
+    data = {
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}",
+        'saved_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'results': dict(sorted(merged.items())),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='pattern', default='', help='only run cases whose name contains this')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--min-time', type=float, default=0.005, help='seconds per round')
+    parser.add_argument('--stat', choices=('min', 'median'), default='min', help='statistic compared with the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown against the baseline, 0.25 = 25%%')
+    parser.add_argument('--baselines', default=BASELINES)
+    parser.add_argument('--save', action='store_true', help='store the results as the new baselines')
+    args = parser.parse_args()
+
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    cases = [(name, func) for name, func in build_cases() if args.pattern in name]
+    if not cases:
+        parser.error(f"No case matches {args.pattern!r}")
+    baselines = load_baselines(args.baselines)
+    known = (baselines or {}).get('results', {})
+    if baselines and baselines.get('python') != platform.python_version():
+        print(f"Baselines were saved with Python {baselines.get('python')} on {baselines.get('machine')}; "
+              f"differences may not be regressions")
+
+    key = f'{args.stat}_us'
+    results, regressions = {}, []
+    print(f"{'case':<40} {'min':>10} {'median':>10} {'ops/s':>11}  {'baseline':>10} {'change':>8}")
+    for name, func in cases:
+        stats = results[name] = measure(func, args.rounds, args.min_time)
+        line = (f"{name:<40} {stats['min_us']:>8.2f}us {stats['median_us']:>8.2f}us "
+                f"{1e6 / stats['median_us']:>11,.0f}")
+        baseline = known.get(name, {}).get(key)
+        if baseline:
+            change = stats[key] / baseline - 1
+            regressed = change > args.threshold
+            line += f"  {baseline:>8.2f}us {change:>+7.1%}{'  SLOWER' if regressed else ''}"
+            if regressed:
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        save_baselines(args.baselines, results, baselines)
+        print(f"Saved {len(results)} baselines to {os.path.relpath(args.baselines, ROOT)}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%} ({args.stat}): "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Read throughput on SQLite while view-count writes are happening
+
+Compares the default rollback-journal setup with the production profile
+(WAL, pragmas, serialized writer connection):
+
+    python -m benchmarks.bench_sqlite_concurrency --workers 4 --duration 15
+
+Readers request the home page and category listings; writers request
+article pages, each of which commits a view-count increment. The server
+runs with VIEW_LOG_ENABLED=0 so views go to posts.views directly instead
+of the view log, and with load shedding off so no article page is
+answered from the stale cache without its write.
+"""
+import argparse
+import threading
+from urllib.parse import quote
+
+from benchmarks.common import (make_database, sample_paths, start_gunicorn, stop_process,
+                               run_load, print_result)
+
+
+def run_mixed(port, read_paths, write_paths, readers, writers, duration):
+    results = {}
+
+    def load(name, paths, concurrency):
+        results[name] = run_load(port, paths, concurrency=concurrency, duration=duration)
+
+    threads = [
+        threading.Thread(target=load, args=('read', read_paths, readers)),
+        threading.Thread(target=load, args=('write', write_paths, writers)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=24)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    for label, wal in (('rollback journal', '0'), ('WAL profile', '1')):
+        url = make_database(args.posts, SQLITE_WAL=wal == '1')
+        paths = sample_paths(url)
+        write_paths = [path for path in paths if path.startswith('/yangilik/')]
+        read_paths = [path for path in paths if not path.startswith('/yangilik/')]
+        read_paths += [f'/kategoriya/{quote("Sport")}?page={page}' for page in range(1, 4)]
+
+        env = {'SQLITE_WAL': wal, 'VIEW_LOG_ENABLED': '0', 'LOAD_SHED_ENABLED': '0'}
+        proc, port = start_gunicorn(url, args.workers, extra_env=env)
+        try:
+            results = run_mixed(port, read_paths, write_paths, args.readers, args.writers, args.duration)
+        finally:
+            stop_process(proc)
+        print_result(f"{label}: reads", results['read'])
+        print_result(f"{label}: writes", results['write'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Render time of index.html and post.html with and without the fragment cache,
+and template load time with a cold and a warm bytecode cache
+
+    python -m benchmarks.bench_templates --posts 500 --renders 300
+"""
+import time
+import argparse
+import tempfile
+import statistics
+
+from benchmarks.common import make_database, create_bench_app, percentile
+
+
+def time_renders(app, template, context, renders):
+    from flask import render_template
+    timings = []
+    with app.test_request_context('/'):
+        render_template(template, **context)  # compile and fill the cache
+        for _ in range(renders):
+            start = time.perf_counter()
+            render_template(template, **context)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), percentile(timings, 95)
+
+
+def time_template_loads(url, directory):
+    """Milliseconds to load every template in a fresh app using `directory` as bytecode cache"""
+    app = create_bench_app(url, JINJA_BYTECODE_CACHE_DIR=directory, DB_AUTO_CREATE=False)
+    names = app.jinja_env.list_templates(extensions=['html'])
+    start = time.perf_counter()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--renders', type=int, default=300)
+    args = parser.parse_args()
+
+    url = make_database(args.posts)
+    app = create_bench_app(url)
+
+    from routes import trending_posts
+    from models.post import Post
+    from config import Config
+    with app.app_context():
+        post = Post.query.filter_by(published=True).first()
+        popular = trending_posts(5)
+        pages = {
+            'index.html': dict(
+                featured_posts=Post.query.filter_by(published=True, featured=True).limit(6).all(),
+                recent_posts=Post.query.filter_by(published=True).limit(8).all(),
+                popular_posts=popular, config=Config),
+            'post.html': dict(
+                post=post, popular_posts=popular, config=Config,
+                related_posts=Post.query.filter_by(category=post.category).limit(4).all(),
+                category_posts=Post.query.filter_by(category=post.category).limit(3).all()),
+        }
+
+        cache = app.jinja_env.fragment_cache
+        for template, context in pages.items():
+            app.jinja_env.fragment_cache = None
+            plain = time_renders(app, template, context, args.renders)
+            app.jinja_env.fragment_cache = cache
+            cached = time_renders(app, template, context, args.renders)
+            saved = (1 - cached[0] / plain[0]) * 100 if plain[0] else 0.0
+            print(f"{template:<12} uncached p50 {plain[0]:6.2f} ms p95 {plain[1]:6.2f} ms | "
+                  f"cached p50 {cached[0]:6.2f} ms p95 {cached[1]:6.2f} ms | saved {saved:4.1f}%")
+
+    directory = tempfile.mkdtemp(prefix='uzbeknews-jinja-')
+    cold = time_template_loads(url, directory)
+    warm = time_template_loads(url, directory)
+    print(f"Template load: cold bytecode cache {cold:.1f} ms, warm {warm:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Single-process vs multi-worker throughput on a seeded database
+
+    python -m benchmarks.bench_workers --posts 2000 --workers 4 --duration 15
+"""
+import argparse
+
+from benchmarks.common import (make_database, sample_paths, start_gunicorn, stop_process,
+                               run_load, print_result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    url = make_database(args.posts)
+    paths = sample_paths(url)
+    print(f"Database: {url} ({args.posts} posts), {len(paths)} distinct paths")
+
+    for workers in sorted({1, args.workers}):
+        proc, port = start_gunicorn(url, workers, threads=args.threads)
+        try:
+            run_load(port, paths, concurrency=args.concurrency, duration=2.0)  # warm-up
+            result = run_load(port, paths, concurrency=args.concurrency, duration=args.duration)
+        finally:
+            stop_process(proc)
+        print_result(f"{workers} worker(s) x {args.threads} threads", result)
+
+
+if __name__ == '__main__':
+    main()
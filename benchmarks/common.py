@@ -0,0 +1,163 @@
+"""Shared helpers for the benchmark scripts
+
+Benchmarks are plain scripts run from the repository root, e.g.:
+
+    python -m benchmarks.bench_workers
+"""
+import os
+import sys
+import time
+import socket
+import tempfile
+import threading
+import statistics
+import subprocess
+import http.client
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_database(count=1000, directory=None, **overrides):
+    """Create a seeded SQLite database and return its URL"""
+    directory = directory or tempfile.mkdtemp(prefix='uzbeknews-bench-')
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    app = create_bench_app(url, **overrides)
+    result = app.test_cli_runner().invoke(args=['seed-posts', '--count', str(count)])
+    if result.exit_code != 0:
+        raise RuntimeError(result.output)
+    return url
+
+
+def create_bench_app(url, **overrides):
+    """Create an app bound to the given database URL"""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from app import create_app
+    return create_app({'SQLALCHEMY_DATABASE_URI': url, 'RATE_LIMIT_ENABLED': False, **overrides})
+
+
+def sample_paths(url, limit=200):
+    """Return a mix of public URLs that exist in the seeded database"""
+    from models.post import Post
+    from config import Config
+    app = create_bench_app(url)
+    with app.app_context():
+        slugs = [slug for (slug,) in Post.query.filter_by(published=True)
+                 .with_entities(Post.slug).limit(limit).all()]
+    paths = ['/'] * 10
+    paths += [f'/yangilik/{slug}' for slug in slugs]
+    paths += [f'/kategoriya/{quote(name)}' for name in Config.UZBEK_CATEGORIES]
+    return paths
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Server on port {port} did not start')
+
+
+def start_gunicorn(url, workers, threads=4, extra_env=None, extra_args=()):
+    """Start gunicorn with the production config and return (process, port)"""
+    port = free_port()
+    # One client address would exhaust the per-IP rate limits within seconds
+    env = dict(os.environ, DATABASE_URL=url, GUNICORN_LOGLEVEL='warning', RATE_LIMIT_ENABLED='0')
+    env.update(extra_env or {})
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+         *extra_args, 'main:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_for_port(port)
+    return proc, port
+
+
+def stop_process(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def run_load(port, paths, concurrency=16, duration=10.0):
+    """Issue GET requests from `concurrency` threads for `duration` seconds
+
+    Returns a dict with throughput and latency percentiles (milliseconds).
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed, i = [], 0, offset
+        while time.perf_counter() < stop_at:
+            path = paths[i % len(paths)]
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500 or response.status == 429:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, errors[0])
+
+
+def summarize(latencies, elapsed, errors=0):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {'requests': 0, 'errors': errors, 'rps': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def print_result(label, result):
+    print(f"{label:<28} {result['rps']:>9.1f} req/s  p50 {result['p50']:>7.1f} ms  "
+          f"p95 {result['p95']:>7.1f} ms  p99 {result['p99']:>7.1f} ms  "
+          f"errors {result['errors']}")
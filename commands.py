@@ -0,0 +1,278 @@
+import time
+import random
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+
+from app import db, init_database
+from utils.database import REPLICA_BIND_PREFIX
+from models.user import User
+from models.post import Post
+from config import Config
+from services.batch_service import BatchGenerator, parse_batch_lines, save_drafts, summarize_results
+from services.usage_service import prune_calls, rollup_day
+from services.scheduler_service import PublishScheduler
+from services.analytics_service import compact_view_log
+from services import archive_service, counter_service, tag_service
+
+SEED_PARAGRAPH_UZ = (
+    "O'zbekiston Respublikasida {topic} sohasida yangi loyihalar amalga oshirilmoqda. "
+    "Mutaxassislarning fikricha, bu tashabbuslar mintaqa iqtisodiyoti va aholi turmush "
+    "darajasiga ijobiy ta'sir ko'rsatadi. Loyiha doirasida {region} viloyatida ham "
+    "bir qator ishlar rejalashtirilgan."
+)
+
+SEED_PARAGRAPH_RU = (
+    "В Республике Узбекистан реализуются новые проекты в сфере {topic}. "
+    "По мнению экспертов, эти инициативы положительно скажутся на экономике региона "
+    "и уровне жизни населения. В рамках проекта работы запланированы и в регионе {region}."
+)
+
+def register_commands(app):
+    """Attach management commands to the Flask CLI"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables and the default admin user"""
+        init_database()
+        click.echo('Database initialized')
+
+    @app.cli.command('sync-replicas')
+    def sync_replicas_command():
+        """Copy the primary SQLite database into SQLite replica files (local testing)"""
+        primary = db.engine.url
+        if primary.get_backend_name() != 'sqlite':
+            click.echo('Primary is not SQLite; use the database\'s own replication')
+            return
+
+        for key, engine in db.engines.items():
+            if not (isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)):
+                continue
+            if engine.url.get_backend_name() != 'sqlite':
+                click.echo(f'Skipping {key}: not an SQLite replica')
+                continue
+            engine.dispose()
+            source = sqlite3.connect(primary.database)
+            target = sqlite3.connect(engine.url.database)
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+            click.echo(f'{key}: copied {primary.database} -> {engine.url.database}')
+
+    @app.cli.command('generate-batch')
+    @click.argument('topics_file', type=click.File('r', encoding='utf-8'))
+    @click.option('--category', default=Config.UZBEK_CATEGORIES[0], show_default=True,
+                  help='Category for lines that do not set one')
+    @click.option('--region', default=None, help='Region for lines that do not set one')
+    @click.option('--concurrency', type=int, default=None, help='Parallel Gemini requests')
+    @click.option('--author', default=None, help='Username of the draft author (default: first admin)')
+    def generate_batch_command(topics_file, category, region, concurrency, author):
+        """Generate unpublished drafts from a file of `topic | category | region` lines"""
+        from routes import gemini_service
+
+        items = parse_batch_lines(topics_file.read(), category, region)
+        if not items:
+            raise click.UsageError('No topics found')
+        if author:
+            user = User.query.filter_by(username=author).first()
+        else:
+            user = User.query.filter_by(is_admin=True).first()
+        if user is None:
+            raise click.UsageError('Author not found')
+
+        config = current_app.config
+        generator = BatchGenerator(
+            gemini_service,
+            concurrency=concurrency or config['GEMINI_BATCH_CONCURRENCY'],
+            rpm=config['GEMINI_RPM'],
+            tpm=config['GEMINI_TPM'],
+            tokens_per_request=config['GEMINI_TOKENS_PER_ARTICLE'],
+            app=current_app._get_current_object(),
+        )
+
+        started = time.perf_counter()
+        results = []
+        for result in generator.iter_results(items):
+            results.append(result)
+            status = 'OK ' if result['ok'] else 'ERR'
+            click.echo(f"{status} {result['latency_ms']:>6} ms (waited {result['waited_ms']} ms)  "
+                       f"{result['topic']}" + (f"  -> {result['error']}" if result['error'] else ''))
+
+        posts = save_drafts(results, user.id)
+        summary = summarize_results(results, time.perf_counter() - started)
+        click.echo(f"{summary['succeeded']}/{summary['total']} drafts saved in {summary['elapsed_s']} s, "
+                   f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, failed {summary['failed']}")
+        for post in posts:
+            click.echo(f"  #{post.id} {post.slug}")
+
+    @app.cli.command('rollup-gemini-usage')
+    @click.option('--days', default=2, show_default=True, help='Roll up this many days, ending today')
+    @click.option('--keep-days', type=int, default=None,
+                  help='Keep raw call rows this many days (default: GEMINI_USAGE_RETENTION_DAYS)')
+    def rollup_gemini_usage_command(days, keep_days):
+        """Aggregate gemini_calls into daily rollups and prune old raw rows"""
+        today = datetime.utcnow().date()
+        for offset in range(days - 1, -1, -1):
+            day = today - timedelta(days=offset)
+            click.echo(f'{day}: {rollup_day(day)} method rows')
+        
+        # Older days were rolled up by earlier runs, so their raw rows can go
+        keep_days = keep_days if keep_days is not None else current_app.config['GEMINI_USAGE_RETENTION_DAYS']
+        click.echo(f'Pruned {prune_calls(keep_days)} call rows older than {keep_days} days')
+
+    @app.cli.command('run-scheduler')
+    @click.option('--interval', type=int, default=None, help='Seconds between polls (default: SCHEDULER_INTERVAL)')
+    @click.option('--once', is_flag=True, help='Publish one batch of due posts and exit')
+    def run_scheduler_command(interval, once):
+        """Publish scheduled posts and announce them on Telegram"""
+        from routes import telegram_fanout
+        
+        config = current_app.config
+        scheduler = PublishScheduler(
+            current_app._get_current_object(),
+            telegram_fanout,
+            batch_size=config['SCHEDULER_BATCH_SIZE'],
+            digest_min_posts=config['TELEGRAM_DIGEST_MIN_POSTS'],
+            digest_max_posts=config['TELEGRAM_DIGEST_MAX_POSTS'],
+            base_url=config['SITE_URL'],
+        )
+        if once:
+            posts = scheduler.run_once()
+            click.echo(f'Published {len(posts)} posts')
+            return
+        scheduler.run_forever(interval or config['SCHEDULER_INTERVAL'])
+
+    @app.cli.command('compact-views')
+    def compact_views_command():
+        """Fold finished view log segments into the analytics rollup tables"""
+        from routes import view_log
+        
+        segments, views = compact_view_log(
+            view_log, hourly_retention_days=current_app.config['VIEW_STATS_HOURLY_RETENTION_DAYS'])
+        click.echo(f'Compacted {segments} segments, {views} views')
+
+    @app.cli.command('build-post-signatures')
+    @click.option('--days', default=None, type=int, help='Only posts from the last N days (default: DEDUP_WINDOW_DAYS)')
+    def build_post_signatures_command(days):
+        """Compute near-duplicate signatures for existing posts"""
+        from routes import duplicates
+        
+        since = datetime.utcnow() - timedelta(days=days or current_app.config['DEDUP_WINDOW_DAYS'])
+        posts = Post.query.filter(Post.created_at >= since).order_by(Post.id).all()
+        duplicates.add_posts(posts)
+        click.echo(f'Stored signatures for {len(posts)} posts')
+
+    @app.cli.command('reconcile-counters')
+    @click.option('--fix', is_flag=True, help='Rebuild post_counters and tag counts from posts when they differ')
+    def reconcile_counters_command(fix):
+        """Compare the dashboard counters and tag counts with a full count of posts"""
+        if not counter_service.install_triggers(db):
+            click.echo('Post counters are not maintained on this database')
+            return
+        drift = counter_service.reconcile(db, fix=fix)
+        if tag_service.install_triggers(db):
+            drift += tag_service.reconcile(db, fix=fix)
+        for scope, name, expected, stored in drift:
+            click.echo(f'{scope}:{name or "-"} expected {expected}, stored {stored}')
+        if not drift:
+            click.echo('Counters match')
+        elif fix:
+            click.echo(f'Rebuilt counters; {len(drift)} rows were off')
+        else:
+            raise click.ClickException(f'{len(drift)} counter rows differ; run with --fix to rebuild')
+
+    @app.cli.command('migrate-tags')
+    @click.option('--batch-size', default=500, show_default=True, help='Posts per transaction')
+    def migrate_tags_command(batch_size):
+        """Split the keywords of existing posts into tags"""
+        init_database()
+        from models.tag import Tag
+        
+        count = tag_service.migrate(db, batch_size)
+        click.echo(f'Tagged {count} posts; {Tag.query.count()} tags')
+
+    @app.cli.command('archive-posts')
+    @click.option('--days', default=None, type=int, help='Minimum age in days (default: ARCHIVE_AFTER_DAYS)')
+    @click.option('--max-views', default=None, type=int, help='Only posts with fewer views (default: ARCHIVE_MAX_VIEWS)')
+    @click.option('--batch-size', default=None, type=int, help='Posts per transaction (default: ARCHIVE_BATCH_SIZE)')
+    @click.option('--dry-run', is_flag=True, help='Only count the posts that would be archived')
+    def archive_posts_command(days, max_views, batch_size, dry_run):
+        """Move old, rarely read posts to the archive table"""
+        init_database()
+        config = current_app.config
+        days = days if days is not None else config['ARCHIVE_AFTER_DAYS']
+        max_views = max_views if max_views is not None else config['ARCHIVE_MAX_VIEWS']
+        ids = archive_service.archive_posts(current_app._get_current_object(), db, days, max_views,
+                                            batch_size or config['ARCHIVE_BATCH_SIZE'], dry_run=dry_run)
+        verb = 'Would archive' if dry_run else 'Archived'
+        click.echo(f'{verb} {len(ids)} posts older than {days} days with fewer than {max_views} views')
+
+    @app.cli.command('restore-posts')
+    @click.argument('post_ids', nargs=-1, type=int, required=True)
+    def restore_posts_command(post_ids):
+        """Move archived posts back so they can be edited"""
+        init_database()
+        try:
+            ids = archive_service.restore_posts(current_app._get_current_object(), db, post_ids)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        missing = sorted(set(post_ids) - set(ids))
+        click.echo(f'Restored {len(ids)} posts')
+        if missing:
+            click.echo(f'Not in the archive: {", ".join(map(str, missing))}')
+
+    @app.cli.command('export-static')
+    @click.option('--directory', default=None, help='Output directory (default: STATIC_EXPORT_DIR)')
+    def export_static_command(directory):
+        """Render every published post, category listing and the home page to static files"""
+        from services.static_export import StaticExporter
+        
+        exporter = StaticExporter(current_app._get_current_object(),
+                                  directory or current_app.config['STATIC_EXPORT_DIR'], current_app.config['SITE_URL'])
+        started = time.perf_counter()
+        written = exporter.export_all()
+        click.echo(f'Wrote {written} files to {exporter.directory} in {time.perf_counter() - started:.1f} s')
+
+    @app.cli.command('seed-posts')
+    @click.option('--count', default=500, show_default=True, help='Number of posts to create')
+    @click.option('--seed', default=42, show_default=True, help='Random seed for reproducible data')
+    def seed_posts_command(count, seed):
+        """Fill the database with synthetic published posts for benchmarking"""
+        init_database()
+        author = User.query.filter_by(is_admin=True).first()
+        rng = random.Random(seed)
+        now = datetime.utcnow()
+        offset = Post.query.count()
+
+        posts = []
+        for i in range(offset, offset + count):
+            category = rng.choice(Config.UZBEK_CATEGORIES)
+            region = rng.choice(Config.UZBEK_REGIONS)
+            paragraphs = rng.randint(4, 10)
+            post = Post(
+                title_uz=f"{category}: {region}dagi yangilik #{i}",
+                title_ru=f"{category}: новость из {region} #{i}",
+                content_uz="\n\n".join(SEED_PARAGRAPH_UZ.format(topic=category.lower(), region=region)
+                                       for _ in range(paragraphs)),
+                content_ru="\n\n".join(SEED_PARAGRAPH_RU.format(topic=category.lower(), region=region)
+                                       for _ in range(paragraphs)),
+                category=category,
+                region=region,
+                keywords=f"{category.lower()}, {region.lower()}, o'zbekiston",
+                published=rng.random() < 0.9,
+                featured=rng.random() < 0.05,
+                views=int(rng.paretovariate(1.2) * 10),
+                author_id=author.id,
+            )
+            post.created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            posts.append(post)
+
+        db.session.add_all(posts)
+        db.session.commit()
+        logging.info(f"Seeded {count} posts")
+        click.echo(f'Created {count} posts')
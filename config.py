@@ -8,13 +8,176 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///uzbek_news.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Run create_all and default admin creation when the app is created.
+    # Disable in multi-process deployments that bootstrap with `flask init-db`.
+    DB_AUTO_CREATE = os.environ.get('DB_AUTO_CREATE', '1') == '1'
+    
+    # SQLite production profile (ignored for other databases)
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', '1') == '1'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    SQLITE_WRITER_TIMEOUT = int(os.environ.get('SQLITE_WRITER_TIMEOUT', 30))
+    
+    # Read replicas (comma-separated URLs) used by public read-only pages
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_HEALTH_INTERVAL = int(os.environ.get('REPLICA_HEALTH_INTERVAL', 30))
+    REPLICA_RETRY_AFTER = int(os.environ.get('REPLICA_RETRY_AFTER', 60))
+    
+    # Async read path for the public pages: independent queries of a page are
+    # issued concurrently on async engines for the primary (ASYNC_DATABASE_URL)
+    # and DATABASE_REPLICA_URLS, routed like the sync session. ASYNC_READS=1
+    # needs the `async` extra (aiosqlite or asyncpg, and greenlet); without
+    # them a warning is logged and the pages use the sync session.
+    ASYNC_READS = os.environ.get('ASYNC_READS', '0') == '1'
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL', '')  # defaults to the primary database
+    ASYNC_POOL_SIZE = int(os.environ.get('ASYNC_POOL_SIZE', 10))
+    ASYNC_READ_TIMEOUT = int(os.environ.get('ASYNC_READ_TIMEOUT', 10))
+    
     # API Keys
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', 'your-gemini-key')
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', 'your-telegram-token')
     TELEGRAM_CHANNEL_ID = os.environ.get('TELEGRAM_CHANNEL_ID', '@your_channel')
     
+    # Scheduled publishing: `flask run-scheduler` publishes due posts in batches.
+    # When a batch has at least TELEGRAM_DIGEST_MIN_POSTS regular (non-featured)
+    # posts they go out as digest messages instead of one message each.
+    SCHEDULER_INTERVAL = int(os.environ.get('SCHEDULER_INTERVAL', 60))
+    SCHEDULER_BATCH_SIZE = int(os.environ.get('SCHEDULER_BATCH_SIZE', 20))
+    TELEGRAM_DIGEST_MIN_POSTS = int(os.environ.get('TELEGRAM_DIGEST_MIN_POSTS', 3))
+    TELEGRAM_DIGEST_MAX_POSTS = int(os.environ.get('TELEGRAM_DIGEST_MAX_POSTS', 6))
+    
+    # Telegram channels as a JSON list (or the path of a JSON file), e.g.
+    # [{"chat_id": "@uzbeknews", "language": "uz"}, {"chat_id": "@uzbeknews_ru", "language": "ru"},
+    #  {"chat_id": "@toshkent_news", "language": "uz", "regions": ["Toshkent"]}]
+    # with optional "categories", "regions", "featured_only" and "name" routing rules.
+    # Empty means TELEGRAM_CHANNEL_ID in Uzbek. Posts are sent to all matching
+    # channels concurrently, at most one message per TELEGRAM_CHAT_INTERVAL
+    # seconds to the same chat. The spacing is enforced within a process and
+    # seeded from the last recorded delivery, so across processes it is best
+    # effort; keep sending in one process (run-scheduler) for strict limits.
+    TELEGRAM_CHANNELS = os.environ.get('TELEGRAM_CHANNELS', '')
+    TELEGRAM_FANOUT_CONCURRENCY = int(os.environ.get('TELEGRAM_FANOUT_CONCURRENCY', 8))
+    TELEGRAM_CHAT_INTERVAL = float(os.environ.get('TELEGRAM_CHAT_INTERVAL', 1.0))
+    TELEGRAM_MAX_RETRIES = int(os.environ.get('TELEGRAM_MAX_RETRIES', 2))
+    
+    # Gemini quota used by batch generation
+    GEMINI_RPM = int(os.environ.get('GEMINI_RPM', 10))
+    GEMINI_TPM = int(os.environ.get('GEMINI_TPM', 250000))
+    GEMINI_BATCH_CONCURRENCY = int(os.environ.get('GEMINI_BATCH_CONCURRENCY', 3))
+    GEMINI_TOKENS_PER_ARTICLE = int(os.environ.get('GEMINI_TOKENS_PER_ARTICLE', 4000))
+    
+    # One structured request returns both languages, SEO fields and the Telegram
+    # post; set to 0 to go back to separate article/translation/Telegram calls
+    GEMINI_SINGLE_CALL = os.environ.get('GEMINI_SINGLE_CALL', '1') == '1'
+    
+    # Gemini call deadlines (seconds, including retries) and failure handling
+    GEMINI_DEADLINES = {
+        'generate_uzbek_news': 90,
+        'stream_uzbek_news': 120,
+        'generate_telegram_post': 30,
+        'translate_to_russian': 90,
+        'summarize_content': 15,
+        'generate_bilingual_article': 150,
+        'stream_bilingual_article': 180,
+    }
+    GEMINI_MAX_ATTEMPTS = int(os.environ.get('GEMINI_MAX_ATTEMPTS', 3))
+    GEMINI_RETRY_RATIO = float(os.environ.get('GEMINI_RETRY_RATIO', 0.2))
+    GEMINI_BREAKER_THRESHOLD = float(os.environ.get('GEMINI_BREAKER_THRESHOLD', 0.5))
+    GEMINI_BREAKER_MIN_CALLS = int(os.environ.get('GEMINI_BREAKER_MIN_CALLS', 5))
+    GEMINI_BREAKER_WINDOW = int(os.environ.get('GEMINI_BREAKER_WINDOW', 60))
+    GEMINI_BREAKER_OPEN_SECONDS = int(os.environ.get('GEMINI_BREAKER_OPEN_SECONDS', 30))
+    
+    # Gemini usage accounting: raw per-call rows are kept this many days,
+    # daily rollups forever. Prices are USD per 1M (input, output) tokens.
+    GEMINI_USAGE_RETENTION_DAYS = int(os.environ.get('GEMINI_USAGE_RETENTION_DAYS', 30))
+    GEMINI_PRICES = {
+        'gemini-2.5-flash': (0.30, 2.50),
+    }
+    
+    # Offline load testing: FAKE_SERVICES=gemini,telegram swaps the real
+    # clients for seeded fakes (services/fakes.py) with log-normal latency and
+    # injected 429/RetryAfter, 503 and malformed-JSON failures. GEMINI_RECORD_PATH
+    # appends real Gemini responses to a JSON-lines file for FAKE_GEMINI_RECORDINGS.
+    FAKE_SERVICES = [name.strip() for name in os.environ.get('FAKE_SERVICES', '').split(',') if name.strip()]
+    FAKE_SEED = int(os.environ.get('FAKE_SEED', 0))
+    FAKE_GEMINI_RECORDINGS = os.environ.get('FAKE_GEMINI_RECORDINGS', '')
+    FAKE_GEMINI_LATENCY_MS = float(os.environ.get('FAKE_GEMINI_LATENCY_MS', 800))
+    FAKE_GEMINI_LATENCY_SIGMA = float(os.environ.get('FAKE_GEMINI_LATENCY_SIGMA', 0.5))
+    FAKE_GEMINI_RATE_LIMIT_RATE = float(os.environ.get('FAKE_GEMINI_RATE_LIMIT_RATE', 0))
+    FAKE_GEMINI_SERVER_ERROR_RATE = float(os.environ.get('FAKE_GEMINI_SERVER_ERROR_RATE', 0))
+    FAKE_GEMINI_MALFORMED_RATE = float(os.environ.get('FAKE_GEMINI_MALFORMED_RATE', 0))
+    FAKE_TELEGRAM_LATENCY_MS = float(os.environ.get('FAKE_TELEGRAM_LATENCY_MS', 150))
+    FAKE_TELEGRAM_RETRY_AFTER_RATE = float(os.environ.get('FAKE_TELEGRAM_RETRY_AFTER_RATE', 0))
+    GEMINI_RECORD_PATH = os.environ.get('GEMINI_RECORD_PATH', '')
+    
+    # Trending posts: view scores halve every TRENDING_HALF_LIFE_HOURS; each
+    # process merges its views into trending_scores every TRENDING_SNAPSHOT_INTERVAL s
+    TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 6))
+    TRENDING_SNAPSHOT_INTERVAL = int(os.environ.get('TRENDING_SNAPSHOT_INTERVAL', 60))
+    TRENDING_CAPACITY = int(os.environ.get('TRENDING_CAPACITY', 50))
+    
+    # Near-duplicate detection: posts from the last DEDUP_WINDOW_DAYS are
+    # compared by MinHash similarity of their titles and bodies
+    DEDUP_ENABLED = os.environ.get('DEDUP_ENABLED', '1') == '1'
+    DEDUP_WINDOW_DAYS = int(os.environ.get('DEDUP_WINDOW_DAYS', 30))
+    DEDUP_TITLE_THRESHOLD = float(os.environ.get('DEDUP_TITLE_THRESHOLD', 0.6))
+    DEDUP_CONTENT_THRESHOLD = float(os.environ.get('DEDUP_CONTENT_THRESHOLD', 0.5))
+    
+    # View analytics: views are appended to binary segment files under
+    # VIEW_LOG_DIR and `flask compact-views` folds them into rollup tables.
+    # Off by default: nothing in the app compacts, so enable it only where a
+    # cron job runs compact-views on every host that serves pages
+    VIEW_LOG_ENABLED = os.environ.get('VIEW_LOG_ENABLED', '0') == '1'
+    VIEW_LOG_DIR = os.environ.get('VIEW_LOG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'viewlog'))
+    VIEW_LOG_ROTATE_SECONDS = int(os.environ.get('VIEW_LOG_ROTATE_SECONDS', 300))
+    VIEW_STATS_HOURLY_RETENTION_DAYS = int(os.environ.get('VIEW_STATS_HOURLY_RETENTION_DAYS', 90))
+    
+    # Template caching: `{% cache %}` fragments are kept per process for
+    # FRAGMENT_CACHE_TTL seconds and dropped on every host process when the
+    # stamp file is touched; compiled templates are kept in JINJA_BYTECODE_CACHE_DIR
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 60))
+    FRAGMENT_CACHE_STAMP = os.environ.get('FRAGMENT_CACHE_STAMP', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'fragment-cache.stamp'))
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'jinja-cache'))
+    
+    # Per-client rate limits for the expensive public pages as endpoint=requests/seconds;
+    # the token buckets live in an SQLite file shared by all worker processes
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMITS = os.environ.get('RATE_LIMITS', 'main.index=60/60,main.post_detail=120/60,main.category=60/60,'
+                                                'main.region_posts=60/60,main.tag_posts=60/60,main.search=20/60')
+    RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'ratelimit.db'))
+    
+    # Load shedding: while the rate-limited public pages average more than
+    # LOAD_SHED_LATENCY_MS per response in a worker, they get their last good
+    # response, or 429 if there is none
+    LOAD_SHED_ENABLED = os.environ.get('LOAD_SHED_ENABLED', '0') == '1'
+    LOAD_SHED_LATENCY_MS = int(os.environ.get('LOAD_SHED_LATENCY_MS', 1000))
+    LOAD_SHED_CACHE_ENTRIES = int(os.environ.get('LOAD_SHED_CACHE_ENTRIES', 200))
+    
+    # Static export: published articles, category listings and the home page
+    # are rendered to STATIC_EXPORT_DIR (with .gz copies) for nginx to serve;
+    # changed posts are re-rendered on publish/edit, `flask export-static` does all
+    STATIC_EXPORT_ENABLED = os.environ.get('STATIC_EXPORT_ENABLED', '0') == '1'
+    STATIC_EXPORT_DIR = os.environ.get('STATIC_EXPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'static-export'))
+    
+    # Archival: `flask archive-posts` moves published posts older than
+    # ARCHIVE_AFTER_DAYS with fewer than ARCHIVE_MAX_VIEWS views to archived_posts;
+    # article pages, search and the sitemap read both tables
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_MAX_VIEWS = int(os.environ.get('ARCHIVE_MAX_VIEWS', 500))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+    SITEMAP_CHUNK_SIZE = int(os.environ.get('SITEMAP_CHUNK_SIZE', 10000))
+    
+    # Admin profiling: sampled request profiles and tracemalloc snapshots are
+    # written to PROFILING_DIR and can be downloaded from /admin/profiling
+    PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'profiles'))
+    PROFILE_SAMPLE_INTERVAL_MS = int(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5))
+    
     # Site Settings
     SITE_NAME = os.environ.get('SITE_NAME', 'UzbekNews AI')
+    SITE_URL = os.environ.get('SITE_URL', 'http://localhost:5000')
     SITE_DESCRIPTION = os.environ.get('SITE_DESCRIPTION', 'O\'zbekiston va Markaziy Osiyodagi eng so\'nggi yangiliklarni AI yordamida taqdim etamiz')
     
     # Uzbek Categories
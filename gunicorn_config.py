@@ -0,0 +1,58 @@
+"""Gunicorn settings for multi-process production serving
+
+Run with:
+
+    gunicorn -c gunicorn_config.py main:app
+
+The app is imported once in the master (``preload_app``), so table creation
+and the default admin bootstrap in ``create_app`` happen a single time. The
+master then precompiles templates and warms the home page before forking, and
+every worker drops the inherited connection pool right after fork so no
+database socket or SQLite handle is shared between processes.
+
+All values can be overridden from the environment or the command line.
+"""
+import os
+import multiprocessing
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# gthread: a few processes with a small thread pool each. Views spend most of
+# their time waiting on the database or on Gemini/Telegram, so threads keep a
+# worker busy without duplicating the process memory.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+preload_app = True
+
+# AI generation requests can legitimately take tens of seconds
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def when_ready(server):
+    """Warm the preloaded app in the master before workers are spawned"""
+    from app import warm_up
+    warm_up(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections"""
+    from app import dispose_engines
+    dispose_engines(server.app.wsgi())
+
+
+def worker_exit(server, worker):
+    """Close the worker's database connections, including the async read engines"""
+    from app import dispose_engines
+    dispose_engines(server.app.wsgi(), close=True)
@@ -1,5 +1,14 @@
 from app import db
 from .user import User
 from .post import Post
+from .translation import TranslationMemory
+from .gemini_usage import GeminiCall, GeminiUsageDaily
+from .trending import TrendingScore
+from .analytics import ViewStatHourly, ViewStatDaily, ViewLogSegment
+from .post_signature import PostSignature
+from .post_counter import PostCounter
+from .tag import Tag, post_tags
+from .telegram_delivery import TelegramDelivery
+from .archived_post import ArchivedPost
 
-__all__ = ['db', 'User', 'Post']
+__all__ = ['db', 'User', 'Post', 'TranslationMemory', 'GeminiCall', 'GeminiUsageDaily', 'TrendingScore', 'ViewStatHourly', 'ViewStatDaily', 'ViewLogSegment', 'PostSignature', 'PostCounter', 'Tag', 'post_tags', 'TelegramDelivery', 'ArchivedPost']
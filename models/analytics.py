@@ -0,0 +1,51 @@
+from app import db
+from datetime import datetime
+
+class ViewStatHourly(db.Model):
+    """Post views per hour (UTC), language and referrer class, compacted from the view log"""
+    __tablename__ = 'view_stats_hourly'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False, index=True)
+    post_id = db.Column(db.Integer, nullable=False)
+    language = db.Column(db.String(2), nullable=False)
+    referrer = db.Column(db.String(10), nullable=False)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('hour', 'post_id', 'language', 'referrer', name='uq_view_stats_hourly'),
+    )
+    
+    def __repr__(self):
+        return f'<ViewStatHourly {self.hour} post={self.post_id} {self.views}>'
+
+class ViewStatDaily(db.Model):
+    """Post views per day (UTC), rebuilt from view_stats_hourly"""
+    __tablename__ = 'view_stats_daily'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    post_id = db.Column(db.Integer, nullable=False)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'post_id', name='uq_view_stats_daily'),
+    )
+    
+    def __repr__(self):
+        return f'<ViewStatDaily {self.day} post={self.post_id} {self.views}>'
+
+class ViewLogSegment(db.Model):
+    """A view log segment already folded into the rollups, keyed by host and file name
+
+    Written in the compaction transaction so a segment that outlives a crash
+    between commit and unlink is not counted twice.
+    """
+    __tablename__ = 'view_log_segments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False, unique=True)
+    compacted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<ViewLogSegment {self.name}>'
@@ -0,0 +1,34 @@
+from app import db
+from datetime import datetime
+from .post import Post
+
+def _archive_columns():
+    """The columns of posts without defaults or foreign keys; rows keep their post id"""
+    for column in Post.__table__.columns:
+        yield db.Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False,
+                        nullable=column.nullable, unique=column.unique, index=column.index)
+
+class ArchivedPost(db.Model):
+    """A published post moved out of the posts table by `flask archive-posts`
+
+    Read-only: article pages, search and the sitemap fall back to it;
+    `flask restore-posts` moves a post back before it can be edited.
+    """
+    __table__ = db.Table(
+        'archived_posts',
+        *_archive_columns(),
+        db.Column('archived_at', db.DateTime, default=datetime.utcnow, index=True),
+    )
+
+    archived = True
+    tags = ()
+
+    def get_absolute_url(self):
+        return f'/yangilik/{self.slug}'
+
+    def increment_views(self):
+        self.views = (self.views or 0) + 1
+        db.session.commit()
+
+    def __repr__(self):
+        return f'<ArchivedPost {self.title_uz}>'
@@ -0,0 +1,51 @@
+from app import db
+from datetime import datetime
+
+class GeminiCall(db.Model):
+    """One row per Gemini request; rows are only ever appended and pruned"""
+    __tablename__ = 'gemini_calls'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    method = db.Column(db.String(40), nullable=False)
+    model = db.Column(db.String(40), nullable=False)
+    outcome = db.Column(db.String(10), nullable=False)
+    attempts = db.Column(db.SmallInteger, default=1)
+    latency_ms = db.Column(db.Integer, default=0)
+    
+    # usage_metadata; thinking tokens are billed as output
+    prompt_tokens = db.Column(db.Integer, default=0)
+    output_tokens = db.Column(db.Integer, default=0)
+    thought_tokens = db.Column(db.Integer, default=0)
+    
+    # Links calls made while generating an article to the post saved from it
+    generation_id = db.Column(db.String(32), index=True)
+    post_id = db.Column(db.Integer, index=True)
+    
+    def __repr__(self):
+        return f'<GeminiCall {self.method} {self.outcome} {self.latency_ms}ms>'
+
+class GeminiUsageDaily(db.Model):
+    """Per-day, per-method rollup of gemini_calls"""
+    __tablename__ = 'gemini_usage_daily'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    method = db.Column(db.String(40), nullable=False)
+    model = db.Column(db.String(40), nullable=False)
+    
+    calls = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Integer, default=0)
+    prompt_tokens = db.Column(db.BigInteger, default=0)
+    output_tokens = db.Column(db.BigInteger, default=0)
+    thought_tokens = db.Column(db.BigInteger, default=0)
+    latency_ms_total = db.Column(db.BigInteger, default=0)
+    latency_p95_ms = db.Column(db.Integer, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'method', 'model', name='uq_gemini_usage_daily'),
+    )
+    
+    def __repr__(self):
+        return f'<GeminiUsageDaily {self.day} {self.method}>'
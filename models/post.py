@@ -5,6 +5,9 @@ from slugify import slugify
 
 class Post(BaseModel):
     __tablename__ = 'posts'
+    # Archived posts keep their id, so SQLite must never hand it out again;
+    # only applies when the table is created, see services.archive_service
+    __table_args__ = {'sqlite_autoincrement': True}
     
     # Multi-language titles
     title_uz = db.Column(db.String(200), nullable=False)
@@ -35,15 +38,24 @@ class Post(BaseModel):
     telegram_views = db.Column(db.Integer, default=0)
     telegram_posted = db.Column(db.Boolean, default=False)
     
+    # Scheduled publishing (UTC); the scheduler publishes the post once it is due
+    publish_at = db.Column(db.DateTime, index=True)
+    
     # Relationships
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     author = db.relationship('User', backref=db.backref('posts', lazy=True))
+    # Derived from keywords on every flush, see services.tag_service
+    tags = db.relationship('Tag', secondary='post_tags', order_by='Tag.name', lazy=True)
     
     def __init__(self, **kwargs):
         super(Post, self).__init__(**kwargs)
         if not self.slug and self.title_uz:
             self.slug = slugify(self.title_uz)
     
+    @property
+    def is_scheduled(self):
+        return not self.published and self.publish_at is not None
+    
     def get_absolute_url(self):
         return f'/yangilik/{self.slug}'
     
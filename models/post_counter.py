@@ -0,0 +1,19 @@
+from app import db
+
+class PostCounter(db.Model):
+    """Running post totals kept up to date by triggers on the posts table
+
+    ``scope`` is 'all' (name ''), 'category' or 'region'; posts without a
+    region are counted under the region name ''.
+    """
+    __tablename__ = 'post_counters'
+    
+    scope = db.Column(db.String(10), primary_key=True)
+    name = db.Column(db.String(50), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    published = db.Column(db.Integer, nullable=False, default=0)
+    views = db.Column(db.BigInteger, nullable=False, default=0)
+    telegram_sent = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<PostCounter {self.scope}:{self.name} {self.total}>'
@@ -0,0 +1,18 @@
+from app import db
+from datetime import datetime
+
+class PostSignature(db.Model):
+    """MinHash signatures of a post's title and body for near-duplicate checks
+
+    Each signature is packed as an array of unsigned 32-bit integers.
+    """
+    __tablename__ = 'post_signatures'
+    
+    post_id = db.Column(db.Integer, primary_key=True)
+    title_minhash = db.Column(db.LargeBinary, nullable=False)
+    content_minhash = db.Column(db.LargeBinary, nullable=False)
+    post_created_at = db.Column(db.DateTime, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<PostSignature {self.post_id}>'
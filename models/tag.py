@@ -0,0 +1,26 @@
+from app import db
+from datetime import datetime
+
+# Tag pages walk (tag_id, post_id) backwards, newest post first
+post_tags = db.Table(
+    'post_tags',
+    db.Column('post_id', db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_post_tags_tag_post', 'tag_id', 'post_id'),
+)
+
+class Tag(db.Model):
+    """A normalized keyword; ``post_count`` counts published posts and is kept up to date by triggers"""
+    __tablename__ = 'tags'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(120), unique=True, nullable=False, index=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_absolute_url(self):
+        return f'/teg/{self.slug}'
+
+    def __repr__(self):
+        return f'<Tag {self.slug}>'
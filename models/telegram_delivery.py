@@ -0,0 +1,24 @@
+from app import db
+from datetime import datetime
+
+class TelegramDelivery(db.Model):
+    """Outcome of sending one post to one Telegram chat
+
+    ``status`` is 'sent', 'failed' or 'skipped' (nothing to send in the
+    chat's language). Posts of a digest share the digest's message id.
+    """
+    __tablename__ = 'telegram_deliveries'
+    __table_args__ = (db.UniqueConstraint('post_id', 'chat_id', name='uq_telegram_deliveries_post_chat'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False, index=True)
+    chat_id = db.Column(db.String(100), nullable=False)
+    language = db.Column(db.String(2), nullable=False)
+    status = db.Column(db.String(10), nullable=False)
+    message_id = db.Column(db.BigInteger)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(500))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<TelegramDelivery {self.post_id} -> {self.chat_id} {self.status}>'
@@ -0,0 +1,20 @@
+from app import db
+from .database import BaseModel
+
+class TranslationMemory(BaseModel):
+    __tablename__ = 'translation_memory'
+    
+    # SHA-256 of the normalized source paragraph
+    source_hash = db.Column(db.String(64), nullable=False)
+    source_lang = db.Column(db.String(5), nullable=False, default='uz')
+    target_lang = db.Column(db.String(5), nullable=False, default='ru')
+    
+    source_text = db.Column(db.Text, nullable=False)
+    translated_text = db.Column(db.Text, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('source_hash', 'source_lang', 'target_lang', name='uq_translation_memory_hash'),
+    )
+    
+    def __repr__(self):
+        return f'<TranslationMemory {self.source_lang}->{self.target_lang} {self.source_hash[:8]}>'
@@ -0,0 +1,17 @@
+from app import db
+from datetime import datetime
+
+class TrendingScore(db.Model):
+    """Persisted snapshot of a post's time-decayed view score
+
+    ``score`` is log2 of the sum of 2^(age_in_half_lives) over all views,
+    measured from a fixed epoch, so it never has to be decayed in place.
+    """
+    __tablename__ = 'trending_scores'
+    
+    post_id = db.Column(db.Integer, primary_key=True)
+    score = db.Column(db.Float, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TrendingScore {self.post_id} {self.score:.3f}>'
@@ -1,23 +1,69 @@
-from flask import render_template, request, redirect, url_for, flash, session, jsonify, abort
+from flask import (Blueprint, Response, current_app, make_response, render_template, request, redirect, url_for, flash, session,
+                   jsonify, abort, send_from_directory, stream_with_context)
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, BooleanField, SubmitField, TextAreaField, SelectField
-from wtforms.validators import DataRequired, Email, Length
-from sqlalchemy import desc, func
+from flask_wtf.csrf import generate_csrf, validate_csrf
+from wtforms import (StringField, PasswordField, BooleanField, SubmitField, TextAreaField, SelectField, HiddenField,
+                     DateTimeLocalField)
+from wtforms.validators import DataRequired, Email, Length, Optional, ValidationError
+from sqlalchemy import desc, func, select, union_all
+from sqlalchemy.orm import load_only
+from datetime import datetime, timedelta
+import os
+import json
+import time
 import logging
+from contextlib import closing
 
-from app import app, db
+from app import db
 from models.user import User
 from models.post import Post
-from services.gemini_service import GeminiService
+from models.archived_post import ArchivedPost
+from models.tag import Tag, post_tags
+from models.telegram_delivery import TelegramDelivery
+from services.gemini_service import GeminiService, parse_json_response
 from services.telegram_service import TelegramService
-from utils.helpers import format_uzbek_date, get_current_language, create_excerpt
+from services.telegram_fanout import fanout_from_config
+from services.fakes import gemini_client_from_config, telegram_bot_from_config
+from utils.helpers import format_uzbek_date, get_current_language, create_excerpt, tashkent_to_utc, utc_to_tashkent
+from utils.database import use_read_replica, read_from_primary
+from utils.async_reads import ResultPagination, SessionReader
+from utils.fragment_cache import Deferred
+from utils.profiling import PROFILE_MODES, list_profiles
+from services.batch_service import BatchGenerator, parse_batch_lines, save_drafts, summarize_results
+from services import usage_service
+from services.usage_service import new_generation_id, usage_scope, link_generation
+from services.trending_service import TrendingTracker
+from services.view_log import ViewLog, classify_referrer
+from services.dedup_service import DuplicateDetector
+from services import analytics_service, counter_service
+from services.bulk_service import BULK_ACTIONS, POST_STATUSES, BulkActionError, apply_bulk_action, filter_posts
 from config import Config
+from signals import posts_changed, posts_published
+
+bp = Blueprint('main', __name__)
 
 # Initialize services
-gemini_service = GeminiService()
-telegram_service = TelegramService()
+gemini_service = GeminiService(client=gemini_client_from_config(Config))
+telegram_service = TelegramService(bot=telegram_bot_from_config(Config))
+telegram_fanout = fanout_from_config(telegram_service, Config)
+view_log = ViewLog(Config.VIEW_LOG_DIR, rotate_seconds=Config.VIEW_LOG_ROTATE_SECONDS)
+trending = TrendingTracker(
+    half_life_hours=Config.TRENDING_HALF_LIFE_HOURS,
+    snapshot_interval=Config.TRENDING_SNAPSHOT_INTERVAL,
+    capacity=Config.TRENDING_CAPACITY,
+)
+duplicates = DuplicateDetector(
+    window_days=Config.DEDUP_WINDOW_DAYS,
+    title_threshold=Config.DEDUP_TITLE_THRESHOLD,
+    content_threshold=Config.DEDUP_CONTENT_THRESHOLD,
+)
+session_reader = SessionReader()
+
+CATEGORY_PER_PAGE = 12
+TAG_PER_PAGE = 12
+SEARCH_PER_PAGE = 10
 
 # Forms
 class LoginForm(FlaskForm):
@@ -36,27 +82,19 @@ class PostForm(FlaskForm):
     keywords = StringField('Kalit so\'zlar')
     published = BooleanField('Nashr etish')
     featured = BooleanField('Asosiy yangilik')
+    publish_at = DateTimeLocalField('Nashr vaqti (Toshkent)', format='%Y-%m-%dT%H:%M', validators=[Optional()])
+    retranslate = BooleanField('Rus tiliga tarjimani yangilash (AI)')
+    generation_id = HiddenField()
+    ignore_duplicates = BooleanField('O\'xshash maqolalar bo\'lsa ham saqlash')
     submit = SubmitField('Saqlash')
 
 # Public Routes
-@app.route('/')
+@bp.route('/')
+@use_read_replica
 def index():
     """Home page"""
     try:
-        # Get featured posts
-        featured_posts = Post.query.filter_by(published=True, featured=True).order_by(desc(Post.created_at)).limit(6).all()
-        
-        # Get recent posts
-        recent_posts = Post.query.filter_by(published=True).order_by(desc(Post.created_at)).limit(8).all()
-        
-        # Get popular posts
-        popular_posts = Post.query.filter_by(published=True).order_by(desc(Post.views)).limit(5).all()
-        
-        return render_template('index.html',
-                             featured_posts=featured_posts,
-                             recent_posts=recent_posts,
-                             popular_posts=popular_posts,
-                             config=Config)
+        return render_template('index.html', config=Config, **home_context())
     except Exception as e:
         logging.error(f"Error loading home page: {e}")
         return render_template('index.html',
@@ -65,57 +103,139 @@ def index():
                              popular_posts=[],
                              config=Config)
 
-@app.route('/yangilik/<slug>')
+def home_context():
+    """Posts listed on the home page"""
+    reader = public_reader()
+    featured_posts, recent_posts = reader.gather(
+        # Featured posts
+        reader.all(published_posts().where(Post.featured == True).limit(6)),
+        # Recent posts
+        reader.all(published_posts().limit(8)),
+    )
+    return {
+        'featured_posts': featured_posts,
+        'recent_posts': recent_posts,
+        # Only queried when the cached popular-posts fragment is rendered
+        'popular_posts': Deferred(lambda: trending_posts(5)),
+    }
+
+def post_context(post):
+    """Related and sidebar posts for an article page"""
+    reader = public_reader()
+    same_category = published_posts().where(Post.category == post.category, Post.id != post.id)
+    related_posts, category_posts = reader.gather(
+        # Related posts
+        reader.all(same_category.limit(4)),
+        # Category posts for sidebar
+        reader.all(same_category.limit(3)),
+    )
+    return {
+        'post': post,
+        'related_posts': related_posts,
+        # Trending posts for the cached sidebar, only queried on a cache miss
+        'popular_posts': Deferred(lambda: trending_posts(5)),
+        'category_posts': category_posts,
+    }
+
+def category_page(name, page=1):
+    return public_reader().paginate(published_posts().where(Post.category == name), page, CATEGORY_PER_PAGE)
+
+def public_reader():
+    """The async reader when ASYNC_READS is on, else the request's session"""
+    return current_app.extensions.get('async_reads') or session_reader
+
+def published_posts():
+    return select(Post).where(Post.published == True).order_by(desc(Post.created_at))
+
+def trending_posts(limit=5):
+    """Published posts with the highest time-decayed view score
+
+    Topped up with the newest posts while there is little view history.
+    """
+    reader = public_reader()
+    ids, ranked, newest = trending_statements(limit)
+    ranked, newest = reader.gather(reader.all(ranked), reader.all(newest))
+    return rank_trending(ids, ranked, newest, limit)
+
+def trending_statements(limit):
+    """Top trending ids plus the two independent queries trending_posts needs"""
+    # Ask for extra ids in case some were unpublished since they were scored
+    ids = trending.top_ids(limit * 2)
+    ranked = select(Post).where(Post.id.in_(ids), Post.published == True)
+    return ids, ranked, published_posts().limit(limit)
+
+def rank_trending(ids, ranked, newest, limit):
+    posts = {post.id: post for post in ranked}
+    result = [posts[post_id] for post_id in ids if post_id in posts][:limit]
+    result += [post for post in newest if post.id not in posts][:limit - len(result)]
+    return result
+
+@bp.route('/yangilik/<slug>')
+@use_read_replica
 def post_detail(slug):
     """Individual post page"""
     try:
-        post = Post.query.filter_by(slug=slug, published=True).first_or_404()
-        
-        # Increment views
-        post.increment_views()
-        
-        # Get related posts
-        related_posts = Post.query.filter(
-            Post.category == post.category,
-            Post.id != post.id,
-            Post.published == True
-        ).order_by(desc(Post.created_at)).limit(4).all()
-        
-        # Get popular posts for sidebar
-        popular_posts = Post.query.filter_by(published=True).order_by(desc(Post.views)).limit(5).all()
+        post = find_post(slug)
+        if post is None:
+            # Freshly published posts may not have reached the replica yet
+            read_from_primary()
+            post = find_post(slug)
+            if post is None:
+                abort(404)
         
-        # Get category posts for sidebar
-        category_posts = Post.query.filter(
-            Post.category == post.category,
-            Post.id != post.id,
-            Post.published == True
-        ).order_by(desc(Post.created_at)).limit(3).all()
+        count_view(post, get_current_language(), request.referrer)
         
         # Handle language parameter
         lang = request.args.get('lang')
         if lang in ['uz', 'ru']:
             session['language'] = lang
         
-        return render_template('post.html',
-                             post=post,
-                             related_posts=related_posts,
-                             popular_posts=popular_posts,
-                             category_posts=category_posts,
-                             config=Config)
+        response = make_response(render_template('post.html', config=Config, **post_context(post)))
+        if lang in ['uz', 'ru']:
+            remember_language(response, lang)
+        return response
     except Exception as e:
         logging.error(f"Error loading post {slug}: {e}")
         abort(404)
 
-@app.route('/kategoriya/<name>')
+def find_post(slug):
+    """A published post by slug, looked up in the archive when posts has no match"""
+    post = Post.query.filter_by(slug=slug, published=True).first()
+    if post is None:
+        post = ArchivedPost.query.filter_by(slug=slug).first()
+    return post
+
+def count_view(post, language, referrer):
+    """Record one article view"""
+    # With the view log enabled posts.views is updated by compaction
+    if Config.VIEW_LOG_ENABLED:
+        view_log.record(post.id, language, classify_referrer(referrer, request.host))
+    else:
+        post.increment_views()
+    trending.record_view(post.id)
+
+@bp.route('/api/view/<int:id>', methods=['POST'])
+def record_view(id):
+    """View beacon sent by statically exported article pages"""
+    post = db.session.get(Post, id) or db.session.get(ArchivedPost, id)
+    if post is None or not post.published:
+        abort(404)
+    language = request.args.get('lang')
+    count_view(post, language if language in ['uz', 'ru'] else get_current_language(),
+               request.get_data(as_text=True)[:500] or None)
+    return '', 204
+
+def remember_language(response, language):
+    """Mirror the language in a plain cookie the web server can read for static pages"""
+    response.set_cookie('lang', language, max_age=365 * 24 * 3600, samesite='Lax')
+    return response
+
+@bp.route('/kategoriya/<name>')
+@use_read_replica
 def category(name):
     """Category page"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = 12
-        
-        posts = Post.query.filter_by(category=name, published=True).order_by(desc(Post.created_at)).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        posts = category_page(name, request.args.get('page', 1, type=int))
         
         return render_template('category.html',
                              posts=posts,
@@ -123,18 +243,48 @@ def category(name):
                              config=Config)
     except Exception as e:
         logging.error(f"Error loading category {name}: {e}")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
-@app.route('/viloyat/<region>')
+@bp.route('/teg/<slug>')
+@use_read_replica
+def tag_posts(slug):
+    """Tag page, paged with a ?before=<post id> cursor"""
+    tag = Tag.query.filter_by(slug=slug).first_or_404()
+    before = request.args.get('before', type=int)
+    posts, next_before = tag_page(tag, before)
+    return render_template('tag.html',
+                         tag=tag,
+                         posts=posts,
+                         before=before,
+                         next_before=next_before,
+                         config=Config)
+
+def tag_page(tag, before=None, per_page=TAG_PER_PAGE):
+    """One page of a tag's published posts, newest first, and the cursor of the next page
+
+    Posts are ordered by id, which follows creation time, so each page is a
+    short backwards walk of the (tag_id, post_id) index however deep it is.
+    """
+    statement = (select(Post).join(post_tags, post_tags.c.post_id == Post.id)
+                 .where(post_tags.c.tag_id == tag.id, Post.published == True)
+                 .order_by(desc(post_tags.c.post_id)).limit(per_page + 1))
+    if before:
+        statement = statement.where(post_tags.c.post_id < before)
+    reader = public_reader()
+    posts, = reader.gather(reader.all(statement))
+    if len(posts) > per_page:
+        return posts[:per_page], posts[per_page - 1].id
+    return posts, None
+
+@bp.route('/viloyat/<region>')
+@use_read_replica
 def region_posts(region):
     """Regional news page"""
     try:
         page = request.args.get('page', 1, type=int)
         per_page = 12
         
-        posts = Post.query.filter_by(region=region, published=True).order_by(desc(Post.created_at)).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        posts = public_reader().paginate(published_posts().where(Post.region == region), page, per_page)
         
         return render_template('region.html',
                              posts=posts,
@@ -142,29 +292,20 @@ def region_posts(region):
                              config=Config)
     except Exception as e:
         logging.error(f"Error loading region {region}: {e}")
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
-@app.route('/qidiruv')
+@bp.route('/qidiruv')
+@use_read_replica
 def search():
     """Search page"""
     try:
         query = request.args.get('q', '').strip()
         page = request.args.get('page', 1, type=int)
-        per_page = 10
         
         if not query:
             return render_template('search.html', posts=None, query='', config=Config)
         
-        # Search in title and content
-        posts = Post.query.filter(
-            Post.published == True,
-            (Post.title_uz.contains(query) | 
-             Post.content_uz.contains(query) |
-             Post.title_ru.contains(query) |
-             Post.content_ru.contains(query))
-        ).order_by(desc(Post.created_at)).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        posts = search_page(query, page, SEARCH_PER_PAGE)
         
         return render_template('search.html',
                              posts=posts,
@@ -174,19 +315,93 @@ def search():
         logging.error(f"Error in search: {e}")
         return render_template('search.html', posts=None, query=query, config=Config)
 
-@app.route('/set-language/<language>')
+def search_page(query, page, per_page):
+    """One page of published and archived posts matching `query`, newest first
+
+    Ids are unique across both tables (archiving moves a row with its id),
+    so the page is picked from a UNION of ids and the rows are loaded from
+    each table afterwards.
+    """
+    def matching(model):
+        # Search in title and content
+        return select(model.id, model.created_at).where(
+            model.title_uz.contains(query) |
+            model.content_uz.contains(query) |
+            model.title_ru.contains(query) |
+            model.content_ru.contains(query)
+        )
+
+    page = max(page, 1)
+    matches = union_all(matching(Post).where(Post.published == True), matching(ArchivedPost)).subquery()
+    reader = public_reader()
+    ids, total = reader.gather(
+        reader.all(select(matches.c.id).order_by(desc(matches.c.created_at), desc(matches.c.id))
+                   .limit(per_page).offset((page - 1) * per_page)),
+        reader.scalar(select(func.count()).select_from(matches)),
+    )
+    hot, cold = reader.gather(
+        reader.all(select(Post).where(Post.id.in_(ids))),
+        reader.all(select(ArchivedPost).where(ArchivedPost.id.in_(ids))),
+    )
+    posts = {post.id: post for post in [*hot, *cold]}
+    items = [posts[post_id] for post_id in ids if post_id in posts]
+    return ResultPagination(page=page, per_page=per_page, error_out=False, items=items, total=total)
+
+@bp.route('/sitemap.xml')
+@use_read_replica
+def sitemap_index():
+    """Sitemap index: the fixed pages plus one sitemap per SITEMAP_CHUNK_SIZE post ids"""
+    reader = public_reader()
+    hot_max, cold_max = reader.gather(reader.scalar(select(func.max(Post.id))),
+                                      reader.scalar(select(func.max(ArchivedPost.id))))
+    chunks = max(hot_max or 0, cold_max or 0) // Config.SITEMAP_CHUNK_SIZE + 1
+    sitemaps = [url_for('main.sitemap_pages')] + [url_for('main.sitemap_posts', chunk=chunk) for chunk in range(chunks)]
+    return sitemap_response('sitemap_index.xml', sitemaps=sitemaps)
+
+@bp.route('/sitemap-pages.xml')
+def sitemap_pages():
+    """Home page and category listings"""
+    urls = [(url_for('main.index'), None)]
+    urls += [(url_for('main.category', name=name), None) for name in Config.UZBEK_CATEGORIES]
+    return sitemap_response('sitemap.xml', urls=urls)
+
+@bp.route('/sitemap-posts-<int:chunk>.xml')
+@use_read_replica
+def sitemap_posts(chunk):
+    """Published and archived posts whose id falls in the chunk"""
+    start = chunk * Config.SITEMAP_CHUNK_SIZE
+    end = start + Config.SITEMAP_CHUNK_SIZE
+    reader = public_reader()
+    hot, cold = reader.gather(
+        reader.all(select(Post).options(load_only(Post.slug, Post.updated_at))
+                   .where(Post.id >= start, Post.id < end, Post.published == True)),
+        reader.all(select(ArchivedPost).options(load_only(ArchivedPost.slug, ArchivedPost.updated_at))
+                   .where(ArchivedPost.id >= start, ArchivedPost.id < end)),
+    )
+    posts = sorted([*hot, *cold], key=lambda post: post.id)
+    return sitemap_response('sitemap.xml', urls=[(post.get_absolute_url(), post.updated_at) for post in posts])
+
+def sitemap_response(template, **context):
+    response = make_response(render_template(template, site_url=Config.SITE_URL.rstrip('/'), **context))
+    response.mimetype = 'application/xml'
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+@bp.route('/set-language/<language>')
 def set_language(language):
     """Set language preference"""
+    response = redirect(request.referrer or url_for('main.index'))
     if language in ['uz', 'ru']:
         session['language'] = language
-    return redirect(request.referrer or url_for('index'))
+        remember_language(response, language)
+    return response
 
 # Admin Routes
-@app.route('/admin/login', methods=['GET', 'POST'])
+@bp.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
     """Admin login page"""
     if current_user.is_authenticated and current_user.is_admin:
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main.admin_dashboard'))
     
     form = LoginForm()
     if form.validate_on_submit():
@@ -194,21 +409,21 @@ def admin_login():
         if user and user.check_password(form.password.data) and user.is_admin:
             login_user(user, remember=form.remember_me.data)
             next_page = request.args.get('next')
-            return redirect(next_page) if next_page else redirect(url_for('admin_dashboard'))
+            return redirect(next_page) if next_page else redirect(url_for('main.admin_dashboard'))
         flash('Noto\'g\'ri foydalanuvchi nomi yoki parol', 'error')
     
     from datetime import datetime
     return render_template('admin/login.html', form=form, config=Config, current_year=datetime.now().year)
 
-@app.route('/admin/logout')
+@bp.route('/admin/logout')
 @login_required
 def admin_logout():
     """Admin logout"""
     logout_user()
     flash('Tizimdan chiqildi', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/admin/')
+@bp.route('/admin/')
 @login_required
 def admin_dashboard():
     """Admin dashboard"""
@@ -217,26 +432,16 @@ def admin_dashboard():
     
     try:
         # Get statistics
-        stats = {
-            'total_posts': Post.query.count(),
-            'published_posts': Post.query.filter_by(published=True).count(),
-            'total_views': db.session.query(func.sum(Post.views)).scalar() or 0,
-            'telegram_sent': Post.query.filter_by(telegram_posted=True).count()
-        }
+        stats = counter_service.dashboard_stats()
         
         # Get recent posts
         recent_posts = Post.query.order_by(desc(Post.created_at)).limit(10).all()
         
         # Check system status
-        gemini_status = True
         telegram_status = True
         
-        try:
-            # Test Gemini
-            test_response = gemini_service.summarize_content("Test content", "uz")
-            gemini_status = bool(test_response)
-        except:
-            gemini_status = False
+        # Gemini health comes from the circuit breaker instead of a live test call
+        gemini_status = gemini_service.available and gemini_service.breaker.state != 'open'
         
         try:
             # Test Telegram
@@ -259,7 +464,7 @@ def admin_dashboard():
                              telegram_status=False,
                              config=Config)
 
-@app.route('/admin/posts')
+@bp.route('/admin/posts')
 @login_required
 def admin_posts():
     """Admin posts list"""
@@ -270,27 +475,81 @@ def admin_posts():
         page = request.args.get('page', 1, type=int)
         per_page = 20
         
-        posts = Post.query.order_by(desc(Post.created_at)).paginate(
+        filters = {key: request.args.get(key, '') for key in ('status', 'category', 'q')}
+        
+        posts = filter_posts(Post.query, filters).order_by(desc(Post.created_at)).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        return render_template('admin/posts.html', posts=posts, config=Config)
+        return render_template('admin/posts.html', posts=posts, filters=filters, statuses=POST_STATUSES,
+                               actions=BULK_ACTIONS, config=Config)
     except Exception as e:
         logging.error(f"Error loading admin posts: {e}")
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main.admin_dashboard'))
+
+@bp.route('/admin/posts/bulk', methods=['POST'])
+@login_required
+def admin_bulk_posts():
+    """Apply one action to selected posts or to every post matching a filter"""
+    if not current_user.is_admin:
+        abort(403)
+    if not csrf_valid():
+        return jsonify({'success': False, 'error': CSRF_ERROR}), 400
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        count = apply_bulk_action(
+            current_app._get_current_object(),
+            data.get('action'),
+            post_ids=data.get('ids'),
+            filters=data.get('filter'),
+            category=data.get('category'),
+            select_all=data.get('all') is True,
+        )
+        return jsonify({'success': True, 'count': count})
+    except (BulkActionError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error applying bulk action: {e}")
+        return jsonify({'success': False, 'error': 'Xatolik yuz berdi'}), 500
 
-@app.route('/admin/post/create', methods=['GET', 'POST'])
+@bp.route('/admin/post/<int:id>/delete', methods=['POST'])
+@login_required
+def admin_delete_post(id):
+    """Delete a single post"""
+    if not current_user.is_admin:
+        abort(403)
+    if not csrf_valid():
+        return jsonify({'success': False, 'error': CSRF_ERROR}), 400
+    
+    try:
+        count = apply_bulk_action(current_app._get_current_object(), 'delete', post_ids=[id])
+        if not count:
+            return jsonify({'success': False, 'error': 'Maqola topilmadi'}), 404
+        return jsonify({'success': True})
+    except Exception as e:
+        logging.error(f"Error deleting post {id}: {e}")
+        return jsonify({'success': False, 'error': 'Xatolik yuz berdi'}), 500
+
+@bp.route('/admin/post/create', methods=['GET', 'POST'])
 @login_required
 def admin_create_post():
     """Create new post"""
     if not current_user.is_admin:
         abort(403)
     
-    form = PostForm()
-    if form.validate_on_submit():
+    # The AI generator opens this page with the generated fields in the query string
+    form = PostForm(data=request.args.to_dict() if request.method == 'GET' else None)
+    submitted = form.validate_on_submit()
+    similar = []
+    if submitted and Config.DEDUP_ENABLED and not form.ignore_duplicates.data:
+        similar = duplicates.similar_posts(duplicates.find_similar(form.title_uz.data, form.content_uz.data))
+        if similar:
+            flash('Yaqinda shunga o\'xshash maqola chiqqan. Baribir saqlash uchun belgini qo\'ying.', 'warning')
+    if submitted and not similar:
         try:
-            post = Post()
-            post.title_uz = form.title_uz.data
+            # Passing the title lets Post.__init__ derive the slug
+            post = Post(title_uz=form.title_uz.data)
             post.title_ru = form.title_ru.data
             post.content_uz = form.content_uz.data
             post.content_ru = form.content_ru.data
@@ -299,33 +558,43 @@ def admin_create_post():
             post.keywords = form.keywords.data
             post.published = form.published.data
             post.featured = form.featured.data
+            post.publish_at = tashkent_to_utc(form.publish_at.data)
             post.author_id = current_user.id
+            post.slug = unique_slug(post.slug)
+            schedule_post(post)
             
             db.session.add(post)
             db.session.commit()
+            link_generation(form.generation_id.data, post.id)
+            if Config.DEDUP_ENABLED:
+                duplicates.add_post(post)
             
             flash('Maqola muvaffaqiyatli yaratildi!', 'success')
+            if post.is_scheduled:
+                flash('Maqola belgilangan vaqtda nashr qilinadi', 'info')
+            elif post.published:
+                posts_published.send(current_app._get_current_object(), posts=[post])
             
             # Send to Telegram if published
             if post.published:
                 try:
-                    telegram_service.send_news_sync(post)
-                    post.telegram_posted = True
-                    db.session.commit()
-                    flash('Telegram kanaliga jo\'natildi!', 'info')
+                    if post.id in telegram_fanout.deliver([post], Config.SITE_URL):
+                        post.telegram_posted = True
+                        db.session.commit()
+                        flash('Telegram kanaliga jo\'natildi!', 'info')
                 except Exception as e:
                     logging.error(f"Failed to send to Telegram: {e}")
                     flash('Telegram jo\'natishda xatolik!', 'warning')
             
-            return redirect(url_for('admin_posts'))
+            return redirect(url_for('main.admin_posts'))
         except Exception as e:
             logging.error(f"Error creating post: {e}")
             flash('Maqola yaratishda xatolik!', 'error')
             db.session.rollback()
     
-    return render_template('admin/create_post.html', form=form, config=Config)
+    return render_template('admin/create_post.html', form=form, duplicates=similar, config=Config)
 
-@app.route('/admin/post/<int:id>/edit', methods=['GET', 'POST'])
+@bp.route('/admin/post/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
 def admin_edit_post(id):
     """Edit post"""
@@ -334,13 +603,51 @@ def admin_edit_post(id):
     
     post = Post.query.get_or_404(id)
     form = PostForm(obj=post)
+    if request.method == 'GET':
+        form.publish_at.data = utc_to_tashkent(post.publish_at)
     
     if form.validate_on_submit():
         try:
-            form.populate_obj(post)
+            # Re-translate only the paragraphs that changed since the last translation,
+            # before the post is modified so no write is pending during the Gemini call
+            translation = None
+            if form.retranslate.data:
+                with usage_scope(post_id=post.id):
+                    translation = gemini_service.translate_to_russian(form.title_uz.data, form.content_uz.data)
+            
+            # Assigned like in admin_create_post: populate_obj would also copy the
+            # retranslate, generation_id and ignore_duplicates form-only fields
+            was_published = post.published
+            post.title_uz = form.title_uz.data
+            post.title_ru = form.title_ru.data
+            post.content_uz = form.content_uz.data
+            post.content_ru = form.content_ru.data
+            post.category = form.category.data
+            post.region = form.region.data if form.region.data else None
+            post.keywords = form.keywords.data
+            post.published = form.published.data
+            post.featured = form.featured.data
+            post.publish_at = tashkent_to_utc(form.publish_at.data)
+            schedule_post(post)
+            
+            if form.retranslate.data:
+                if translation and translation.get('content_ru'):
+                    post.title_ru = translation.get('title_ru') or post.title_ru
+                    post.content_ru = translation['content_ru']
+                else:
+                    flash('Tarjima qilib bo\'lmadi', 'warning')
+            
             db.session.commit()
+            if Config.DEDUP_ENABLED:
+                duplicates.add_post(post)
             flash('Maqola yangilandi!', 'success')
-            return redirect(url_for('admin_posts'))
+            if post.is_scheduled:
+                flash('Maqola belgilangan vaqtda nashr qilinadi', 'info')
+            elif post.published and not was_published:
+                posts_published.send(current_app._get_current_object(), posts=[post])
+            else:
+                posts_changed.send(current_app._get_current_object(), action='edit', post_ids=[post.id])
+            return redirect(url_for('main.admin_posts'))
         except Exception as e:
             logging.error(f"Error updating post: {e}")
             flash('Yangilashda xatolik!', 'error')
@@ -348,7 +655,44 @@ def admin_edit_post(id):
     
     return render_template('admin/edit_post.html', form=form, post=post, config=Config)
 
-@app.route('/admin/ai-generator')
+def unique_slug(slug):
+    """Append -2, -3, ... to a slug that is already taken"""
+    base = slug or 'maqola'
+    candidate, suffix = base, 1
+    while (Post.query.filter_by(slug=candidate).first() is not None
+           or ArchivedPost.query.filter_by(slug=candidate).first() is not None):
+        suffix += 1
+        candidate = f"{base}-{suffix}"
+    return candidate
+
+CSRF_ERROR = "Sahifa eskirgan, uni yangilab qayta urinib ko'ring"
+
+def csrf_valid():
+    """Check the CSRF token of a POST without a FlaskForm, as validate_on_submit would
+
+    The token comes from the csrf_token form field or the X-CSRFToken header
+    sent by the admin scripts.
+    """
+    if not current_app.config.get('WTF_CSRF_ENABLED', True):
+        return True
+    try:
+        validate_csrf(request.form.get('csrf_token') or request.headers.get('X-CSRFToken'))
+    except ValidationError:
+        return False
+    return True
+
+def schedule_post(post):
+    """Hold back a post whose publish_at is in the future for the scheduler
+
+    A publish_at in the past is dropped, otherwise the scheduler would
+    publish a post that was just unpublished again.
+    """
+    if post.publish_at and post.publish_at > datetime.utcnow():
+        post.published = False
+    else:
+        post.publish_at = None
+
+@bp.route('/admin/ai-generator')
 @login_required
 def admin_ai_generator():
     """AI content generator"""
@@ -357,7 +701,7 @@ def admin_ai_generator():
     
     return render_template('admin/ai_generator.html', config=Config)
 
-@app.route('/admin/generate-content', methods=['POST'])
+@bp.route('/admin/generate-content', methods=['POST'])
 @login_required
 def admin_generate_content():
     """Generate content with AI"""
@@ -371,83 +715,476 @@ def admin_generate_content():
         
         if not topic:
             return jsonify({'error': 'Mavzu kiritilmagan'}), 400
+        similar = topic_duplicates(topic, data.get('force'))
+        if similar:
+            return jsonify(similar), 409
         
         # Generate content
-        content = gemini_service.generate_uzbek_news(topic, keywords)
-        
-        if not content:
-            return jsonify({'error': 'Kontent yaratib bo\'lmadi'}), 500
-        
-        # Generate Telegram post
-        telegram_content = gemini_service.generate_telegram_post(
-            content.get('title', ''), 
-            content.get('content', '')[:200]
-        )
-        
-        # Translate to Russian
-        translation = gemini_service.translate_to_russian(
-            content.get('title', ''), 
-            content.get('content', '')
-        )
-        
-        result = {
-            'title_uz': content.get('title', ''),
-            'content_uz': content.get('content', ''),
-            'meta_title': content.get('meta_title', ''),
-            'meta_description': content.get('meta_description', ''),
-            'keywords': content.get('keywords', ''),
-            'title_ru': translation.get('title_ru', ''),
-            'content_ru': translation.get('content_ru', ''),
-            'telegram_content': telegram_content
-        }
+        generation_id = new_generation_id()
+        with usage_scope(generation_id=generation_id):
+            if Config.GEMINI_SINGLE_CALL:
+                article = gemini_service.generate_bilingual_article(topic, keywords)
+                if not article:
+                    return jsonify({'error': 'Kontent yaratib bo\'lmadi'}), 500
+                result = article_result(article)
+            else:
+                content = gemini_service.generate_uzbek_news(topic, keywords)
+                
+                if not content:
+                    return jsonify({'error': 'Kontent yaratib bo\'lmadi'}), 500
+                
+                result = complete_generated_content(content)
         
+        result['generation_id'] = generation_id
         return jsonify(result)
         
     except Exception as e:
         logging.error(f"Error generating content: {e}")
         return jsonify({'error': f'Xatolik: {str(e)}'}), 500
 
-@app.route('/admin/telegram')
+@bp.route('/admin/generate-content/stream', methods=['POST'])
+@login_required
+def admin_generate_content_stream():
+    """Stream AI content generation to the editor as Server-Sent Events"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    data = request.get_json() or {}
+    topic = data.get('topic', '')
+    keywords = data.get('keywords', '')
+    
+    if not topic:
+        return jsonify({'error': 'Mavzu kiritilmagan'}), 400
+    if not gemini_service.available:
+        return jsonify({'error': 'Gemini xizmati sozlanmagan'}), 503
+    similar = topic_duplicates(topic, data.get('force'))
+    if similar:
+        return jsonify(similar), 409
+    
+    generation_id = new_generation_id()
+    
+    def events():
+        with usage_scope(generation_id=generation_id):
+            yield from generate_events()
+    
+    def generate_events():
+        if Config.GEMINI_SINGLE_CALL:
+            yield from single_call_events()
+            return
+        
+        buffer = ''
+        sent = {'title': 0, 'content': 0}
+        try:
+            for chunk in gemini_service.stream_uzbek_news(topic, keywords):
+                buffer += chunk
+                yield from partial_field_events(buffer, sent)
+            
+            try:
+                content = parse_json_response(buffer)
+            except ValueError as e:
+                logging.error(f"Unusable streamed article for {topic}: {e}")
+                content = None
+            if not content or not content.get('title') or not content.get('content'):
+                yield sse_event('error', {'error': 'Kontent yaratib bo\'lmadi'})
+                return
+            
+            yield sse_event('status', {'message': 'Tarjima va Telegram posti tayyorlanmoqda...'})
+            yield sse_event('result', dict(complete_generated_content(content), generation_id=generation_id))
+        except GeneratorExit:
+            logging.info(f"Streaming generation aborted by client: {topic}")
+            raise
+        except Exception as e:
+            logging.error(f"Error streaming content: {e}")
+            yield sse_event('error', {'error': f'Xatolik: {str(e)}'})
+    
+    def single_call_events():
+        buffer = ''
+        sent = {'title': 0, 'content': 0}
+        try:
+            for chunk in gemini_service.stream_bilingual_article(topic, keywords):
+                buffer += chunk
+                yield from partial_field_events(buffer, sent, suffix='_uz')
+            
+            try:
+                article = gemini_service.parse_article(buffer)
+            except ValueError as e:
+                logging.error(f"Invalid structured article: {e}")
+                yield sse_event('error', {'error': 'Kontent yaratib bo\'lmadi'})
+                return
+            
+            yield sse_event('result', dict(article_result(article), generation_id=generation_id))
+        except GeneratorExit:
+            logging.info(f"Streaming generation aborted by client: {topic}")
+            raise
+        except Exception as e:
+            logging.error(f"Error streaming content: {e}")
+            yield sse_event('error', {'error': f'Xatolik: {str(e)}'})
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def topic_duplicates(topic, force=False):
+    """Error payload listing recent posts that already cover a generator topic"""
+    if not Config.DEDUP_ENABLED or force:
+        return None
+    similar = duplicates.similar_posts(duplicates.find_similar_topic(topic))
+    if not similar:
+        return None
+    return {
+        'error': 'Bu mavzuda yaqinda maqola chiqqan',
+        'duplicates': [{'id': post.id, 'title': post.title_uz, 'similarity': round(similarity, 2),
+                        'url': url_for('main.admin_edit_post', id=post.id)} for post, similarity in similar],
+    }
+
+def partial_field_events(buffer, sent, suffix=''):
+    """Emit the newly streamed text of the title and content fields as delta events"""
+    for field in sent:
+        value = gemini_service.extract_partial_field(buffer, field + suffix)
+        if value and len(value) > sent[field]:
+            yield sse_event('delta', {'field': field, 'text': value[sent[field]:]})
+            sent[field] = len(value)
+
+@bp.route('/admin/ai-generator/batch', methods=['GET', 'POST'])
+@login_required
+def admin_batch_generate():
+    """Generate drafts for a list of topics, streaming progress as SSE"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    if request.method == 'GET':
+        return render_template('admin/batch_generator.html', config=Config)
+    
+    data = request.get_json() or {}
+    items = parse_batch_lines(data.get('topics', ''),
+                              data.get('category') or Config.UZBEK_CATEGORIES[0],
+                              data.get('region') or None)
+    if not items:
+        return jsonify({'error': 'Mavzular kiritilmagan'}), 400
+    if not gemini_service.available:
+        return jsonify({'error': 'Gemini xizmati sozlanmagan'}), 503
+    if Config.DEDUP_ENABLED and not data.get('force'):
+        # Covered topics are reported but never sent to Gemini
+        for item in items:
+            similar = duplicates.similar_posts(duplicates.find_similar_topic(item['topic'], limit=1))
+            if similar:
+                item['duplicate_of'] = similar[0][0].title_uz
+    
+    app = current_app._get_current_object()
+    concurrency = min(int(data.get('concurrency') or app.config['GEMINI_BATCH_CONCURRENCY']), 10)
+    generator = BatchGenerator(
+        gemini_service,
+        concurrency=concurrency,
+        rpm=app.config['GEMINI_RPM'],
+        tpm=app.config['GEMINI_TPM'],
+        tokens_per_request=app.config['GEMINI_TOKENS_PER_ARTICLE'],
+        app=app,
+    )
+    author_id = current_user.id
+    
+    def events():
+        started = time.perf_counter()
+        results = []
+        yield sse_event('status', {'message': f'{len(items)} ta mavzu navbatga qo\'yildi'})
+        try:
+            # A disconnect raises GeneratorExit at a yield; closing the batch cancels what is left
+            with closing(generator.iter_results(items)) as stream:
+                for result in stream:
+                    results.append(result)
+                    yield sse_event('item', {
+                        'index': result['index'],
+                        'topic': result['topic'],
+                        'ok': result['ok'],
+                        'error': result['error'],
+                        'latency_ms': result['latency_ms'],
+                        'waited_ms': result['waited_ms'],
+                        'title': result['content']['title_uz'] if result['ok'] else None,
+                    })
+            
+            posts = save_drafts(results, author_id)
+            if Config.DEDUP_ENABLED:
+                duplicates.add_posts(posts)
+            summary = summarize_results(results, time.perf_counter() - started)
+            summary['posts'] = [{'id': post.id, 'title': post.title_uz,
+                                 'edit_url': url_for('main.admin_edit_post', id=post.id)} for post in posts]
+            yield sse_event('done', summary)
+        except Exception as e:
+            logging.error(f"Error in batch generation: {e}")
+            db.session.rollback()
+            yield sse_event('error', {'error': f'Xatolik: {str(e)}'})
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def complete_generated_content(content):
+    """Add the Telegram post and Russian translation to a generated article"""
+    # Generate Telegram post
+    telegram_content = gemini_service.generate_telegram_post(
+        content.get('title', ''), 
+        content.get('content', '')[:200]
+    )
+    
+    # Translate to Russian
+    translation = gemini_service.translate_to_russian(
+        content.get('title', ''), 
+        content.get('content', '')
+    ) or {}
+    
+    return {
+        'title_uz': content.get('title', ''),
+        'content_uz': content.get('content', ''),
+        'meta_title': content.get('meta_title', ''),
+        'meta_description': content.get('meta_description', ''),
+        'keywords': content.get('keywords', ''),
+        'title_ru': translation.get('title_ru', ''),
+        'content_ru': translation.get('content_ru', ''),
+        'telegram_content': telegram_content
+    }
+
+def article_result(article):
+    """Editor payload for a single-call BilingualArticle"""
+    return {
+        'title_uz': article.title_uz,
+        'content_uz': article.content_uz,
+        'meta_title': article.meta_title,
+        'meta_description': article.meta_description,
+        'keywords': article.keywords,
+        'title_ru': article.title_ru,
+        'content_ru': article.content_ru,
+        'telegram_content': article.telegram_uz
+    }
+
+def sse_event(event, data):
+    """Format a Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@bp.route('/admin/api/gemini-metrics')
+@login_required
+def admin_gemini_metrics():
+    """Gemini circuit breaker state and call counters"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    return jsonify(gemini_service.metrics())
+
+@bp.route('/admin/ai-usage')
+@login_required
+def admin_ai_usage():
+    """Gemini token usage, cost and latency per method and per article"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    days = min(max(request.args.get('days', 7, type=int), 1), Config.GEMINI_USAGE_RETENTION_DAYS)
+    since = datetime.utcnow() - timedelta(days=days)
+    try:
+        methods = usage_service.method_report(since)
+        articles = usage_service.article_report(since)
+        daily = usage_service.daily_report(days)
+    except Exception as e:
+        logging.error(f"Error loading AI usage report: {e}")
+        methods, articles, daily = [], [], []
+    
+    return render_template('admin/ai_usage.html', methods=methods, articles=articles, daily=daily,
+                           days=days, config=Config)
+
+@bp.route('/admin/analytics')
+@login_required
+def admin_analytics():
+    """View charts built from the hourly and daily rollups"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    days = min(max(request.args.get('days', 7, type=int), 1), 90)
+    try:
+        hourly = analytics_service.hourly_series(48)
+        daily = analytics_service.daily_series(days)
+        languages = analytics_service.breakdown('language', days)
+        referrers = analytics_service.breakdown('referrer', days)
+        top = analytics_service.top_posts(days)
+    except Exception as e:
+        logging.error(f"Error loading analytics: {e}")
+        hourly, daily, languages, referrers, top = [], [], {}, {}, []
+    
+    charts = {
+        'hourly': {'labels': [utc_to_tashkent(hour).strftime('%d.%m %H:00') for hour, _ in hourly],
+                   'values': [views for _, views in hourly]},
+        'daily': {'labels': [day.strftime('%d.%m') for day, _ in daily],
+                  'values': [views for _, views in daily]},
+        'languages': languages,
+        'referrers': referrers,
+    }
+    return render_template('admin/analytics.html', charts=charts, top_posts=top, days=days,
+                           total_views=sum(views for _, views in daily), config=Config)
+
+@bp.route('/admin/profiling')
+@login_required
+def admin_profiling():
+    """Request profiler and memory snapshot controls with the saved result files"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    endpoints = sorted(rule.endpoint for rule in current_app.url_map.iter_rules() if rule.endpoint != 'static')
+    profile_session = current_app.extensions['profiler'].current()
+    return render_template('admin/profiling.html',
+                           profile_session=profile_session,
+                           remaining=int(profile_session['until'] - time.time()) if profile_session else 0,
+                           modes=PROFILE_MODES,
+                           memory_tracing=current_app.extensions['memory_tracer'].tracing,
+                           endpoints=endpoints,
+                           files=list_profiles(current_app.config['PROFILING_DIR']),
+                           pid=os.getpid(),
+                           config=Config)
+
+@bp.route('/admin/profiling/start', methods=['POST'])
+@login_required
+def admin_profiling_start():
+    """Profile a share of the requests to one endpoint on every worker"""
+    if not current_user.is_admin:
+        abort(403)
+    if not csrf_valid():
+        flash(CSRF_ERROR, 'error')
+        return redirect(url_for('main.admin_profiling'))
+    
+    try:
+        current_app.extensions['profiler'].start(
+            request.form['endpoint'],
+            rate=request.form.get('rate', 0.1, type=float),
+            duration=min(request.form.get('duration', 300, type=int), 3600),
+            mode=request.form.get('mode', 'stack'),
+            max_requests=request.form.get('max_requests', 500, type=int),
+        )
+        flash('Profil yozish boshlandi', 'success')
+    except (KeyError, ValueError) as e:
+        flash(f'Profilni boshlab bo\'lmadi: {e}', 'error')
+    return redirect(url_for('main.admin_profiling'))
+
+@bp.route('/admin/profiling/stop', methods=['POST'])
+@login_required
+def admin_profiling_stop():
+    """End the profiling session on every worker"""
+    if not current_user.is_admin:
+        abort(403)
+    if not csrf_valid():
+        flash(CSRF_ERROR, 'error')
+        return redirect(url_for('main.admin_profiling'))
+    
+    current_app.extensions['profiler'].stop()
+    flash('Profil yozish to\'xtatildi', 'info')
+    return redirect(url_for('main.admin_profiling'))
+
+@bp.route('/admin/profiling/memory/<action>', methods=['POST'])
+@login_required
+def admin_profiling_memory(action):
+    """Start or stop tracemalloc in this worker, or save a snapshot with a diff against the last one"""
+    if not current_user.is_admin:
+        abort(403)
+    if not csrf_valid():
+        flash(CSRF_ERROR, 'error')
+        return redirect(url_for('main.admin_profiling'))
+    
+    tracer = current_app.extensions['memory_tracer']
+    try:
+        if action == 'start':
+            tracer.start()
+            flash(f'Xotira kuzatuvi yoqildi (jarayon {os.getpid()})', 'success')
+        elif action == 'snapshot':
+            name = tracer.snapshot()
+            flash(f'Snapshot saqlandi: {name}', 'success')
+        elif action == 'stop':
+            tracer.stop()
+            flash('Xotira kuzatuvi o\'chirildi', 'info')
+        else:
+            abort(404)
+    except RuntimeError as e:
+        flash(str(e), 'error')
+    return redirect(url_for('main.admin_profiling'))
+
+@bp.route('/admin/profiling/files/<path:name>')
+@login_required
+def admin_profiling_file(name):
+    """Download a profile, snapshot or memory report"""
+    if not current_user.is_admin:
+        abort(403)
+    
+    return send_from_directory(current_app.config['PROFILING_DIR'], name, as_attachment=True)
+
+@bp.route('/admin/telegram')
 @login_required
 def admin_telegram():
     """Telegram management"""
     if not current_user.is_admin:
         abort(403)
     
-    return render_template('admin/telegram.html', config=Config)
+    deliveries = (db.session.query(TelegramDelivery, Post.title_uz)
+                  .outerjoin(Post, Post.id == TelegramDelivery.post_id)
+                  .order_by(desc(TelegramDelivery.updated_at)).limit(50).all())
+    return render_template('admin/telegram.html',
+                         channels=telegram_fanout.registry.channels,
+                         deliveries=deliveries,
+                         telegram_available=telegram_fanout.available,
+                         config=Config)
+
+@bp.route('/admin/telegram/retry', methods=['POST'])
+@login_required
+def admin_telegram_retry():
+    """Resend posts whose delivery failed in the last day to the chats that missed them"""
+    if not current_user.is_admin:
+        abort(403)
+    if not csrf_valid():
+        flash(CSRF_ERROR, 'error')
+        return redirect(url_for('main.admin_telegram'))
+    
+    since = datetime.utcnow() - timedelta(days=1)
+    post_ids = [post_id for (post_id,) in db.session.query(TelegramDelivery.post_id).filter(
+        TelegramDelivery.status == 'failed', TelegramDelivery.updated_at >= since).distinct()]
+    posts = Post.query.filter(Post.id.in_(post_ids), Post.published == True).all()
+    sent = telegram_fanout.deliver(posts, Config.SITE_URL)
+    for post in posts:
+        if post.id in sent:
+            post.telegram_posted = True
+    db.session.commit()
+    flash(f'{len(posts)} ta maqola qayta yuborildi', 'info')
+    return redirect(url_for('main.admin_telegram'))
 
 # Context processors
-@app.context_processor
+# Built once; the context processor runs on every render
+TEMPLATE_UTILITIES = {
+    'moment': datetime.now,
+    'config': Config,
+    'current_language': get_current_language,
+    'format_uzbek_date': format_uzbek_date,
+    'create_excerpt': create_excerpt,
+    'csrf_token': generate_csrf
+}
+
+@bp.app_context_processor
 def utility_processor():
     """Add utility functions to templates"""
-    from datetime import datetime
-    return {
-        'moment': lambda: datetime.now(),  # Simple datetime function
-        'config': Config,
-        'current_language': get_current_language,
-        'format_uzbek_date': format_uzbek_date,
-        'create_excerpt': create_excerpt
-    }
+    return TEMPLATE_UTILITIES
 
 # Error handlers
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     return render_template('errors/404.html', config=Config), 404
 
-@app.errorhandler(403)
+@bp.app_errorhandler(403)
 def forbidden(error):
     return render_template('errors/403.html', config=Config), 403
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return render_template('errors/500.html', config=Config), 500
 
 # Template filters
-@app.template_filter('uzbek_date')
+@bp.app_template_filter('uzbek_date')
 def uzbek_date_filter(date):
     return format_uzbek_date(date)
 
-@app.template_filter('excerpt')
+@bp.app_template_filter('tashkent_time')
+def tashkent_time_filter(date):
+    local = utc_to_tashkent(date)
+    return local.strftime('%d.%m.%Y %H:%M') if local else ''
+
+@bp.app_template_filter('excerpt')
 def excerpt_filter(content, length=150):
     return create_excerpt(content, length)
\ No newline at end of file
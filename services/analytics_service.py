@@ -0,0 +1,173 @@
+import os
+import socket
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+
+def compact_view_log(view_log, max_segments=200, hourly_retention_days=90):
+    """Fold sealed view log segments into the hourly and daily rollups
+
+    Segments are claimed by renaming under the view log's directory lock, so
+    overlapping runs never read the same file. Hourly counts are added to
+    existing rows, the affected days are rebuilt from the hourly table, the
+    per-post totals are added to posts.views (or archived_posts.views) and the
+    segment names are recorded in view_log_segments, all in one transaction;
+    the files are deleted after it commits, and a claimed file whose name is
+    already recorded is deleted without being counted again.
+    Returns (segments, views) processed.
+    """
+    from app import db
+    from models.analytics import ViewStatHourly, ViewStatDaily, ViewLogSegment
+    from models.archived_post import ArchivedPost
+    from models.post import Post
+    from utils.database import write_engine
+
+    with view_log.compaction_lock() as locked:
+        if not locked:
+            logging.info("View log compaction is already running")
+            return 0, 0
+        paths = view_log.claim(max_segments)
+        if not paths:
+            return 0, 0
+
+        segments = ViewLogSegment.__table__
+        host = socket.gethostname()
+        names = {path: f"{host}:{view_log.segment_name(path)}" for path in paths}
+        with write_engine(db).connect() as connection:
+            done = set(connection.execute(
+                select(segments.c.name).where(segments.c.name.in_(list(names.values())))).scalars())
+        if done:
+            _remove_segments([path for path in paths if names[path] in done])
+            paths = [path for path in paths if names[path] not in done]
+
+        hourly_counts = Counter()
+        post_counts = Counter()
+        for path in paths:
+            for post_id, when, language, referrer in view_log.read(path):
+                hour = datetime.utcfromtimestamp(when - when % 3600)
+                hourly_counts[(hour, post_id, language, referrer)] += 1
+                post_counts[post_id] += 1
+
+        hourly = ViewStatHourly.__table__
+        daily = ViewStatDaily.__table__
+        posts = Post.__table__
+        archived = ArchivedPost.__table__
+        hours = sorted({key[0] for key in hourly_counts})
+        days = sorted({hour.date() for hour in hours})
+
+        with write_engine(db).begin() as connection:
+            if hourly_counts:
+                _fold_counts(connection, hourly, daily, (posts, archived), hourly_counts, post_counts, hours, days)
+
+            now = datetime.utcnow()
+            cutoff = now - timedelta(days=hourly_retention_days)
+            connection.execute(delete(hourly).where(hourly.c.hour < cutoff))
+
+            if paths:
+                connection.execute(insert(segments), [{'name': names[path], 'compacted_at': now} for path in paths])
+            # The names only have to outlive the files they guard
+            connection.execute(delete(segments).where(segments.c.compacted_at < cutoff))
+
+        _remove_segments(paths)
+
+    views = sum(post_counts.values())
+    logging.info(f"Compacted {len(paths)} view log segments ({views} views)")
+    return len(paths), views
+
+def _fold_counts(connection, hourly, daily, post_tables, hourly_counts, post_counts, hours, days):
+    existing = {
+        (row.hour, row.post_id, row.language, row.referrer): row.id
+        for row in connection.execute(
+            select(hourly.c.id, hourly.c.hour, hourly.c.post_id, hourly.c.language, hourly.c.referrer)
+            .where(hourly.c.hour.in_(hours))
+        )
+    }
+    updates = [{'row_id': existing[key], 'n': count} for key, count in hourly_counts.items() if key in existing]
+    inserts = [{'hour': key[0], 'post_id': key[1], 'language': key[2], 'referrer': key[3], 'views': count}
+               for key, count in hourly_counts.items() if key not in existing]
+    if updates:
+        connection.execute(
+            update(hourly).where(hourly.c.id == bindparam('row_id')).values(views=hourly.c.views + bindparam('n')),
+            updates
+        )
+    if inserts:
+        connection.execute(insert(hourly), inserts)
+
+    # Rebuild the touched days from the hourly rows
+    start = datetime.combine(days[0], datetime.min.time())
+    end = datetime.combine(days[-1], datetime.min.time()) + timedelta(days=1)
+    day_counts = Counter()
+    for row in connection.execute(
+        select(hourly.c.hour, hourly.c.post_id, hourly.c.views)
+        .where(hourly.c.hour >= start, hourly.c.hour < end)
+    ):
+        if row.hour.date() in days:
+            day_counts[(row.hour.date(), row.post_id)] += row.views
+    connection.execute(delete(daily).where(daily.c.day.in_(days)))
+    connection.execute(insert(daily), [{'day': day, 'post_id': post_id, 'views': views}
+                                       for (day, post_id), views in day_counts.items()])
+
+    # Keep the cumulative counter in step without touching updated_at; a
+    # post is in exactly one of the two tables, so one of the updates is a no-op
+    for table in post_tables:
+        connection.execute(
+            update(table).where(table.c.id == bindparam('post_id')).values(
+                views=func.coalesce(table.c.views, 0) + bindparam('n'),
+                updated_at=table.c.updated_at,
+            ),
+            [{'post_id': post_id, 'n': count} for post_id, count in post_counts.items()]
+        )
+
+def _remove_segments(paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            logging.error(f"Failed to remove compacted view log {path}: {e}")
+
+def hourly_series(hours=48):
+    """[(hour, views)] for the last `hours` hours, zero-filled"""
+    from app import db
+    from models.analytics import ViewStatHourly
+
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    since = now - timedelta(hours=hours - 1)
+    counts = dict(db.session.query(ViewStatHourly.hour, func.sum(ViewStatHourly.views))
+                  .filter(ViewStatHourly.hour >= since).group_by(ViewStatHourly.hour).all())
+    return [(since + timedelta(hours=i), int(counts.get(since + timedelta(hours=i), 0))) for i in range(hours)]
+
+def daily_series(days=30):
+    """[(day, views)] for the last `days` days, zero-filled"""
+    from app import db
+    from models.analytics import ViewStatDaily
+
+    today = datetime.utcnow().date()
+    since = today - timedelta(days=days - 1)
+    counts = dict(db.session.query(ViewStatDaily.day, func.sum(ViewStatDaily.views))
+                  .filter(ViewStatDaily.day >= since).group_by(ViewStatDaily.day).all())
+    return [(since + timedelta(days=i), int(counts.get(since + timedelta(days=i), 0))) for i in range(days)]
+
+def breakdown(column_name, days=7):
+    """{value: views} by 'language' or 'referrer' over the last `days` days"""
+    from app import db
+    from models.analytics import ViewStatHourly
+
+    column = getattr(ViewStatHourly, column_name)
+    since = datetime.utcnow() - timedelta(days=days)
+    return {value: int(views) for value, views in
+            db.session.query(column, func.sum(ViewStatHourly.views))
+            .filter(ViewStatHourly.hour >= since).group_by(column).all()}
+
+def top_posts(days=7, limit=10):
+    """[(post, views)] with the most views over the last `days` days"""
+    from app import db
+    from models.analytics import ViewStatDaily
+    from models.post import Post
+
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    total = func.sum(ViewStatDaily.views).label('total')
+    return db.session.query(Post, total).join(Post, Post.id == ViewStatDaily.post_id).filter(
+        ViewStatDaily.day >= since
+    ).group_by(Post.id).order_by(total.desc()).limit(limit).all()
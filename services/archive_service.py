@@ -0,0 +1,100 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select, text
+
+from signals import posts_changed
+
+def archive_candidates(older_than_days, max_views):
+    """Ids of published posts older than `older_than_days` with fewer than `max_views` views"""
+    from models.post import Post
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    return (select(Post.id)
+            .where(Post.published == True, Post.created_at < cutoff, func.coalesce(Post.views, 0) < max_views)
+            .order_by(Post.id))
+
+def reuses_ids(connection):
+    """True for a SQLite posts table created without AUTOINCREMENT
+
+    SQLite then gives a new post max(id) + 1, which can be the id of an
+    archived post once every newer post is archived or deleted. Existing
+    databases keep their table; rebuild it with AUTOINCREMENT (create the new
+    table, copy the rows, drop, rename) during a maintenance window.
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+    sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'posts'")).scalar()
+    return sql is not None and 'AUTOINCREMENT' not in sql.upper()
+
+def archive_posts(app, db, older_than_days, max_views, batch_size=500, dry_run=False):
+    """Move old, rarely read posts from posts to archived_posts; returns the ids moved
+
+    Each batch is copied and deleted in one transaction on the writer, so a
+    post is always in exactly one table. The posts triggers take archived
+    posts out of the dashboard counters and tag counts, and their tag links
+    go with them; view history and Telegram deliveries stay keyed by id, which
+    is why ids must not be reused (see reuses_ids).
+    """
+    from models.archived_post import ArchivedPost
+    from models.post import Post
+    from utils.database import write_engine
+
+    candidates = archive_candidates(older_than_days, max_views)
+    if dry_run:
+        return list(db.session.execute(candidates).scalars())
+
+    posts = Post.__table__
+    archive = ArchivedPost.__table__
+    names = [column.name for column in posts.columns]
+    with write_engine(db).connect() as connection:
+        if reuses_ids(connection):
+            logging.warning("posts has no AUTOINCREMENT: new posts may reuse archived ids")
+    moved, last_id = [], 0
+    while True:
+        with write_engine(db).begin() as connection:
+            ids = list(connection.execute(candidates.where(Post.id > last_id).limit(batch_size)).scalars())
+            if not ids:
+                break
+            connection.execute(insert(archive).from_select(
+                names + ['archived_at'],
+                select(*[posts.c[name] for name in names], literal(datetime.utcnow(), archive.c.archived_at.type))
+                .where(posts.c.id.in_(ids))
+            ))
+            connection.execute(delete(posts).where(posts.c.id.in_(ids)))
+        moved += ids
+        last_id = ids[-1]
+
+    if moved:
+        logging.info(f"Archived {len(moved)} posts")
+        posts_changed.send(app, action='archive', post_ids=moved)
+    return moved
+
+def restore_posts(app, db, post_ids):
+    """Move archived posts back into posts and re-tag them; returns the ids restored"""
+    from models.archived_post import ArchivedPost
+    from models.post import Post
+    from services import tag_service
+    from utils.database import write_engine
+
+    posts = Post.__table__
+    archive = ArchivedPost.__table__
+    names = [column.name for column in posts.columns]
+    post_ids = [int(post_id) for post_id in post_ids]
+    with write_engine(db).begin() as connection:
+        ids = list(connection.execute(select(archive.c.id).where(archive.c.id.in_(post_ids))).scalars())
+        if not ids:
+            return []
+        taken = list(connection.execute(select(posts.c.id).where(posts.c.id.in_(ids))).scalars())
+        if taken:
+            raise ValueError(f"Post ids {taken} are already in use")
+        connection.execute(insert(posts).from_select(
+            names, select(*[archive.c[name] for name in names]).where(archive.c.id.in_(ids))))
+        connection.execute(delete(archive).where(archive.c.id.in_(ids)))
+
+    # Links were dropped on archiving; the flush hook only sees ORM writes
+    tag_service.assign_tags(db.session, Post.query.filter(Post.id.in_(ids)).all())
+    db.session.commit()
+    logging.info(f"Restored {len(ids)} archived posts")
+    posts_changed.send(app, action='restore', post_ids=ids)
+    return ids
@@ -0,0 +1,201 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from slugify import slugify
+from sqlalchemy import or_
+
+from utils.helpers import percentile
+from services.usage_service import new_generation_id, usage_scope, link_generation
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`
+
+    Used to keep batch generation inside the Gemini RPM/TPM quota. The bucket
+    lives in one process, so run a single batch at a time per API key.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1, stop=None):
+        """Block until `amount` tokens are available and return the wait in seconds
+
+        Returns early, without taking tokens, once the `stop` event is set.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            if stop is None:
+                time.sleep(delay)
+            elif stop.wait(delay):
+                return waited
+            waited += delay
+
+class BatchGenerator:
+    """Run GeminiService.generate_news_content over many topics
+
+    Requests run on a bounded thread pool and every request first takes one
+    token from the RPM bucket and an estimated token count from the TPM bucket.
+    """
+
+    def __init__(self, gemini_service, concurrency=3, rpm=10, tpm=250000,
+                 tokens_per_request=4000, app=None):
+        self.gemini_service = gemini_service
+        self.concurrency = max(1, int(concurrency))
+        self.tokens_per_request = tokens_per_request
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self.app = app
+
+    def iter_results(self, items):
+        """Generate content for each item, yielding results as they complete
+
+        Closing the generator early (the admin left the progress stream)
+        cancels the queued items, and running ones stop before their Gemini
+        call, so an abandoned batch does not keep spending quota.
+        """
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            futures = [executor.submit(self._generate, index, item, stop) for index, item in enumerate(items)]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, items):
+        """Generate content for all items and return results in input order"""
+        return sorted(self.iter_results(items), key=lambda result: result['index'])
+
+    def _generate(self, index, item, stop):
+        if self.app is not None:
+            with self.app.app_context():
+                return self._generate_item(index, item, stop)
+        return self._generate_item(index, item, stop)
+
+    def _generate_item(self, index, item, stop):
+        if item.get('duplicate_of'):
+            return dict(item, index=index, content=None, ok=False, waited_ms=0, latency_ms=0, generation_id=None,
+                        error=f"O'xshash maqola bor: {item['duplicate_of']}")
+
+        waited = self.request_bucket.acquire(stop=stop)
+        waited += self.token_bucket.acquire(self.tokens_per_request, stop=stop)
+
+        result = dict(item, index=index, content=None, error=None, waited_ms=round(waited * 1000),
+                      generation_id=new_generation_id())
+        if stop.is_set():
+            result.update(ok=False, latency_ms=0, error='Bekor qilindi')
+            return result
+        started = time.perf_counter()
+        try:
+            with usage_scope(generation_id=result['generation_id']):
+                content = self.gemini_service.generate_news_content(item['topic'], item['category'], item['region'])
+            if not content or not content.get('title_uz') or not content.get('content_uz'):
+                result['error'] = 'Bo\'sh yoki noto\'g\'ri javob'
+            else:
+                result['content'] = content
+        except Exception as e:
+            logging.error(f"Batch generation failed for '{item['topic']}': {e}")
+            result['error'] = str(e)
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000)
+        result['ok'] = result['error'] is None
+        return result
+
+def parse_batch_lines(text, default_category, default_region=None):
+    """Parse `topic | category | region` lines into batch items"""
+    items = []
+    for line in text.splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if not parts[0] or parts[0].startswith('#'):
+            continue
+        items.append({
+            'topic': parts[0],
+            'category': parts[1] if len(parts) > 1 and parts[1] else default_category,
+            'region': parts[2] if len(parts) > 2 and parts[2] else default_region,
+        })
+    return items
+
+def save_drafts(results, author_id):
+    """Insert successful results as unpublished posts in a single commit"""
+    from app import db
+    from models.archived_post import ArchivedPost
+    from models.post import Post
+
+    generated = [result for result in results if result['ok']]
+    if not generated:
+        return []
+
+    # Resolve slug collisions against both tables and within the batch at once
+    base_slugs = [slugify(result['content']['title_uz']) or 'maqola' for result in generated]
+    taken = set()
+    for model in (Post, ArchivedPost):
+        prefixes = [model.slug.like(f"{base}-%") for base in set(base_slugs)]
+        taken.update(slug for (slug,) in db.session.query(model.slug).filter(
+            or_(model.slug.in_(base_slugs), *prefixes)).all())
+
+    posts = []
+    for result, base in zip(generated, base_slugs):
+        slug, suffix = base, 1
+        while slug in taken:
+            suffix += 1
+            slug = f"{base}-{suffix}"
+        taken.add(slug)
+
+        content = result['content']
+        post = Post(
+            title_uz=content['title_uz'][:200],
+            title_ru=(content.get('title_ru') or '')[:200] or None,
+            content_uz=content['content_uz'],
+            content_ru=content.get('content_ru'),
+            telegram_content_uz=content.get('telegram_uz'),
+            meta_title_uz=(content.get('meta_title') or '')[:60] or None,
+            meta_description_uz=(content.get('meta_description') or '')[:155] or None,
+            keywords=(content.get('keywords') or '')[:200] or None,
+            category=result['category'],
+            region=result['region'] or None,
+            slug=slug,
+            published=False,
+            author_id=author_id,
+        )
+        posts.append(post)
+        result['post'] = post
+
+    db.session.add_all(posts)
+    db.session.commit()
+    for result in generated:
+        link_generation(result['generation_id'], result['post'].id)
+    return posts
+
+def summarize_results(results, elapsed):
+    """Aggregate per-item latency and failure counts for a batch run"""
+    # Topics skipped as duplicates never reached Gemini
+    skipped = [result for result in results if result.get('duplicate_of')]
+    attempted = [result for result in results if not result.get('duplicate_of')]
+    latencies = [result['latency_ms'] for result in attempted]
+    failures = [result for result in attempted if not result['ok']]
+
+    return {
+        'total': len(results),
+        'succeeded': len(attempted) - len(failures),
+        'failed': len(failures),
+        'skipped': len(skipped),
+        'elapsed_s': round(elapsed, 1),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'max_ms': max(latencies, default=0),
+    }
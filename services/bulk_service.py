@@ -0,0 +1,136 @@
+import logging
+
+from datetime import datetime
+
+from sqlalchemy import case, delete, or_, select, update
+
+from signals import posts_changed, posts_published
+
+BULK_ACTIONS = {
+    'publish': "Nashr qilish",
+    'unpublish': "Qoralamaga qaytarish",
+    'feature': "Tanlanganlarga qo'shish",
+    'unfeature': "Tanlanganlardan olib tashlash",
+    'set_category': "Kategoriyani o'zgartirish",
+    'delete': "O'chirish",
+}
+
+POST_STATUSES = ('published', 'scheduled', 'draft', 'featured')
+
+class BulkActionError(ValueError):
+    pass
+
+def filter_posts(query, filters):
+    """Apply the admin list filters (status, category, q) to a Post query"""
+    from models.post import Post
+
+    status = filters.get('status')
+    now = datetime.utcnow()
+    if status == 'published':
+        query = query.filter(Post.published == True)
+    elif status == 'scheduled':
+        query = query.filter(Post.published == False, Post.publish_at > now)
+    elif status == 'draft':
+        query = query.filter(Post.published == False, or_(Post.publish_at.is_(None), Post.publish_at <= now))
+    elif status == 'featured':
+        query = query.filter(Post.featured == True)
+
+    if filters.get('category'):
+        query = query.filter(Post.category == filters['category'])
+
+    text = (filters.get('q') or '').strip()
+    if text:
+        pattern = f'%{text}%'
+        query = query.filter(or_(Post.title_uz.ilike(pattern), Post.title_ru.ilike(pattern)))
+    return query
+
+def narrows(filters):
+    """True when `filters` leaves out at least some posts"""
+    return (filters.get('status') in POST_STATUSES or bool(filters.get('category'))
+            or bool((filters.get('q') or '').strip()))
+
+def apply_bulk_action(app, action, post_ids=None, filters=None, category=None, select_all=False):
+    """Apply one action to the selected posts, or to every post matching `filters`
+
+    Filters that match every post are refused unless `select_all` is set.
+    Each action is a single set-based UPDATE or DELETE committed once, and
+    `posts_changed` (plus `posts_published` for publish) is sent once for the
+    whole batch. Returns the number of posts changed.
+    """
+    from app import db
+    from config import Config
+    from models.post import Post
+
+    if action not in BULK_ACTIONS:
+        raise BulkActionError(f"Noma'lum amal: {action}")
+    if action == 'set_category' and category not in Config.UZBEK_CATEGORIES:
+        raise BulkActionError("Kategoriya noto'g'ri")
+    if post_ids is None and filters is None:
+        raise BulkActionError("Maqolalar tanlanmagan")
+    if post_ids is None and not select_all and not narrows(filters):
+        raise BulkActionError("Filtr bo'sh: amal barcha maqolalarga qo'llanadi")
+
+    selection = select(Post.id)
+    if post_ids is not None:
+        selection = selection.where(Post.id.in_([int(post_id) for post_id in post_ids]))
+    else:
+        selection = filter_posts(Post.query, filters).with_entities(Post.id).statement
+
+    # Only touch rows the action actually changes so hooks see the real batch
+    if action == 'publish':
+        selection = selection.where(Post.published == False)
+    elif action == 'unpublish':
+        selection = selection.where(Post.published == True)
+    elif action == 'feature':
+        selection = selection.where(or_(Post.featured == False, Post.featured.is_(None)))
+    elif action == 'unfeature':
+        selection = selection.where(Post.featured == True)
+    elif action == 'set_category':
+        selection = selection.where(Post.category != category)
+
+    ids = list(db.session.execute(selection).scalars())
+    if not ids:
+        return 0
+
+    table = Post.__table__
+    try:
+        if action == 'delete':
+            _delete_dependents(ids)
+            db.session.execute(delete(table).where(table.c.id.in_(ids)))
+        else:
+            values = {
+                'publish': {'published': True, 'publish_at': None},
+                # A past publish_at would make the scheduler publish the post again
+                'unpublish': {'published': False, 'publish_at': case(
+                    (table.c.publish_at > datetime.utcnow(), table.c.publish_at), else_=None)},
+                'feature': {'featured': True},
+                'unfeature': {'featured': False},
+                'set_category': {'category': category},
+            }[action]
+            db.session.execute(update(table).where(table.c.id.in_(ids)).values(**values))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logging.info(f"Bulk {action} applied to {len(ids)} posts")
+    posts_changed.send(app, action=action, post_ids=ids)
+    if action == 'publish':
+        posts_published.send(app, posts=Post.query.filter(Post.id.in_(ids)).all())
+    return len(ids)
+
+def _delete_dependents(ids):
+    """Remove rows that point at posts about to be deleted"""
+    from app import db
+    from models.analytics import ViewStatDaily, ViewStatHourly
+    from models.gemini_usage import GeminiCall
+    from models.post_signature import PostSignature
+    from models.telegram_delivery import TelegramDelivery
+    from models.trending import TrendingScore
+
+    for model in (TrendingScore, ViewStatHourly, ViewStatDaily, PostSignature, TelegramDelivery):
+        table = model.__table__
+        db.session.execute(delete(table).where(table.c.post_id.in_(ids)))
+    # Usage history is kept for cost reports, just no longer tied to a post
+    calls = GeminiCall.__table__
+    db.session.execute(update(calls).where(calls.c.post_id.in_(ids)).values(post_id=None))
@@ -0,0 +1,173 @@
+import logging
+
+from sqlalchemy import case, delete, func, insert, literal, select, text, union_all
+
+TRIGGER = 'posts_counters'
+COUNTED_COLUMNS = 'published, views, telegram_posted, category, region'
+
+# One upsert per scope; `sign` is -1 to take the OLD row out, 1 to add the NEW row
+SQLITE_UPSERT = """
+    INSERT INTO post_counters (scope, name, total, published, views, telegram_sent)
+    VALUES ('{scope}', {name}, {sign}, {sign} * COALESCE({row}.published, 0), {sign} * COALESCE({row}.views, 0),
+            {sign} * COALESCE({row}.telegram_posted, 0))
+    ON CONFLICT (scope, name) DO UPDATE SET
+        total = total + excluded.total,
+        published = published + excluded.published,
+        views = views + excluded.views,
+        telegram_sent = telegram_sent + excluded.telegram_sent;"""
+
+POSTGRES_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION post_counters_add(p_category text, p_region text, p_sign integer, p_published boolean,
+                                             p_views bigint, p_telegram boolean) RETURNS void AS $$
+    -- 'all' is always locked first, so concurrent writers cannot deadlock on the other rows
+    INSERT INTO post_counters (scope, name, total, published, views, telegram_sent)
+    SELECT s.scope, s.name, p_sign, p_sign * COALESCE(p_published::int, 0), p_sign * COALESCE(p_views, 0),
+           p_sign * COALESCE(p_telegram::int, 0)
+    FROM (VALUES (1, 'all', ''), (2, 'category', p_category), (3, 'region', COALESCE(p_region, '')))
+        AS s(position, scope, name)
+    ORDER BY s.position
+    ON CONFLICT (scope, name) DO UPDATE SET
+        total = post_counters.total + EXCLUDED.total,
+        published = post_counters.published + EXCLUDED.published,
+        views = post_counters.views + EXCLUDED.views,
+        telegram_sent = post_counters.telegram_sent + EXCLUDED.telegram_sent;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION post_counters_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM post_counters_add(OLD.category, OLD.region, -1, OLD.published, OLD.views, OLD.telegram_posted);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM post_counters_add(NEW.category, NEW.region, 1, NEW.published, NEW.views, NEW.telegram_posted);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+def _sqlite_upserts(row, sign):
+    names = {'all': "''", 'category': f"{row}.category", 'region': f"COALESCE({row}.region, '')"}
+    return ''.join(SQLITE_UPSERT.format(scope=scope, name=name, sign=sign, row=row) for scope, name in names.items())
+
+def _sqlite_triggers():
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER}_insert AFTER INSERT ON posts BEGIN"
+        f"{_sqlite_upserts('NEW', 1)}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER}_delete AFTER DELETE ON posts BEGIN"
+        f"{_sqlite_upserts('OLD', -1)}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGER}_update AFTER UPDATE OF {COUNTED_COLUMNS} ON posts BEGIN"
+        f"{_sqlite_upserts('OLD', -1)}{_sqlite_upserts('NEW', 1)}\nEND",
+    ]
+
+def _has_triggers(connection):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        query = text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name")
+        return connection.execute(query, {'name': f"{TRIGGER}_update"}).first() is not None
+    query = text("SELECT 1 FROM pg_trigger WHERE tgname = :name")
+    return connection.execute(query, {'name': TRIGGER}).first() is not None
+
+def install_triggers(db):
+    """Create the post_counters triggers if missing and fill the table once
+
+    Runs in one transaction, so no post write slips in between the initial
+    count and the first trigger firing. Returns False for databases other
+    than SQLite and PostgreSQL; the dashboard then counts posts directly.
+    """
+    from utils.database import write_engine
+
+    engine = write_engine(db)
+    if engine.dialect.name not in ('sqlite', 'postgresql'):
+        logging.warning(f"Post counters are not maintained on {engine.dialect.name}")
+        return False
+    with engine.begin() as connection:
+        if _has_triggers(connection):
+            return True
+        if engine.dialect.name == 'sqlite':
+            for statement in _sqlite_triggers():
+                connection.execute(text(statement))
+        else:
+            connection.execute(text(POSTGRES_FUNCTIONS))
+            connection.execute(text(
+                f"CREATE TRIGGER {TRIGGER} AFTER INSERT OR DELETE OR UPDATE OF {COUNTED_COLUMNS} ON posts "
+                f"FOR EACH ROW EXECUTE FUNCTION post_counters_apply()"))
+        rebuild(connection)
+    logging.info("Post counter triggers installed")
+    return True
+
+def expected_counters(connection):
+    """{(scope, name): (total, published, views, telegram_sent)} counted from posts"""
+    from models.post import Post
+
+    posts = Post.__table__
+    measures = [
+        func.count().label('total'),
+        func.coalesce(func.sum(case((posts.c.published == True, 1), else_=0)), 0).label('published'),
+        func.coalesce(func.sum(posts.c.views), 0).label('views'),
+        func.coalesce(func.sum(case((posts.c.telegram_posted == True, 1), else_=0)), 0).label('telegram_sent'),
+    ]
+    region = func.coalesce(posts.c.region, '')
+    query = union_all(
+        select(literal('all').label('scope'), literal('').label('name'), *measures).select_from(posts),
+        select(literal('category'), posts.c.category, *measures).group_by(posts.c.category),
+        select(literal('region'), region, *measures).group_by(region),
+    )
+    return {(row.scope, row.name): (row.total, row.published, row.views, row.telegram_sent)
+            for row in connection.execute(query)}
+
+def stored_counters(connection):
+    from models.post_counter import PostCounter
+
+    counters = PostCounter.__table__
+    return {(row.scope, row.name): (row.total, row.published, row.views, row.telegram_sent)
+            for row in connection.execute(select(counters))}
+
+def rebuild(connection):
+    """Replace post_counters with totals counted from posts"""
+    from models.post_counter import PostCounter
+
+    counters = PostCounter.__table__
+    rows = [{'scope': scope, 'name': name, 'total': total, 'published': published, 'views': views,
+             'telegram_sent': telegram_sent}
+            for (scope, name), (total, published, views, telegram_sent) in expected_counters(connection).items()]
+    connection.execute(delete(counters))
+    if rows:
+        connection.execute(insert(counters), rows)
+
+def reconcile(db, fix=False):
+    """[(scope, name, expected, stored)] for counters that drifted from posts
+
+    Rows counting zero posts are equivalent to missing rows. With `fix` the
+    table is rebuilt in the same transaction as the comparison.
+    """
+    from utils.database import write_engine
+
+    zero = (0, 0, 0, 0)
+    with write_engine(db).begin() as connection:
+        expected = expected_counters(connection)
+        stored = stored_counters(connection)
+        drift = [(scope, name, expected.get((scope, name), zero), stored.get((scope, name), zero))
+                 for scope, name in sorted(set(expected) | set(stored))
+                 if expected.get((scope, name), zero) != stored.get((scope, name), zero)]
+        if fix and drift:
+            rebuild(connection)
+    return drift
+
+def dashboard_stats():
+    """Totals for the admin dashboard from the 'all' counter row; archived posts are not counted"""
+    from app import db
+    from models.post import Post
+    from models.post_counter import PostCounter
+
+    row = db.session.get(PostCounter, ('all', ''))
+    if row is not None:
+        return {'total_posts': row.total, 'published_posts': row.published,
+                'total_views': row.views, 'telegram_sent': row.telegram_sent}
+    # Triggers not installed yet (init-db not run) or an unsupported database
+    return {
+        'total_posts': Post.query.count(),
+        'published_posts': Post.query.filter_by(published=True).count(),
+        'total_views': db.session.query(func.sum(Post.views)).scalar() or 0,
+        'telegram_sent': Post.query.filter_by(telegram_posted=True).count()
+    }
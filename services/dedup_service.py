@@ -0,0 +1,222 @@
+import re
+import time
+import zlib
+import random
+import logging
+import threading
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import has_app_context
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Uzbek is written with several apostrophe look-alikes (o‘zbek, o'zbek, oʻzbek)
+APOSTROPHES = re.compile(r"[‘’ʻʼ`´]")
+NON_WORD = re.compile(r"[^\w']+")
+
+def normalize(text):
+    return NON_WORD.sub(' ', APOSTROPHES.sub("'", (text or '').lower())).strip()
+
+def title_shingles(text, size=4):
+    """Character n-grams; short titles and topics still share many of them"""
+    text = normalize(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def content_shingles(text, size=3):
+    """Word n-grams of the article body"""
+    words = normalize(text).split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """MinHash signatures of `num_perm` 32-bit values from universal hash functions"""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, shingles):
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+        if not hashes:
+            return array('I', [MAX_HASH] * self.num_perm)
+        return array('I', [min((a * h + b) % MERSENNE_PRIME for h in hashes) & MAX_HASH for a, b in self.params])
+
+    @staticmethod
+    def similarity(left, right):
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+class LSHIndex:
+    """Banded locality-sensitive hashing over MinHash signatures
+
+    Two signatures land in the same bucket of a band when all `rows` values of
+    that band match, so pairs above roughly (1/bands)^(1/rows) similarity are
+    found without comparing against every stored signature.
+    """
+
+    def __init__(self, num_perm=64, bands=16):
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = defaultdict(set)
+        self.signatures = {}
+
+    def _keys(self, signature):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, key, signature):
+        self.remove(key)
+        self.signatures[key] = signature
+        for bucket in self._keys(signature):
+            self.buckets[bucket].add(key)
+
+    def remove(self, key):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket in self._keys(signature):
+            self.buckets[bucket].discard(key)
+            if not self.buckets[bucket]:
+                del self.buckets[bucket]
+
+    def query(self, signature, threshold):
+        """[(key, similarity)] above threshold, most similar first"""
+        candidates = set()
+        for bucket in self._keys(signature):
+            candidates |= self.buckets.get(bucket, set())
+        matches = [(key, MinHasher.similarity(signature, self.signatures[key])) for key in candidates]
+        return sorted([match for match in matches if match[1] >= threshold], key=lambda match: -match[1])
+
+class DuplicateDetector:
+    """Flag posts and generator topics that nearly repeat a recent article
+
+    Signatures of posts created in the last `window_days` are kept in two LSH
+    indexes (title and body). The first lookup in a process loads them from
+    post_signatures; later lookups pull in rows written by other processes at
+    most every `refresh_interval` seconds.
+    """
+
+    def __init__(self, num_perm=64, window_days=30, title_threshold=0.6, content_threshold=0.5,
+                 refresh_interval=30):
+        self.hasher = MinHasher(num_perm)
+        self.window_days = window_days
+        self.title_threshold = title_threshold
+        self.content_threshold = content_threshold
+        self.refresh_interval = refresh_interval
+        # Titles are short, so more, narrower bands keep recall up
+        self.titles = LSHIndex(num_perm, bands=num_perm // 2)
+        self.contents = LSHIndex(num_perm, bands=num_perm // 4)
+        self.created = {}
+        self.loaded_until = None
+        self.last_sync = None
+        self._lock = threading.Lock()
+
+    def signatures(self, title, content=''):
+        return (self.hasher.signature(title_shingles(title)),
+                self.hasher.signature(content_shingles(content)))
+
+    def find_similar(self, title, content='', exclude_id=None, limit=5):
+        """[(post_id, similarity)] of recent posts close to this title or body"""
+        self.sync()
+        title_signature, content_signature = self.signatures(title, content)
+        best = {}
+        with self._lock:
+            matches = self.titles.query(title_signature, self.title_threshold)
+            if content:
+                matches += self.contents.query(content_signature, self.content_threshold)
+            cutoff = self._cutoff()
+            for post_id, similarity in matches:
+                if post_id != exclude_id and self.created.get(post_id, cutoff) >= cutoff:
+                    best[post_id] = max(similarity, best.get(post_id, 0))
+        return sorted(best.items(), key=lambda match: -match[1])[:limit]
+
+    def find_similar_topic(self, topic, limit=5):
+        """Recent posts whose title already covers a generator topic"""
+        return self.find_similar(topic, limit=limit)
+
+    def add_post(self, post):
+        """Store the post's signatures and index them; called after the post is committed"""
+        from app import db
+        from models.post_signature import PostSignature
+        from utils.database import write_engine
+
+        title_signature, content_signature = self.signatures(post.title_uz, post.content_uz)
+        created_at = post.created_at or datetime.utcnow()
+        table = PostSignature.__table__
+        row = {
+            'post_id': post.id,
+            'title_minhash': title_signature.tobytes(),
+            'content_minhash': content_signature.tobytes(),
+            'post_created_at': created_at,
+            'updated_at': datetime.utcnow(),
+        }
+        try:
+            with write_engine(db).begin() as connection:
+                connection.execute(table.delete().where(table.c.post_id == post.id))
+                connection.execute(table.insert(), [row])
+        except Exception as e:
+            logging.error(f"Failed to store signature for post {post.id}: {e}")
+        self._index(post.id, title_signature, content_signature, created_at)
+
+    def add_posts(self, posts):
+        for post in posts:
+            self.add_post(post)
+
+    def sync(self, force=False):
+        """Load signatures written since the last sync"""
+        if not has_app_context():
+            return
+        if not force and self.last_sync is not None and time.monotonic() - self.last_sync < self.refresh_interval:
+            return
+        from app import db
+        from models.post_signature import PostSignature
+
+        self.last_sync = time.monotonic()
+        table = PostSignature.__table__
+        query = table.select().where(table.c.post_created_at >= self._cutoff())
+        if self.loaded_until is not None:
+            query = query.where(table.c.updated_at >= self.loaded_until)
+        try:
+            rows = db.session.execute(query).all()
+        except Exception as e:
+            logging.error(f"Failed to load post signatures: {e}")
+            return
+        for row in rows:
+            self._index(row.post_id, array('I', row.title_minhash), array('I', row.content_minhash),
+                        row.post_created_at)
+            if self.loaded_until is None or row.updated_at > self.loaded_until:
+                self.loaded_until = row.updated_at
+        self._expire()
+
+    def similar_posts(self, matches):
+        """[(post, similarity)] for matches whose post still exists"""
+        from models.post import Post
+
+        if not matches:
+            return []
+        posts = {post.id: post for post in Post.query.filter(Post.id.in_([post_id for post_id, _ in matches])).all()}
+        return [(posts[post_id], similarity) for post_id, similarity in matches if post_id in posts]
+
+    def _index(self, post_id, title_signature, content_signature, created_at):
+        with self._lock:
+            self.titles.add(post_id, title_signature)
+            self.contents.add(post_id, content_signature)
+            self.created[post_id] = created_at
+
+    def _expire(self):
+        cutoff = self._cutoff()
+        with self._lock:
+            for post_id in [post_id for post_id, created in self.created.items() if created < cutoff]:
+                self.titles.remove(post_id)
+                self.contents.remove(post_id)
+                del self.created[post_id]
+
+    def _cutoff(self):
+        return datetime.utcnow() - timedelta(days=self.window_days)
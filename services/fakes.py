@@ -0,0 +1,295 @@
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+from collections import Counter, defaultdict
+
+import httpx
+from google.genai import errors
+from telegram.error import RetryAfter
+
+# Stand-ins for genai.Client and telegram.Bot so generation and distribution
+# can be load-tested offline; see FAKE_SERVICES in config.py
+
+class LatencyProfile:
+    """Log-normal latency with the given median; sigma sets how long the tail is"""
+
+    def __init__(self, median_ms=800, sigma=0.5):
+        self.median_ms = median_ms
+        self.sigma = sigma
+
+    def sample(self, rng):
+        """Seconds for one call"""
+        if self.median_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(self.median_ms), self.sigma) / 1000
+
+def prompt_hash(prompt):
+    return hashlib.sha256(str(prompt).encode('utf-8')).hexdigest()
+
+def request_kind(prompt, config=None):
+    """Which kind of response a Gemini request expects"""
+    if config is not None and getattr(config, 'response_schema', None) is not None:
+        return 'article'
+    if config is not None and getattr(config, 'response_mime_type', None) == 'application/json':
+        if '"translations"' in prompt:
+            return 'translations'
+        if '"title_ru"' in prompt:
+            return 'translation'
+        return 'news'
+    return 'text'
+
+def load_recordings(path):
+    """Read a JSON-lines file written by RecordingGeminiClient"""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+
+def synthesize(kind, prompt):
+    """Plausible response text for a request when nothing was recorded"""
+    topic_match = re.search(r"uchun (.+?) mavzusida", prompt)
+    topic = topic_match.group(1).strip() if topic_match else "Yangilik"
+    paragraphs = [f"{topic} bo'yicha {i}-paragraf. Mutaxassislar vaziyatni batafsil o'rganmoqda." for i in range(1, 6)]
+    content = "\n\n".join(paragraphs)
+    if kind == 'article':
+        return json.dumps({
+            'title_uz': f"{topic}: yangi ma'lumotlar",
+            'content_uz': content,
+            'title_ru': f"{topic}: новые данные",
+            'content_ru': "\n\n".join(f"Абзац {i} о теме «{topic}»." for i in range(1, 6)),
+            'telegram_uz': f"📰 {topic}\n\n#uzbekistan #yangiliklar\nTo'liq maqolani o'qish uchun: [link]",
+            'meta_title': topic[:60],
+            'meta_description': f"{topic} haqida so'nggi yangiliklar"[:155],
+            'keywords': topic,
+        }, ensure_ascii=False)
+    if kind == 'news':
+        return json.dumps({
+            'title': f"{topic}: yangi ma'lumotlar",
+            'content': content,
+            'meta_title': topic[:60],
+            'meta_description': f"{topic} haqida so'nggi yangiliklar"[:155],
+            'keywords': topic,
+        }, ensure_ascii=False)
+    if kind == 'translation':
+        return json.dumps({'title_ru': "Заголовок", 'content_ru': "Текст статьи на русском языке."}, ensure_ascii=False)
+    if kind == 'translations':
+        segments = re.search(r"\(JSON massiv\): (\[.*\])", prompt)
+        try:
+            count = len(json.loads(segments.group(1))) if segments else 1
+        except ValueError:
+            count = 1
+        return json.dumps({'translations': [f"Перевод фрагмента {i + 1}" for i in range(count)]}, ensure_ascii=False)
+    return f"📰 {topic}\n\nQisqa Telegram posti. #uzbekistan #yangiliklar"
+
+def usage_for(prompt, text, usage=None):
+    usage = usage or {}
+    return SimpleNamespace(
+        prompt_token_count=usage.get('prompt_token_count', len(str(prompt)) // 4),
+        candidates_token_count=usage.get('candidates_token_count', len(text) // 4),
+        thoughts_token_count=usage.get('thoughts_token_count', 0),
+    )
+
+class FakeGeminiClient:
+    """Drop-in for genai.Client covering models.generate_content(_stream)
+
+    Recorded responses are matched by prompt hash first, then replayed in
+    turn by request kind; anything else is synthesized. Each call can fail
+    with a 429 or 503 or return truncated JSON, at the configured rates.
+    A call slower than the request's HTTP timeout raises httpx.ReadTimeout,
+    just as the real client would.
+    """
+
+    def __init__(self, recordings=None, latency=None, rate_limit_rate=0.0, server_error_rate=0.0,
+                 malformed_rate=0.0, seed=0, sleep=time.sleep):
+        self.latency = latency or LatencyProfile()
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.malformed_rate = malformed_rate
+        self.sleep = sleep
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._by_prompt = {}
+        self._by_kind = defaultdict(list)
+        self._turn = Counter()
+        for record in recordings or ():
+            self._by_prompt[record.get('prompt_hash')] = record
+            self._by_kind[record['kind']].append(record)
+        self.models = SimpleNamespace(generate_content=self.generate_content,
+                                      generate_content_stream=self.generate_content_stream)
+
+    def generate_content(self, model, contents, config=None):
+        _, text, usage, delay, fault = self._plan(contents, config)
+        self._wait(delay, config)
+        self._raise(fault)
+        if fault == 'malformed':
+            text = text[:len(text) // 2]
+        return SimpleNamespace(text=text, usage_metadata=usage_for(contents, text, usage))
+
+    def generate_content_stream(self, model, contents, config=None):
+        _, text, usage, delay, fault = self._plan(contents, config)
+        # A fifth of the time goes to the first token, the rest is spread over the chunks
+        self._wait(delay * 0.2, config)
+        self._raise(fault)
+        if fault == 'malformed':
+            text = text[:len(text) // 2]
+        chunks = [text[i:i + 40] for i in range(0, len(text), 40)] or ['']
+        for index, chunk in enumerate(chunks):
+            self.sleep(delay * 0.8 / len(chunks))
+            last = index == len(chunks) - 1
+            yield SimpleNamespace(text=chunk, usage_metadata=usage_for(contents, text, usage) if last else None)
+
+    def _plan(self, contents, config):
+        kind = request_kind(contents, config)
+        with self._lock:
+            self.calls[kind] += 1
+            delay = self.latency.sample(self._rng)
+            roll = self._rng.random()
+            record = self._by_prompt.get(prompt_hash(contents))
+            if record is None and self._by_kind[kind]:
+                records = self._by_kind[kind]
+                record = records[self._turn[kind] % len(records)]
+                self._turn[kind] += 1
+        fault = None
+        if roll < self.rate_limit_rate:
+            fault = 'rate_limit'
+        elif roll < self.rate_limit_rate + self.server_error_rate:
+            fault = 'server_error'
+        elif roll < self.rate_limit_rate + self.server_error_rate + self.malformed_rate:
+            fault = 'malformed'
+        if record is not None:
+            return kind, record['text'], record.get('usage'), delay, fault
+        return kind, synthesize(kind, contents), None, delay, fault
+
+    def _wait(self, delay, config):
+        http_options = getattr(config, 'http_options', None)
+        timeout_ms = getattr(http_options, 'timeout', None)
+        if timeout_ms and delay * 1000 > timeout_ms:
+            self.sleep(timeout_ms / 1000)
+            raise httpx.ReadTimeout("Fake Gemini request timed out")
+        self.sleep(delay)
+
+    def _raise(self, fault):
+        if fault == 'rate_limit':
+            with self._lock:
+                self.calls['rate_limited'] += 1
+            raise errors.ClientError(429, {'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED',
+                                                     'message': 'Resource has been exhausted (fake)'}})
+        if fault == 'server_error':
+            with self._lock:
+                self.calls['server_error'] += 1
+            raise errors.ServerError(503, {'error': {'code': 503, 'status': 'UNAVAILABLE',
+                                                     'message': 'The model is overloaded (fake)'}})
+
+class RecordingGeminiClient:
+    """Wrap a real genai.Client and append every response to a JSON-lines file"""
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self._lock = threading.Lock()
+        self.models = SimpleNamespace(generate_content=self.generate_content,
+                                      generate_content_stream=self.generate_content_stream)
+
+    def generate_content(self, model, contents, config=None):
+        response = self.client.models.generate_content(model=model, contents=contents, config=config)
+        self._write(contents, config, response.text or '', response.usage_metadata)
+        return response
+
+    def generate_content_stream(self, model, contents, config=None):
+        parts, usage = [], None
+        for chunk in self.client.models.generate_content_stream(model=model, contents=contents, config=config):
+            usage = chunk.usage_metadata or usage
+            parts.append(chunk.text or '')
+            yield chunk
+        self._write(contents, config, ''.join(parts), usage)
+
+    def _write(self, contents, config, text, usage_metadata):
+        record = {
+            'kind': request_kind(contents, config),
+            'prompt_hash': prompt_hash(contents),
+            'text': text,
+            'usage': {
+                'prompt_token_count': getattr(usage_metadata, 'prompt_token_count', None) or 0,
+                'candidates_token_count': getattr(usage_metadata, 'candidates_token_count', None) or 0,
+                'thoughts_token_count': getattr(usage_metadata, 'thoughts_token_count', None) or 0,
+            },
+        }
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logging.error(f"Failed to record Gemini response: {e}")
+
+class FakeTelegramBot:
+    """Drop-in for telegram.Bot covering what TelegramService calls
+
+    Sent messages are kept in `sent`; at `retry_after_rate` a send fails
+    with RetryAfter, as the Bot API does when a channel is flooded.
+    """
+
+    def __init__(self, latency=None, retry_after_rate=0.0, retry_after_seconds=5, member_count=1000, seed=0):
+        self.latency = latency or LatencyProfile(median_ms=150, sigma=0.4)
+        self.retry_after_rate = retry_after_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.member_count = member_count
+        self.sent = []
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    async def send_message(self, chat_id, text, parse_mode=None, disable_web_page_preview=None, **kwargs):
+        with self._lock:
+            delay = self.latency.sample(self._rng)
+            flooded = self._rng.random() < self.retry_after_rate
+            self.calls['send_message'] += 1
+        await asyncio.sleep(delay)
+        if flooded:
+            with self._lock:
+                self.calls['retry_after'] += 1
+            raise RetryAfter(self.retry_after_seconds)
+        with self._lock:
+            self.sent.append({'chat_id': chat_id, 'text': text, 'parse_mode': parse_mode})
+            message_id = len(self.sent)
+        return SimpleNamespace(message_id=message_id, chat_id=chat_id, text=text)
+
+    async def get_chat(self, chat_id):
+        return SimpleNamespace(id=chat_id, title="Fake kanal", username="fake_channel", type='channel')
+
+    async def get_chat_member_count(self, chat_id):
+        return self.member_count
+
+def gemini_client_from_config(config):
+    """A FakeGeminiClient when FAKE_SERVICES includes 'gemini', else None"""
+    if 'gemini' not in config.FAKE_SERVICES:
+        return None
+    recordings = load_recordings(config.FAKE_GEMINI_RECORDINGS) if config.FAKE_GEMINI_RECORDINGS else None
+    logging.warning("Using the fake Gemini client")
+    return FakeGeminiClient(
+        recordings=recordings,
+        latency=LatencyProfile(config.FAKE_GEMINI_LATENCY_MS, config.FAKE_GEMINI_LATENCY_SIGMA),
+        rate_limit_rate=config.FAKE_GEMINI_RATE_LIMIT_RATE,
+        server_error_rate=config.FAKE_GEMINI_SERVER_ERROR_RATE,
+        malformed_rate=config.FAKE_GEMINI_MALFORMED_RATE,
+        seed=config.FAKE_SEED,
+    )
+
+def telegram_bot_from_config(config):
+    """A FakeTelegramBot when FAKE_SERVICES includes 'telegram', else None"""
+    if 'telegram' not in config.FAKE_SERVICES:
+        return None
+    logging.warning("Using the fake Telegram bot")
+    return FakeTelegramBot(
+        latency=LatencyProfile(config.FAKE_TELEGRAM_LATENCY_MS, 0.4),
+        retry_after_rate=config.FAKE_TELEGRAM_RETRY_AFTER_RATE,
+        seed=config.FAKE_SEED,
+    )
@@ -1,14 +1,68 @@
 import os
+import re
+import json
+import time
 import logging
+import threading
+from collections import defaultdict, Counter
+import httpx
 from google import genai
-from google.genai import types
+from google.genai import types, errors
+from pydantic import BaseModel, Field
+
+from config import Config
+from services.fakes import RecordingGeminiClient
+from services.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, backoff_delay
+from services.translation_memory import TranslationMemoryStore, segment_hash, split_paragraphs
+from services.usage_service import record_call
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class BilingualArticle(BaseModel):
+    """Response schema of the single-call bilingual generation
+
+    Field order is the order Gemini writes them in, so the Uzbek text streams first.
+    """
+    title_uz: str = Field(min_length=1, description="O'zbek tilidagi sarlavha, 45-55 belgi")
+    content_uz: str = Field(min_length=1, description="O'zbek tilidagi to'liq maqola, paragraflar bo'sh qator bilan ajratilgan")
+    title_ru: str = Field(min_length=1, description="Sarlavhaning rus tilidagi tarjimasi")
+    content_ru: str = Field(min_length=1, description="Maqolaning rus tilidagi tarjimasi, paragraflar soni va tartibi bir xil")
+    telegram_uz: str = Field(description="O'zbek tilidagi Telegram posti")
+    meta_title: str = Field(description="SEO sarlavha, 60 belgigacha")
+    meta_description: str = Field(description="SEO tavsif, 155 belgigacha")
+    keywords: str = Field(description="Kalit so'zlar, vergul bilan")
+
+def parse_json_response(text):
+    """Parse the JSON object in a model reply, tolerating code fences and surrounding prose"""
+    text = (text or '').strip()
+    if not text:
+        raise ValueError("Empty response from Gemini")
+    fenced = re.match(r'^```(?:json)?\s*(.*?)\s*```$', text, re.S)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            raise
+        data = json.loads(text[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("Gemini response is not a JSON object")
+    return data
 
 class GeminiService:
-    def __init__(self):
+    def __init__(self, client=None):
         api_key = os.environ.get("GEMINI_API_KEY")
-        if api_key:
+        if client is not None:
+            # Injected client, e.g. services.fakes.FakeGeminiClient
+            self.client = client
+            self.available = True
+        elif api_key:
             try:
                 self.client = genai.Client(api_key=api_key)
+                if Config.GEMINI_RECORD_PATH:
+                    self.client = RecordingGeminiClient(self.client, Config.GEMINI_RECORD_PATH)
                 self.available = True
             except Exception as e:
                 logging.warning(f"Failed to initialize Gemini client: {e}")
@@ -21,6 +75,20 @@ class GeminiService:
         
         self.model = "gemini-2.5-flash"
         
+        # Shared call layer: per-method deadlines, retry budget and circuit breaker
+        self.deadlines = Config.GEMINI_DEADLINES
+        self.max_attempts = Config.GEMINI_MAX_ATTEMPTS
+        self.breaker = CircuitBreaker(
+            failure_threshold=Config.GEMINI_BREAKER_THRESHOLD,
+            min_calls=Config.GEMINI_BREAKER_MIN_CALLS,
+            window=Config.GEMINI_BREAKER_WINDOW,
+            open_seconds=Config.GEMINI_BREAKER_OPEN_SECONDS,
+        )
+        self.retry_budget = RetryBudget(ratio=Config.GEMINI_RETRY_RATIO)
+        self.call_stats = defaultdict(Counter)
+        self._stats_lock = threading.Lock()
+        self.translation_memory = TranslationMemoryStore('uz', 'ru')
+        
         # Uzbek content prompts
         self.UZBEK_NEWS_PROMPT = """
         O'zbek auditoriya uchun {topic} mavzusida yangilik maqolasi yozing.
@@ -79,6 +147,43 @@ class GeminiService:
             "content_ru": "Rus tilidagi mazmun"
         }}
         """
+        
+        self.BILINGUAL_NEWS_PROMPT = """
+        O'zbek auditoriya uchun {topic} mavzusida yangilik maqolasi yozing, uni rus tiliga
+        tarjima qiling va Telegram posti tayyorlang.
+        
+        TALABLAR:
+        - Maqola: O'zbek tili (lotin yozuvi), 600-1000 so'z, rasmiy yangilik uslubi
+        - Mazmuni: O'zbekiston va Markaziy Osiyoga tegishli{context}
+        - SEO: Kalit so'zlar: {keywords}
+        - Rus tilidagi matn: o'sha maqolaning tabiiy rus tilidagi tarjimasi, paragraflar tartibi saqlansin
+        - Telegram posti: 150-250 so'z, o'zbek tilida, 2-3 emoji, #uzbekistan #yangiliklar kabi hashtag,
+          "To'liq maqolani o'qish uchun: [link]" bilan tugasin
+        
+        STRUKTURA:
+        - Qiziqarli sarlavha (45-55 belgi)
+        - Kirish qismi (lead paragraph)
+        - Asosiy mazmun (3-4 paragraf)
+        - Xulosa va kelgusi rejalar
+        
+        O'zbek mentaliteti va madaniyatini hisobga oling. Oilaviy va ma'rifiy kontent yarating.
+        """
+        
+        self.RUSSIAN_SEGMENTS_PROMPT = """
+        Quyidagi o'zbek tilidagi yangilik matni bo'laklarini rus tiliga tarjima qiling.
+        
+        Bo'laklar (JSON massiv): {segments}
+        
+        TALABLAR:
+        - Har bir bo'lakni alohida tarjima qiling
+        - Bo'laklar soni va tartibini saqlang
+        - Tabiiy rus tili, yangilik uslubi
+        
+        Javobni JSON formatida bering:
+        {{
+            "translations": ["1-bo'lak tarjimasi", "2-bo'lak tarjimasi"]
+        }}
+        """
     
     def generate_uzbek_news(self, topic, keywords=""):
         """Generate news article in Uzbek language"""
@@ -89,24 +194,207 @@ class GeminiService:
         try:
             prompt = self.UZBEK_NEWS_PROMPT.format(topic=topic, keywords=keywords)
             
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
+            response = self._generate('generate_uzbek_news', prompt, json_output=True)
             
-            if response.text:
-                import json
-                return json.loads(response.text)
-            else:
-                raise Exception("Empty response from Gemini")
+            return parse_json_response(response.text)
                 
         except Exception as e:
             logging.error(f"Error generating Uzbek news: {e}")
             return None
     
+    def stream_uzbek_news(self, topic, keywords=""):
+        """Stream the Uzbek news article JSON as it is generated
+
+        Yields raw text chunks. Closing the generator (e.g. when the client
+        disconnects) closes the upstream stream so no further tokens are billed.
+        """
+        if not self.available:
+            logging.error("Gemini service not available. Please set GEMINI_API_KEY environment variable.")
+            return
+        
+        prompt = self.UZBEK_NEWS_PROMPT.format(topic=topic, keywords=keywords)
+        yield from self._stream('stream_uzbek_news', prompt)
+    
+    def stream_bilingual_article(self, topic, keywords=""):
+        """Stream the single-call BilingualArticle JSON as it is generated
+
+        Validate the joined chunks with parse_article() once the stream ends.
+        """
+        if not self.available:
+            logging.error("Gemini service not available. Please set GEMINI_API_KEY environment variable.")
+            return
+        
+        prompt = self.bilingual_prompt(topic, keywords)
+        yield from self._stream('stream_bilingual_article', prompt, response_schema=BilingualArticle)
+    
+    def _stream(self, method, prompt, response_schema=None):
+        """generate_content_stream with the deadline, breaker and usage accounting"""
+        if not self.breaker.allow():
+            self._count(method, 'rejected')
+            raise CircuitOpenError("Gemini circuit breaker is open")
+        
+        success = False
+        # Only failures that say something about upstream health count against the breaker
+        healthy = False
+        outcome = 'error'
+        usage_metadata = None
+        stream = None
+        started = time.monotonic()
+        try:
+            stream = self.client.models.generate_content_stream(
+                model=self.model,
+                contents=prompt,
+                config=self._request_config(method, self.deadlines[method], json_output=True,
+                                            response_schema=response_schema)
+            )
+            for chunk in stream:
+                # Counts are cumulative; the last chunk carries the totals
+                usage_metadata = chunk.usage_metadata or usage_metadata
+                if chunk.text:
+                    yield chunk.text
+            success = healthy = True
+            outcome = 'ok'
+        except GeneratorExit:
+            # The editor aborted; this says nothing about upstream health
+            success = healthy = True
+            outcome = 'aborted'
+            raise
+        except Exception as e:
+            healthy = not self._is_retryable(e)
+            raise
+        finally:
+            self.breaker.record(healthy)
+            self._count(method, 'ok' if success else 'error')
+            record_call(method, self.model, outcome, (time.monotonic() - started) * 1000,
+                        usage_metadata=usage_metadata)
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+
+    def _generate(self, method, prompt, json_output=False, response_schema=None):
+        """Call generate_content with a deadline, budgeted retries and the breaker
+
+        Every finished call is appended to the gemini_calls usage log with
+        its latency (all attempts included) and token counts.
+        Raises CircuitOpenError without calling the API while the breaker is
+        open; callers fall back to their usual defaults.
+        """
+        if not self.breaker.allow():
+            self._count(method, 'rejected')
+            raise CircuitOpenError("Gemini circuit breaker is open")
+        
+        self.retry_budget.deposit()
+        started = time.monotonic()
+        deadline = started + self.deadlines[method]
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=prompt,
+                    config=self._request_config(method, remaining, json_output, response_schema)
+                )
+            except Exception as e:
+                retryable = self._is_retryable(e)
+                self.breaker.record(not retryable)
+                delay = backoff_delay(attempt)
+                if (not retryable or attempt >= self.max_attempts
+                        or self.breaker.state == CircuitBreaker.OPEN
+                        or time.monotonic() + delay >= deadline
+                        or not self.retry_budget.try_spend()):
+                    self._count(method, 'error')
+                    record_call(method, self.model, 'error', (time.monotonic() - started) * 1000, attempt)
+                    raise
+                logging.warning(f"Gemini {method} attempt {attempt} failed ({e}); retrying in {delay:.1f}s")
+                self._count(method, 'retry')
+                time.sleep(delay)
+                continue
+            
+            self.breaker.record(True)
+            self._count(method, 'ok')
+            record_call(method, self.model, 'ok', (time.monotonic() - started) * 1000, attempt,
+                        response.usage_metadata)
+            return response
+    
+    def _request_config(self, method, timeout_seconds, json_output=False, response_schema=None):
+        """Build the request config carrying the per-attempt HTTP timeout"""
+        http_options = types.HttpOptions(timeout=max(1000, int(timeout_seconds * 1000)))
+        if response_schema is not None:
+            return types.GenerateContentConfig(response_mime_type="application/json",
+                                               response_schema=response_schema,
+                                               http_options=http_options)
+        if json_output:
+            return types.GenerateContentConfig(response_mime_type="application/json",
+                                               http_options=http_options)
+        return types.GenerateContentConfig(http_options=http_options)
+    
+    @staticmethod
+    def _is_retryable(error):
+        """Timeouts, connection failures, rate limits and 5xx responses are retryable"""
+        if isinstance(error, errors.APIError):
+            return error.code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError))
+    
+    def _count(self, method, outcome):
+        with self._stats_lock:
+            self.call_stats[method][outcome] += 1
+    
+    def metrics(self):
+        """Breaker state and call counters for monitoring"""
+        with self._stats_lock:
+            calls = {method: dict(counts) for method, counts in self.call_stats.items()}
+        return {
+            'available': self.available,
+            'breaker_state': self.breaker.state,
+            'breaker_error_rate': round(self.breaker.error_rate(), 3),
+            'breaker_times_opened': self.breaker.times_opened,
+            'breaker_rejected': self.breaker.rejected,
+            'retry_budget_tokens': round(self.retry_budget.tokens, 2),
+            'retries_spent': self.retry_budget.spent,
+            'retries_denied': self.retry_budget.denied,
+            'calls': calls,
+        }
+    
+    @staticmethod
+    def extract_partial_field(text, field):
+        """Decode the (possibly unterminated) string value of a JSON field
+
+        Used to show streamed JSON output to editors before it is complete.
+        Returns None while the field has not started yet.
+        """
+        match = re.search(r'"%s"\s*:\s*"' % re.escape(field), text)
+        if not match:
+            return None
+
+        chars = []
+        escapes = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', '\\': '\\', '/': '/'}
+        i = match.end()
+        while i < len(text):
+            char = text[i]
+            if char == '"':
+                break
+            if char == '\\':
+                if i + 1 >= len(text):
+                    break
+                code = text[i + 1]
+                if code == 'u':
+                    if i + 6 > len(text):
+                        break
+                    try:
+                        chars.append(chr(int(text[i + 2:i + 6], 16)))
+                    except ValueError:
+                        pass
+                    i += 6
+                    continue
+                chars.append(escapes.get(code, code))
+                i += 2
+                continue
+            chars.append(char)
+            i += 1
+        return ''.join(chars)
+
     def generate_telegram_post(self, title, content_preview):
         """Generate Telegram post in Uzbek"""
         if not self.available:
@@ -119,10 +407,7 @@ class GeminiService:
                 content_preview=content_preview[:200]
             )
             
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
+            response = self._generate('generate_telegram_post', prompt)
             
             return response.text if response.text else ""
             
@@ -131,35 +416,69 @@ class GeminiService:
             return ""
     
     def translate_to_russian(self, title_uz, content_uz):
-        """Translate Uzbek content to Russian"""
+        """Translate Uzbek content to Russian
+
+        The title and each paragraph are looked up in the translation memory
+        first; only new or changed paragraphs are sent to Gemini, together in
+        one request, and the Russian text is reassembled in the original order.
+        """
         if not self.available:
             logging.error("Gemini service not available. Please set GEMINI_API_KEY environment variable.")
             return None
             
         try:
-            prompt = self.RUSSIAN_TRANSLATION_PROMPT.format(
-                title_uz=title_uz,
-                content_uz=content_uz
-            )
+            segments = [title_uz or ''] + split_paragraphs(content_uz)
+            hashes = {segment: segment_hash(segment) for segment in segments if segment.strip()}
+            known = self.translation_memory.lookup(set(hashes.values()))
             
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
+            missing, pending = [], set()
+            for segment, key in hashes.items():
+                if key not in known and key not in pending:
+                    pending.add(key)
+                    missing.append(segment)
             
-            if response.text:
-                import json
-                return json.loads(response.text)
-            else:
-                return {"title_ru": "", "content_ru": ""}
+            if missing:
+                translated = self._translate_segments(missing)
+                if translated is None:
+                    return self._translate_whole(title_uz, content_uz)
+                for segment, text in zip(missing, translated):
+                    known[hashes[segment]] = text
+                self.translation_memory.store(list(zip(missing, translated)))
+            
+            logging.info(f"Translation memory reused {len(hashes) - len(missing)}/{len(hashes)} segments")
+            result = [known[hashes[segment]] if segment.strip() else segment for segment in segments]
+            return {"title_ru": result[0], "content_ru": "\n".join(result[1:])}
                 
         except Exception as e:
             logging.error(f"Error translating to Russian: {e}")
             return {"title_ru": "", "content_ru": ""}
     
+    def _translate_segments(self, segments):
+        """Translate a list of paragraphs in one request; None if the reply is unusable"""
+        prompt = self.RUSSIAN_SEGMENTS_PROMPT.format(segments=json.dumps(segments, ensure_ascii=False))
+        response = self._generate('translate_to_russian', prompt, json_output=True)
+        try:
+            translations = parse_json_response(response.text).get('translations')
+        except ValueError:
+            translations = None
+        
+        if (not isinstance(translations, list) or len(translations) != len(segments)
+                or not all(isinstance(text, str) for text in translations)):
+            logging.warning("Segment translation returned a mismatched list; translating the whole article")
+            return None
+        return translations
+    
+    def _translate_whole(self, title_uz, content_uz):
+        """Translate title and content in a single prompt without the memory"""
+        prompt = self.RUSSIAN_TRANSLATION_PROMPT.format(
+            title_uz=title_uz,
+            content_uz=content_uz
+        )
+        
+        response = self._generate('translate_to_russian', prompt, json_output=True)
+        
+        return parse_json_response(response.text)
+    
     def summarize_content(self, content, language="uz"):
         """Summarize content for preview"""
         if not self.available:
@@ -172,10 +491,7 @@ class GeminiService:
             else:
                 prompt = f"Summarize the following text briefly (100-150 words): {content[:500]}"
             
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
+            response = self._generate('summarize_content', prompt)
             
             return response.text if response.text else content[:200]
             
@@ -183,51 +499,49 @@ class GeminiService:
             logging.error(f"Error summarizing content: {e}")
             return content[:200]
     
-    def generate_news_content(self, topic, category, region):
-        """Generate comprehensive news content based on topic"""
+    def generate_bilingual_article(self, topic, keywords="", category=None, region=None):
+        """Generate both languages, SEO fields and the Telegram post in one call
+
+        The response is constrained by the BilingualArticle schema and
+        validated into one. Returns None on failure.
+        """
         if not self.available:
             logging.error("Gemini service not available. Please set GEMINI_API_KEY environment variable.")
             return None
             
         try:
-            prompt = f"""
-            Quyidagi mavzu bo'yicha haqiqiy va dolzarb yangilik maqolasi yarating:
-            
-            Mavzu: {topic}
-            Kategoriya: {category}  
-            Hudud: {region}
-            
-            TALABLAR:
-            - Haqiqiy ma'lumotlarga asoslaning
-            - Professional jurnalistik uslub
-            - O'zbek va rus tillarida
-            - SEO optimizatsiyasi
-            
-            JSON formatda javob bering:
-            {{
-                "title_uz": "Jozibali o'zbek tilidagi sarlavha",
-                "title_ru": "Привлекательный заголовок на русском",  
-                "content_uz": "To'liq o'zbek tilidagi matn (300-400 so'z)",
-                "content_ru": "Полный текст на русском языке",
-                "meta_title": "SEO uchun meta sarlavha",
-                "meta_description": "Qisqa tavsif SEO uchun", 
-                "keywords": "kalit so'zlar, vergul bilan"
-            }}
-            """
-            
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
-            
-            if response.text:
-                import json
-                return json.loads(response.text)
-            return None
+            prompt = self.bilingual_prompt(topic, keywords, category, region)
+            response = self._generate('generate_bilingual_article', prompt, response_schema=BilingualArticle)
+            return self.parse_article(response.text, getattr(response, 'parsed', None))
             
         except Exception as e:
-            logging.error(f"Error generating news content: {e}")
+            logging.error(f"Error generating bilingual article: {e}")
             return None
+    
+    def bilingual_prompt(self, topic, keywords="", category=None, region=None):
+        context = ''.join(f"\n        - {label}: {value}" for label, value in
+                          (('Kategoriya', category), ('Hudud', region)) if value)
+        return self.BILINGUAL_NEWS_PROMPT.format(topic=topic, keywords=keywords or topic, context=context)
+    
+    def parse_article(self, text, parsed=None):
+        """Validate a structured reply into a BilingualArticle
+
+        Aligned paragraphs are stored in the translation memory so that a
+        later re-translation after edits only sends the changed paragraphs.
+        """
+        article = parsed if isinstance(parsed, BilingualArticle) else \
+            BilingualArticle.model_validate(parse_json_response(text))
+        
+        paragraphs_uz = split_paragraphs(article.content_uz)
+        paragraphs_ru = split_paragraphs(article.content_ru)
+        if len(paragraphs_uz) == len(paragraphs_ru):
+            self.translation_memory.store(
+                [(article.title_uz, article.title_ru)] +
+                [(uz, ru) for uz, ru in zip(paragraphs_uz, paragraphs_ru) if uz.strip() and ru.strip()]
+            )
+        return article
+    
+    def generate_news_content(self, topic, category, region):
+        """Generate comprehensive news content based on topic"""
+        article = self.generate_bilingual_article(topic, category=category, region=region)
+        return article.model_dump() if article else None
@@ -0,0 +1,93 @@
+import time
+import logging
+from datetime import datetime
+
+from signals import posts_published
+
+class PublishScheduler:
+    """Publish posts whose publish_at has passed, in batches
+
+    Each run publishes up to `batch_size` due posts in one commit and sends
+    `posts_published` once for the whole batch. Featured posts are announced
+    on Telegram one by one; when at least `digest_min_posts` regular posts are
+    due together they are combined into digest messages of up to
+    `digest_max_posts` posts. `fanout` sends them to every matching channel.
+    Run a single scheduler process per database.
+    """
+
+    def __init__(self, app, fanout, batch_size=20, digest_min_posts=3,
+                 digest_max_posts=6, base_url="http://localhost:5000"):
+        self.app = app
+        self.fanout = fanout
+        self.batch_size = batch_size
+        self.digest_min_posts = digest_min_posts
+        self.digest_max_posts = digest_max_posts
+        self.base_url = base_url
+
+    def run_once(self, now=None):
+        """Publish one batch of due posts and return them"""
+        from app import db
+        from models.post import Post
+
+        now = now or datetime.utcnow()
+        posts = Post.query.filter(
+            Post.published == False,
+            Post.publish_at.isnot(None),
+            Post.publish_at <= now
+        ).order_by(Post.publish_at).limit(self.batch_size).all()
+        if not posts:
+            return []
+
+        for post in posts:
+            post.published = True
+            # A due publish_at left behind would re-publish the post if it is unpublished later
+            post.publish_at = None
+        db.session.commit()
+        logging.info(f"Scheduler published {len(posts)} posts")
+
+        posts_published.send(self.app, posts=posts)
+        self.announce(posts)
+        return posts
+
+    def announce(self, posts):
+        """Send newly published posts to Telegram, batching regular ones into digests"""
+        from app import db
+
+        pending = [post for post in posts if not post.telegram_posted]
+        if not pending or not self.fanout.available:
+            return
+
+        single = [post for post in pending if post.featured]
+        regular = [post for post in pending if not post.featured]
+        if len(regular) < self.digest_min_posts:
+            single, regular = pending, []
+
+        sent = self.fanout.deliver(single, self.base_url)
+
+        # Split evenly rather than leaving a one-post digest at the end
+        chunks = -(-len(regular) // self.digest_max_posts)
+        for i in range(chunks):
+            chunk = regular[i * len(regular) // chunks:(i + 1) * len(regular) // chunks]
+            sent |= self.fanout.deliver(chunk, self.base_url, digest=True)
+
+        for post in pending:
+            if post.id in sent:
+                post.telegram_posted = True
+        db.session.commit()
+
+    def run_forever(self, interval=60):
+        """Poll for due posts until interrupted"""
+        from app import db
+
+        logging.info(f"Publish scheduler started, polling every {interval}s")
+        while True:
+            try:
+                with self.app.app_context():
+                    # Drain the backlog before sleeping
+                    while len(self.run_once()) == self.batch_size:
+                        pass
+            except Exception as e:
+                logging.error(f"Scheduler run failed: {e}")
+                with self.app.app_context():
+                    db.session.rollback()
+            time.sleep(interval)
@@ -0,0 +1,207 @@
+import os
+import gzip
+import json
+import fcntl
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from flask import render_template, session
+
+LANGUAGES = ('uz', 'ru')
+MANIFEST = 'manifest.json'
+LOCK = '.lock'
+
+class StaticExporter:
+    """Render public pages into `directory` so the web server can serve them without Python
+
+    Layout is <lang>/index.html, <lang>/yangilik/<slug>.html and
+    <lang>/kategoriya/<name>.html (first page of the listing), each with a
+    gzip twin for nginx `gzip_static`. Files are replaced atomically and
+    only rewritten when their content changed. manifest.json maps post ids
+    to exported slugs so deleted or unpublished posts can be removed.
+
+    Serve with `map $cookie_lang $lang { default uz; ru ru; }` and
+    `try_files /$lang$uri.html /$lang${uri}index.html @app;`, sending
+    requests with a query string or a session cookie to the app.
+
+    Changes signalled from requests are exported on one background thread
+    per process; ids that arrive while it runs are collected and exported
+    together in its next pass, so a burst of edits costs one or two renders
+    of the listings instead of one per edit.
+    """
+
+    def __init__(self, app, directory, base_url=None):
+        self.app = app
+        self.directory = os.path.abspath(directory)
+        self.base_url = base_url
+        self._pending = set()
+        self._worker = None
+        self._pending_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def export_all(self):
+        """Render every published post and listing and prune stale files; returns files written"""
+        from models.post import Post
+
+        with self._locked(), self.app.app_context():
+            manifest, keep, written = {}, set(), 0
+            for post in Post.query.filter_by(published=True).order_by(Post.id).yield_per(200):
+                manifest[str(post.id)] = post.slug
+                written += self._export_post(post, keep)
+            written += self._export_listings(keep)
+            self._prune(keep)
+            self._save_manifest(manifest)
+        logging.info(f"Static export: {written} files written, {len(manifest)} posts")
+        return written
+
+    def export_posts(self, post_ids):
+        """Re-render these posts (removing unpublished ones), the home page and the category listings"""
+        from models.post import Post
+
+        post_ids = {int(post_id) for post_id in post_ids}
+        with self._locked(), self.app.app_context():
+            manifest = self._load_manifest()
+            posts = {post.id: post for post in Post.query.filter(Post.id.in_(post_ids)).all()}
+            written = 0
+            for post_id in post_ids:
+                post = posts.get(post_id)
+                old_slug = manifest.pop(str(post_id), None)
+                if post is not None and post.published:
+                    written += self._export_post(post)
+                    manifest[str(post_id)] = post.slug
+                if old_slug and (post is None or not post.published or post.slug != old_slug):
+                    self._remove_post(old_slug)
+            written += self._export_listings()
+            self._save_manifest(manifest)
+        return written
+
+    def on_posts_changed(self, sender, posts=None, post_ids=None, **kwargs):
+        """Receiver for posts_published and posts_changed; queues the ids for the export thread"""
+        ids = post_ids if post_ids is not None else [post.id for post in posts or ()]
+        with self._pending_lock:
+            self._pending.update(ids)
+            if self._worker is not None:
+                return
+            # Not a daemon: short-lived CLI processes wait for the export before exiting
+            self._worker = threading.Thread(target=self._drain, name='static-export')
+            self._worker.start()
+
+    def _drain(self):
+        while True:
+            with self._pending_lock:
+                ids, self._pending = self._pending, set()
+                if not ids:
+                    self._worker = None
+                    return
+            try:
+                self.export_posts(ids)
+            except Exception as e:
+                logging.error(f"Static export failed for posts {sorted(ids)}: {e}")
+
+    def _after_fork(self):
+        # The export thread does not survive a fork; the parent exports its own queue
+        self._pending = set()
+        self._worker = None
+        self._pending_lock = threading.Lock()
+
+    def _export_post(self, post, keep=None):
+        from routes import post_context
+
+        return sum(self._render(language, f"yangilik/{post.slug}.html", post.get_absolute_url(),
+                                'post.html', lambda: post_context(post), keep)
+                   for language in LANGUAGES)
+
+    def _export_listings(self, keep=None):
+        from routes import category_page, home_context
+        from config import Config
+
+        written = 0
+        for language in LANGUAGES:
+            written += self._render(language, 'index.html', '/', 'index.html', home_context, keep)
+            for name in Config.UZBEK_CATEGORIES:
+                written += self._render(language, f"kategoriya/{name}.html", f"/kategoriya/{name}", 'category.html',
+                                        lambda: {'posts': category_page(name), 'category_name': name}, keep)
+        return written
+
+    def _render(self, language, relative, url, template, context, keep):
+        from config import Config
+
+        relative = f"{language}/{relative}"
+        if keep is not None:
+            keep.add(relative)
+        with self.app.test_request_context(url, base_url=self.base_url or Config.SITE_URL):
+            session['language'] = language
+            html = render_template(template, config=Config, static_export=True, **context())
+        return self._write(relative, html.encode('utf-8'))
+
+    def _path(self, relative):
+        path = os.path.abspath(os.path.join(self.directory, relative))
+        if not path.startswith(self.directory + os.sep):
+            raise ValueError(f"Refusing to write outside the export directory: {relative}")
+        return path
+
+    def _write(self, relative, content):
+        path = self._path(relative)
+        try:
+            with open(path, 'rb') as f:
+                if f.read() == content:
+                    return 0
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # The .gz goes first: gzip-capable clients never see the older copy
+        # once the plain file has been replaced
+        self._replace(path + '.gz', gzip.compress(content, 9, mtime=0))
+        self._replace(path, content)
+        return 1
+
+    @staticmethod
+    def _replace(path, data):
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def _remove_post(self, slug):
+        for language in LANGUAGES:
+            path = self._path(f"{language}/yangilik/{slug}.html")
+            for name in (path, path + '.gz'):
+                try:
+                    os.unlink(name)
+                except FileNotFoundError:
+                    pass
+
+    def _prune(self, keep):
+        for language in LANGUAGES:
+            for root, _, files in os.walk(os.path.join(self.directory, language)):
+                for name in files:
+                    relative = os.path.relpath(os.path.join(root, name), self.directory)
+                    if relative.removesuffix('.gz') not in keep:
+                        os.unlink(os.path.join(root, name))
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        self._replace(os.path.join(self.directory, MANIFEST), json.dumps(manifest).encode('utf-8'))
+
+    @contextmanager
+    def _locked(self):
+        """Serialize exports across worker processes"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
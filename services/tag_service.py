@@ -0,0 +1,203 @@
+import logging
+
+from sqlalchemy import event, func, inspect, select, text, update
+from sqlalchemy.orm import selectinload
+from slugify import slugify
+
+from utils.helpers import clean_uzbek_text
+
+TRIGGER = 'tags_count'
+
+# posts.published is checked when a link is added or removed, and every
+# linked tag moves by one when a post is published or unpublished
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {TRIGGER}_link_insert AFTER INSERT ON post_tags BEGIN
+        UPDATE tags SET post_count = post_count + 1
+        WHERE id = NEW.tag_id AND EXISTS (SELECT 1 FROM posts WHERE id = NEW.post_id AND published);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TRIGGER}_link_delete AFTER DELETE ON post_tags BEGIN
+        UPDATE tags SET post_count = post_count - 1
+        WHERE id = OLD.tag_id AND EXISTS (SELECT 1 FROM posts WHERE id = OLD.post_id AND published);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TRIGGER}_post_delete BEFORE DELETE ON posts WHEN OLD.published BEGIN
+        UPDATE tags SET post_count = post_count - 1
+        WHERE id IN (SELECT tag_id FROM post_tags WHERE post_id = OLD.id);
+    END""",
+    # Foreign keys are not enforced on SQLite, so links of deleted posts go here
+    f"""CREATE TRIGGER IF NOT EXISTS {TRIGGER}_post_unlink AFTER DELETE ON posts BEGIN
+        DELETE FROM post_tags WHERE post_id = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TRIGGER}_publish AFTER UPDATE OF published ON posts
+    WHEN COALESCE(OLD.published, 0) != COALESCE(NEW.published, 0) BEGIN
+        UPDATE tags SET post_count = post_count + CASE WHEN NEW.published THEN 1 ELSE -1 END
+        WHERE id IN (SELECT tag_id FROM post_tags WHERE post_id = NEW.id);
+    END""",
+]
+
+POSTGRES_TRIGGERS = f"""
+CREATE OR REPLACE FUNCTION tags_count_links() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE tags SET post_count = post_count + 1
+        WHERE id = NEW.tag_id AND EXISTS (SELECT 1 FROM posts WHERE id = NEW.post_id AND published);
+    ELSE
+        UPDATE tags SET post_count = post_count - 1
+        WHERE id = OLD.tag_id AND EXISTS (SELECT 1 FROM posts WHERE id = OLD.post_id AND published);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tags_count_posts() RETURNS trigger AS $$
+BEGIN
+    -- Before a delete, while the links are still there; the cascade then
+    -- removes them without counting the post a second time
+    IF TG_OP = 'DELETE' THEN
+        IF OLD.published THEN
+            UPDATE tags SET post_count = post_count - 1
+            WHERE id IN (SELECT tag_id FROM post_tags WHERE post_id = OLD.id);
+        END IF;
+        RETURN OLD;
+    END IF;
+    UPDATE tags SET post_count = post_count + CASE WHEN NEW.published THEN 1 ELSE -1 END
+    WHERE id IN (SELECT tag_id FROM post_tags WHERE post_id = NEW.id);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {TRIGGER}_links AFTER INSERT OR DELETE ON post_tags
+    FOR EACH ROW EXECUTE FUNCTION tags_count_links();
+CREATE TRIGGER {TRIGGER}_post_delete BEFORE DELETE ON posts
+    FOR EACH ROW EXECUTE FUNCTION tags_count_posts();
+CREATE TRIGGER {TRIGGER}_publish AFTER UPDATE OF published ON posts
+    FOR EACH ROW WHEN (COALESCE(OLD.published, false) <> COALESCE(NEW.published, false))
+    EXECUTE FUNCTION tags_count_posts();
+"""
+
+def parse_keywords(keywords):
+    """[(slug, name)] of the distinct tags in a comma-separated keywords string"""
+    tags = {}
+    for part in (keywords or '').split(','):
+        name = ' '.join(clean_uzbek_text(part).split())[:100]
+        slug = slugify(name)[:120]
+        if slug and slug not in tags:
+            tags[slug] = name
+    return list(tags.items())
+
+def assign_tags(session, posts):
+    """Point each post's tags at its keywords, creating missing tags"""
+    from models.tag import Tag
+
+    parsed = {post: parse_keywords(post.keywords) for post in posts}
+    slugs = {slug for tags in parsed.values() for slug, _ in tags}
+    with session.no_autoflush:
+        known = {tag.slug: tag for tag in session.new if isinstance(tag, Tag)}
+        if slugs:
+            known.update((tag.slug, tag) for tag in session.scalars(select(Tag).where(Tag.slug.in_(slugs))))
+        for post, tags in parsed.items():
+            for slug, name in tags:
+                if slug not in known:
+                    known[slug] = Tag(name=name, slug=slug, post_count=0)
+                    session.add(known[slug])
+            wanted = [known[slug] for slug, _ in tags]
+            if set(wanted) != set(post.tags):
+                post.tags = wanted
+
+def _sync_changed_keywords(session, flush_context, instances):
+    from models.post import Post
+
+    posts = [post for post in session.new if isinstance(post, Post) and post.keywords]
+    posts += [post for post in session.dirty
+              if isinstance(post, Post) and inspect(post).attrs.keywords.history.has_changes()]
+    if posts:
+        assign_tags(session, posts)
+
+def watch_keywords(session_class):
+    """Re-derive a post's tags whenever a flush writes a new post or changed keywords"""
+    event.listen(session_class, 'before_flush', _sync_changed_keywords)
+
+def migrate(db, batch_size=500):
+    """Create tags for every existing post from its keywords; returns the number of posts read"""
+    from models.post import Post
+
+    last_id, count = 0, 0
+    while True:
+        posts = (Post.query.options(selectinload(Post.tags)).filter(Post.id > last_id)
+                 .order_by(Post.id).limit(batch_size).all())
+        if not posts:
+            break
+        assign_tags(db.session, posts)
+        db.session.commit()
+        last_id = posts[-1].id
+        count += len(posts)
+        # Keep the identity map from growing over the whole table
+        db.session.expunge_all()
+    return count
+
+def _has_triggers(connection):
+    if connection.dialect.name == 'sqlite':
+        query = text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name")
+    else:
+        query = text("SELECT 1 FROM pg_trigger WHERE tgname = :name")
+    return connection.execute(query, {'name': f"{TRIGGER}_publish"}).first() is not None
+
+def install_triggers(db):
+    """Create the tag count triggers if missing and recount once
+
+    Returns False for databases other than SQLite and PostgreSQL, where
+    tags.post_count is only corrected by `reconcile-counters --fix`.
+    """
+    from utils.database import write_engine
+
+    engine = write_engine(db)
+    if engine.dialect.name not in ('sqlite', 'postgresql'):
+        logging.warning(f"Tag counts are not maintained on {engine.dialect.name}")
+        return False
+    with engine.begin() as connection:
+        if _has_triggers(connection):
+            return True
+        if engine.dialect.name == 'sqlite':
+            for statement in SQLITE_TRIGGERS:
+                connection.execute(text(statement))
+        else:
+            connection.execute(text(POSTGRES_TRIGGERS))
+        rebuild(connection)
+    logging.info("Tag count triggers installed")
+    return True
+
+def expected_counts(connection):
+    """{slug: published posts} counted from post_tags"""
+    from models.post import Post
+    from models.tag import Tag, post_tags
+
+    query = (select(Tag.slug, func.count(Post.id))
+             .select_from(Tag.__table__)
+             .outerjoin(post_tags, post_tags.c.tag_id == Tag.id)
+             .outerjoin(Post.__table__, (Post.id == post_tags.c.post_id) & (Post.published == True))
+             .group_by(Tag.slug))
+    return dict(connection.execute(query).all())
+
+def rebuild(connection):
+    """Recount tags.post_count from post_tags"""
+    from models.post import Post
+    from models.tag import Tag, post_tags
+
+    published = (select(func.count()).select_from(post_tags)
+                 .join(Post.__table__, Post.id == post_tags.c.post_id)
+                 .where(post_tags.c.tag_id == Tag.id, Post.published == True)
+                 .scalar_subquery())
+    connection.execute(update(Tag.__table__).values(post_count=published))
+
+def reconcile(db, fix=False):
+    """[('tag', slug, expected, stored)] for tags whose post_count drifted"""
+    from models.tag import Tag
+    from utils.database import write_engine
+
+    with write_engine(db).begin() as connection:
+        expected = expected_counts(connection)
+        stored = dict(connection.execute(select(Tag.slug, Tag.post_count)).all())
+        drift = [('tag', slug, expected[slug], stored.get(slug))
+                 for slug in sorted(expected) if expected[slug] != stored.get(slug)]
+        if fix and drift:
+            rebuild(connection)
+    return drift
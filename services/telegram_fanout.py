@@ -0,0 +1,256 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from telegram.error import NetworkError, RetryAfter, TelegramError
+
+LANGUAGES = ('uz', 'ru')
+
+class Channel:
+    """A chat that receives the posts matching its language, categories and regions
+
+    Empty `categories` or `regions` match every post; with `featured_only`
+    only featured posts are sent.
+    """
+
+    def __init__(self, chat_id, language='uz', categories=None, regions=None, featured_only=False, name=None):
+        if language not in LANGUAGES:
+            raise ValueError(f"Unsupported channel language {language!r}")
+        self.chat_id = str(chat_id)
+        self.language = language
+        self.categories = set(categories or ())
+        self.regions = set(regions or ())
+        self.featured_only = featured_only
+        self.name = name or self.chat_id
+
+    def matches(self, post):
+        return ((not self.categories or post.category in self.categories)
+                and (not self.regions or post.region in self.regions)
+                and (not self.featured_only or post.featured))
+
+    def __repr__(self):
+        return f'<Channel {self.name} {self.language}>'
+
+class ChannelRegistry:
+    """The chats posts are announced in"""
+
+    def __init__(self, channels):
+        self.channels = list(channels)
+
+    @classmethod
+    def from_config(cls, spec, default_chat_id=None):
+        """Channels from a JSON list (or the path of a JSON file); the default chat in Uzbek when empty
+
+        Malformed entries are logged and left out.
+        """
+        spec = (spec or '').strip()
+        if not spec:
+            return cls([Channel(default_chat_id)] if default_chat_id else [])
+        try:
+            if not spec.startswith('['):
+                with open(spec, encoding='utf-8') as f:
+                    spec = f.read()
+            entries = json.loads(spec)
+        except (OSError, ValueError) as e:
+            logging.error(f"Ignoring TELEGRAM_CHANNELS: {e}")
+            return cls([Channel(default_chat_id)] if default_chat_id else [])
+        channels = []
+        for entry in entries:
+            try:
+                channels.append(Channel(**entry))
+            except (TypeError, ValueError) as e:
+                logging.error(f"Ignoring Telegram channel {entry!r}: {e}")
+        return cls(channels)
+
+    def routes(self, posts):
+        """[(channel, matching posts)] for channels with at least one match"""
+        routes = []
+        for channel in self.channels:
+            matching = [post for post in posts if channel.matches(post)]
+            if matching:
+                routes.append((channel, matching))
+        return routes
+
+class ChatRateLimiter:
+    """Spaces messages to the same chat at least `interval` seconds apart in this process
+
+    Every send reserves the chat's next free slot, so concurrent senders
+    queue up instead of all hitting Telegram's flood limit at once. Other
+    processes are only seen through FanoutSender seeding it from
+    telegram_deliveries; two processes sending at the same moment can still
+    both use a slot.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, chat_id):
+        """Seconds to wait before sending to `chat_id`"""
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next.get(chat_id, 0.0))
+            self._next[chat_id] = at + self.interval
+        return at - now
+
+    def block(self, chat_id, seconds):
+        """Keep the chat quiet for `seconds`, e.g. after a RetryAfter"""
+        with self._lock:
+            self._next[chat_id] = max(self._next.get(chat_id, 0.0), time.monotonic() + seconds)
+
+    async def wait(self, chat_id):
+        delay = self.reserve(chat_id)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class FanoutSender:
+    """Announce posts in every matching channel concurrently on one event loop
+
+    At most `concurrency` messages are in flight; messages to one chat go
+    through the per-chat limiter, and a RetryAfter pauses that chat before
+    the message is retried (up to `max_retries` times, network errors too).
+    Chats that already have a 'sent' delivery of a post are skipped, so a
+    repeated call only retries what failed. Each (post, chat) outcome is
+    stored in telegram_deliveries.
+    """
+
+    def __init__(self, telegram_service, registry, concurrency=8, chat_interval=1.0, max_retries=2):
+        self.telegram_service = telegram_service
+        self.registry = registry
+        self.concurrency = concurrency
+        self.limiter = ChatRateLimiter(chat_interval)
+        self.max_retries = max_retries
+
+    @property
+    def available(self):
+        return self.telegram_service.available and bool(self.registry.channels)
+
+    def deliver(self, posts, base_url, digest=False):
+        """Send `posts` (one message each, or as digests per channel); returns the ids sent to any chat"""
+        if not posts or not self.available:
+            return set()
+        already_sent = self._sent_deliveries([post.id for post in posts])
+        jobs, outcomes = self._plan(posts, base_url, digest, already_sent)
+        if jobs:
+            self._seed_limiter({channel.chat_id for channel, _, _ in jobs})
+            results = self.telegram_service._run_sync(self._send_all(jobs))
+            if results is False:
+                results = [('failed', None, 0, 'Event loop failed')] * len(jobs)
+            for (channel, job_posts, _), (status, message_id, attempts, error) in zip(jobs, results):
+                outcomes += [(post.id, channel, status, message_id, attempts, error) for post in job_posts]
+        self._record(outcomes)
+        sent = {post_id for post_id, _ in already_sent}
+        return sent | {post_id for post_id, _, status, *_ in outcomes if status == 'sent'}
+
+    def _plan(self, posts, base_url, digest, already_sent):
+        """([(channel, posts, messages)], skipped outcomes)"""
+        service = self.telegram_service
+        jobs, skipped = [], []
+        for channel, matching in self.registry.routes(posts):
+            pending = [post for post in matching if (post.id, channel.chat_id) not in already_sent]
+            messages = [(post, service.format_post(post, base_url, channel.language)) for post in pending]
+            skipped += [(post.id, channel, 'skipped', None, 0, f"No {channel.language} text")
+                        for post, text in messages if text is None]
+            messages = [(post, text) for post, text in messages if text is not None]
+            if digest and len(messages) > 1:
+                digest_posts = [post for post, _ in messages]
+                jobs.append((channel, digest_posts, service._format_digest(digest_posts, base_url, channel.language)))
+            else:
+                jobs += [(channel, [post], [text]) for post, text in messages]
+        return jobs, skipped
+
+    async def _send_all(self, jobs):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self._send_job(semaphore, channel, messages)
+                                      for channel, _, messages in jobs))
+
+    async def _send_job(self, semaphore, channel, messages):
+        """(status, first message id, attempts, error) for the messages of one job, sent in order"""
+        bot = self.telegram_service.bot
+        message_id, attempts = None, 0
+        for text in messages:
+            for _ in range(self.max_retries + 1):
+                attempts += 1
+                # Wait for the chat's slot before taking a concurrency slot
+                await self.limiter.wait(channel.chat_id)
+                try:
+                    async with semaphore:
+                        sent = await bot.send_message(chat_id=channel.chat_id, text=text, parse_mode='HTML',
+                                                      disable_web_page_preview=False)
+                    message_id = message_id or sent.message_id
+                    break
+                except RetryAfter as e:
+                    error = f"Flood control, retry after {e.retry_after}"
+                    self.limiter.block(channel.chat_id, seconds(e.retry_after))
+                except NetworkError as e:
+                    error = f"Network error: {e}"
+                except TelegramError as e:
+                    logging.error(f"Telegram error for {channel.name}: {e}")
+                    return 'failed', message_id, attempts, str(e)[:500]
+                except Exception as e:
+                    logging.error(f"Error sending to {channel.name}: {e}")
+                    return 'failed', message_id, attempts, str(e)[:500]
+            else:
+                logging.error(f"Giving up on {channel.name} after {attempts} attempts: {error}")
+                return 'failed', message_id, attempts, error[:500]
+        logging.info(f"Sent {len(messages)} message(s) to {channel.name}")
+        return 'sent', message_id, attempts, None
+
+    def _seed_limiter(self, chat_ids):
+        """Start each chat's spacing from its last recorded delivery, possibly made by another process"""
+        from models.telegram_delivery import TelegramDelivery
+
+        now = datetime.utcnow()
+        rows = TelegramDelivery.query.with_entities(TelegramDelivery.chat_id, func.max(TelegramDelivery.updated_at)).filter(
+            TelegramDelivery.updated_at >= now - timedelta(seconds=self.limiter.interval),
+            TelegramDelivery.chat_id.in_(chat_ids), TelegramDelivery.status == 'sent',
+        ).group_by(TelegramDelivery.chat_id)
+        for chat_id, last in rows:
+            self.limiter.block(chat_id, self.limiter.interval - (now - last).total_seconds())
+
+    def _sent_deliveries(self, post_ids):
+        from models.telegram_delivery import TelegramDelivery
+
+        rows = TelegramDelivery.query.with_entities(TelegramDelivery.post_id, TelegramDelivery.chat_id).filter(
+            TelegramDelivery.post_id.in_(post_ids), TelegramDelivery.status == 'sent')
+        return {(post_id, chat_id) for post_id, chat_id in rows}
+
+    def _record(self, outcomes):
+        from app import db
+        from models.telegram_delivery import TelegramDelivery
+
+        if not outcomes:
+            return
+        existing = {(row.post_id, row.chat_id): row for row in TelegramDelivery.query.filter(
+            TelegramDelivery.post_id.in_({outcome[0] for outcome in outcomes}))}
+        for post_id, channel, status, message_id, attempts, error in outcomes:
+            row = existing.get((post_id, channel.chat_id))
+            if row is None:
+                row = existing[(post_id, channel.chat_id)] = TelegramDelivery(
+                    post_id=post_id, chat_id=channel.chat_id, attempts=0)
+                db.session.add(row)
+            row.language = channel.language
+            row.status = status
+            row.message_id = message_id
+            row.attempts = (row.attempts or 0) + attempts
+            row.error = error
+        try:
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Failed to record Telegram deliveries: {e}")
+            db.session.rollback()
+
+def seconds(value):
+    """RetryAfter.retry_after is an int in older python-telegram-bot releases and a timedelta in newer ones"""
+    return value.total_seconds() if hasattr(value, 'total_seconds') else float(value)
+
+def fanout_from_config(telegram_service, config):
+    """A FanoutSender over the channels in TELEGRAM_CHANNELS"""
+    registry = ChannelRegistry.from_config(config.TELEGRAM_CHANNELS, telegram_service.channel_id)
+    return FanoutSender(telegram_service, registry, concurrency=config.TELEGRAM_FANOUT_CONCURRENCY,
+                        chat_interval=config.TELEGRAM_CHAT_INTERVAL, max_retries=config.TELEGRAM_MAX_RETRIES)
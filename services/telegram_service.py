@@ -1,4 +1,5 @@
 import os
+import html
 import logging
 import asyncio
 from telegram import Bot
@@ -6,12 +7,27 @@ from telegram.error import TelegramError
 from datetime import datetime
 import pytz
 
+# Telegram rejects messages longer than this many characters
+MAX_MESSAGE_LENGTH = 4096
+
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+READ_MORE = {'uz': "📖 Batafsil", 'ru': "📖 Подробнее"}
+READ_MORE_FULL = {'uz': "To'liq maqolani o'qish uchun...", 'ru': "Читать статью полностью..."}
+HASHTAGS = {'uz': "#UzbekNews #Uzbekistan #Yangiliklar", 'ru': "#UzbekNews #Узбекистан #Новости"}
+DIGEST_HEADER = {'uz': "🗞 <b>Yangiliklar dayjesti</b> ({count} ta)", 'ru': "🗞 <b>Дайджест новостей</b> ({count})"}
+
 class TelegramService:
-    def __init__(self):
+    def __init__(self, bot=None, channel_id=None):
         self.bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
-        self.channel_id = os.environ.get('TELEGRAM_CHANNEL_ID')
+        self.channel_id = channel_id or os.environ.get('TELEGRAM_CHANNEL_ID')
         
-        if self.bot_token:
+        if bot is not None:
+            # Injected bot, e.g. services.fakes.FakeTelegramBot
+            self.bot = bot
+            self.channel_id = self.channel_id or '@fake_channel'
+            self.available = True
+        elif self.bot_token:
             try:
                 self.bot = Bot(token=self.bot_token)
                 self.available = True
@@ -28,14 +44,20 @@ class TelegramService:
     
     async def send_news_post(self, post, base_url="http://localhost:5000"):
         """Send news post to Telegram channel"""
+        return await self.send_message(self._format_message(post, base_url))
+    
+    async def send_digest(self, posts, base_url="http://localhost:5000"):
+        """Send several posts as digest messages; returns True if all were sent"""
+        results = [await self.send_message(message) for message in self._format_digest(posts, base_url)]
+        return bool(results) and all(results)
+    
+    async def send_message(self, message):
+        """Send a formatted HTML message to the channel"""
         if not self.available or not self.bot or not self.channel_id:
             logging.error("Telegram bot or channel not configured")
             return False
         
         try:
-            # Format message
-            message = self._format_message(post, base_url)
-            
             # Send message
             sent_message = await self.bot.send_message(
                 chat_id=self.channel_id,
@@ -54,13 +76,29 @@ class TelegramService:
             logging.error(f"Error sending to Telegram: {e}")
             return False
     
-    def _format_message(self, post, base_url):
+    def format_post(self, post, base_url, language='uz'):
+        """Message for one post in `language`, or None when the post has no text in it
+
+        The generated Telegram text is used where present, otherwise the
+        title and the start of the article.
+        """
+        telegram_text = post.telegram_content_ru if language == 'ru' else post.telegram_content_uz
+        if telegram_text and telegram_text.strip():
+            return (f"{html.escape(telegram_text.strip())}\n\n"
+                    f'<a href="{base_url}{post.get_absolute_url()}">{READ_MORE[language]}</a>')
+        if language == 'ru' and not (post.title_ru and post.content_ru):
+            return None
+        return self._format_message(post, base_url, language)
+    
+    def _format_message(self, post, base_url, language='uz', summary_length=200):
         """Format post for Telegram"""
-        # Use Uzbek content
-        title = post.title_uz
+        if language == 'ru':
+            title, content = post.title_ru, post.content_ru
+        else:
+            title, content = post.title_uz, post.content_uz
         
         # Get summary from content
-        summary = post.content_uz[:200] + "..." if len(post.content_uz) > 200 else post.content_uz
+        summary = content[:summary_length] + "..." if len(content) > summary_length else content
         
         # Get current time in Tashkent
         now = datetime.now(self.tashkent_tz)
@@ -78,13 +116,33 @@ class TelegramService:
 📅 {time_str}
 🏷️ #{post.category.replace(" ", "").replace("'", "")}
 
-<a href="{base_url}{post.get_absolute_url()}">📖 To'liq maqolani o'qish uchun...</a>
+<a href="{base_url}{post.get_absolute_url()}">📖 {READ_MORE_FULL[language]}</a>
 
-#UzbekNews #Uzbekistan #Yangiliklar
+{HASHTAGS[language]}
         """.strip()
         
         return message
     
+    def _format_digest(self, posts, base_url, language='uz'):
+        """Join the _format_message texts of several posts into as few messages as fit
+
+        Messages are only split between posts; a post too long for a message
+        of its own is rendered without its summary, never cut mid-tag.
+        """
+        header = DIGEST_HEADER[language].format(count=len(posts))
+        messages, current = [], header
+        for post in posts:
+            text = self._format_message(post, base_url, language)
+            if len(header) + len(DIGEST_SEPARATOR) + len(text) > MAX_MESSAGE_LENGTH:
+                text = self._format_message(post, base_url, language, summary_length=0)
+            candidate = current + DIGEST_SEPARATOR + text
+            if len(candidate) > MAX_MESSAGE_LENGTH and current != header:
+                messages.append(current)
+                candidate = text
+            current = candidate
+        messages.append(current)
+        return messages
+    
     def _get_category_emoji(self, category):
         """Get emoji for category"""
         emoji_map = {
@@ -102,16 +160,22 @@ class TelegramService:
     
     def send_news_sync(self, post, base_url="http://localhost:5000"):
         """Synchronous wrapper for sending news"""
+        return self._run_sync(self.send_news_post(post, base_url))
+    
+    def send_digest_sync(self, posts, base_url="http://localhost:5000"):
+        """Synchronous wrapper for sending a digest"""
+        return self._run_sync(self.send_digest(posts, base_url))
+    
+    def _run_sync(self, coroutine):
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If we're already in an event loop, create a new thread
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, self.send_news_post(post, base_url))
-                    return future.result()
-            else:
-                return asyncio.run(self.send_news_post(post, base_url))
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(coroutine)
+            # If we're already in an event loop, run in a new thread
+            import concurrent.futures
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                return executor.submit(asyncio.run, coroutine).result()
         except Exception as e:
             logging.error(f"Error in sync telegram send: {e}")
             return False
@@ -0,0 +1,81 @@
+import re
+import hashlib
+import logging
+from datetime import datetime
+
+from flask import has_app_context
+
+from utils.helpers import clean_uzbek_text
+
+def split_paragraphs(text):
+    """Split text into lines; blank lines are kept so the layout can be rebuilt"""
+    return (text or '').split('\n')
+
+def normalize_segment(text):
+    """Normalize a paragraph so cosmetic whitespace/quote edits hit the memory"""
+    return re.sub(r'\s+', ' ', clean_uzbek_text(text))
+
+def segment_hash(text):
+    return hashlib.sha256(normalize_segment(text).encode('utf-8')).hexdigest()
+
+class TranslationMemoryStore:
+    """Paragraph-level translation memory backed by the translation_memory table"""
+
+    def __init__(self, source_lang='uz', target_lang='ru'):
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+
+    @property
+    def enabled(self):
+        return has_app_context()
+
+    def lookup(self, hashes):
+        """Return {hash: translated_text} for the hashes already in memory"""
+        if not hashes or not self.enabled:
+            return {}
+        from app import db
+        from models.translation import TranslationMemory
+        try:
+            # A flush here would take the writer and hold it across the Gemini call
+            with db.session.no_autoflush:
+                rows = TranslationMemory.query.with_entities(
+                    TranslationMemory.source_hash, TranslationMemory.translated_text
+                ).filter(
+                    TranslationMemory.source_hash.in_(list(hashes)),
+                    TranslationMemory.source_lang == self.source_lang,
+                    TranslationMemory.target_lang == self.target_lang,
+                ).all()
+        except Exception as e:
+            logging.error(f"Translation memory lookup failed: {e}")
+            return {}
+        return dict(rows)
+
+    def store(self, pairs):
+        """Remember (source_text, translated_text) pairs
+
+        Written outside the request session; deferred until it commits when
+        it already holds the writer.
+        """
+        if not pairs or not self.enabled:
+            return
+        from app import db
+        from models.translation import TranslationMemory
+        from utils.database import insert_ignore
+
+        now = datetime.utcnow()
+        rows = {}
+        for source, translated in pairs:
+            key = segment_hash(source)
+            rows[key] = {
+                'source_hash': key,
+                'source_lang': self.source_lang,
+                'target_lang': self.target_lang,
+                'source_text': source,
+                'translated_text': translated,
+                'created_at': now,
+                'updated_at': now,
+            }
+        try:
+            insert_ignore(db, TranslationMemory.__table__, list(rows.values()))
+        except Exception as e:
+            logging.error(f"Translation memory store failed: {e}")
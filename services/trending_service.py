@@ -0,0 +1,183 @@
+import os
+import math
+import time
+import logging
+import threading
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, delete, insert, select, update
+
+# Scores are measured from this point so they stay small floats for decades
+EPOCH = datetime(2024, 1, 1).timestamp()
+
+# Snapshot rows this many half-lives below a fresh single view are dropped
+PRUNE_HALF_LIVES = 20
+
+def log2_add(a, b):
+    """log2(2^a + 2^b) without overflow"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log2(1 + 2 ** (low - high))
+
+class TrendingTracker:
+    """Exponentially time-decayed view scores with an always-sorted top list
+
+    A view at time t adds 2^((t - EPOCH) / half_life) to the post's score. The
+    decay factor is the same for every post, so ranking by these growing,
+    never-decayed scores (kept as log2) is the same as ranking by the decayed
+    ones and nothing has to be rescaled over time. Because only the viewed
+    post's score changes, the top list is updated in O(capacity) per view and
+    read in O(1) per request.
+
+    Each process keeps the views it saw since the last snapshot and, at most
+    every `snapshot_interval` seconds, merges them into trending_scores and
+    reloads the global top list from there on a background thread, so page
+    requests never wait for the database writer.
+    """
+
+    def __init__(self, half_life_hours=6, snapshot_interval=60, capacity=50):
+        self.half_life = half_life_hours * 3600
+        self.snapshot_interval = snapshot_interval
+        self.capacity = capacity
+        self.scores = {}
+        self.top = ()
+        self.pending = {}
+        self.last_snapshot = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def now_score(self, when=None):
+        """log2 weight of a single view at `when` (a timestamp)"""
+        return ((when or time.time()) - EPOCH) / self.half_life
+
+    def record_view(self, post_id, when=None):
+        weight = self.now_score(when)
+        with self._lock:
+            self.pending[post_id] = log2_add(self.pending.get(post_id), weight)
+            self.scores[post_id] = log2_add(self.scores.get(post_id), weight)
+            self._promote(post_id)
+        self._maybe_snapshot()
+
+    def top_ids(self, limit):
+        """Ids of the highest scoring posts, best first"""
+        self._maybe_snapshot()
+        return list(self.top[:limit])
+
+    def decayed_score(self, post_id, when=None):
+        """Current decayed score, roughly 'views in the last half-life'"""
+        score = self.scores.get(post_id)
+        if score is None:
+            return 0.0
+        return 2 ** (score - self.now_score(when))
+
+    def _promote(self, post_id):
+        # Called with the lock held; the top tuple is replaced, never mutated
+        top = [pid for pid in self.top if pid != post_id]
+        score = self.scores[post_id]
+        index = len(top)
+        while index > 0 and self.scores[top[index - 1]] < score:
+            index -= 1
+        if index < self.capacity:
+            top.insert(index, post_id)
+            self.top = tuple(top[:self.capacity])
+
+    def _maybe_snapshot(self):
+        if not has_app_context():
+            return
+        # The first call loads the stored leaderboard
+        if self.last_snapshot is not None and time.monotonic() - self.last_snapshot < self.snapshot_interval:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        self.last_snapshot = time.monotonic()
+        try:
+            threading.Thread(target=self._background_snapshot, args=(current_app._get_current_object(),),
+                             name='trending-snapshot', daemon=True).start()
+        except Exception:
+            self._flush_lock.release()
+            raise
+
+    def _after_fork(self):
+        """Start the child clean: locks and snapshot threads do not survive a fork
+
+        The parent may have forked while its snapshot thread or a request held
+        a lock (gunicorn preload warm-up). Its pending views are the parent's
+        to write, and the next request in the child starts a fresh snapshot.
+        """
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.pending = {}
+        self.last_snapshot = None
+
+    def _background_snapshot(self, app):
+        try:
+            with app.app_context():
+                self.snapshot()
+        finally:
+            self._flush_lock.release()
+
+    def snapshot(self):
+        """Merge local views into trending_scores and reload the global top list
+
+        The stored scores are read and rewritten under a write lock taken up
+        front (BEGIN IMMEDIATE on SQLite, FOR UPDATE elsewhere), so concurrent
+        snapshots from other processes cannot lose each other's views.
+        """
+        from app import db
+        from models.trending import TrendingScore
+        from utils.database import write_engine
+
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        self.last_snapshot = time.monotonic()
+
+        table = TrendingScore.__table__
+        try:
+            with write_engine(db).begin() as connection:
+                if pending and connection.dialect.name == 'sqlite':
+                    # pysqlite only begins at the first DML, after the read below
+                    connection.exec_driver_sql('BEGIN IMMEDIATE')
+                if pending:
+                    stored = dict(connection.execute(
+                        select(table.c.post_id, table.c.score)
+                        .where(table.c.post_id.in_(list(pending)))
+                        .with_for_update()
+                    ).all())
+                    now = datetime.utcnow()
+                    updates = [{'key': pid, 'score': log2_add(stored[pid], score), 'updated_at': now}
+                               for pid, score in pending.items() if pid in stored]
+                    inserts = [{'post_id': pid, 'score': score, 'updated_at': now}
+                               for pid, score in pending.items() if pid not in stored]
+                    if updates:
+                        connection.execute(
+                            update(table).where(table.c.post_id == bindparam('key'))
+                            .values(score=bindparam('score'), updated_at=bindparam('updated_at')),
+                            updates
+                        )
+                    if inserts:
+                        connection.execute(insert(table), inserts)
+                    connection.execute(delete(table).where(table.c.score < self.now_score() - PRUNE_HALF_LIVES))
+
+                rows = connection.execute(
+                    select(table.c.post_id, table.c.score).order_by(table.c.score.desc()).limit(self.capacity)
+                ).all()
+        except Exception as e:
+            logging.error(f"Trending snapshot failed: {e}")
+            # Keep the views for the next attempt
+            with self._lock:
+                for pid, score in pending.items():
+                    self.pending[pid] = log2_add(self.pending.get(pid), score)
+            return
+
+        with self._lock:
+            # Views recorded while the snapshot ran are not in the rows yet
+            scores = {pid: log2_add(score, self.pending.get(pid)) for pid, score in rows}
+            for pid, score in self.pending.items():
+                scores.setdefault(pid, score)
+            self.scores = scores
+            self.top = tuple(sorted(scores, key=scores.get, reverse=True)[:self.capacity])
@@ -0,0 +1,227 @@
+import re
+import uuid
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from collections import defaultdict
+
+from flask import has_app_context
+from sqlalchemy import delete, func, insert, select, update
+
+from utils.helpers import percentile
+
+_scope = ContextVar('gemini_usage_scope', default={})
+
+GENERATION_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+def new_generation_id():
+    return uuid.uuid4().hex
+
+def is_generation_id(value):
+    return bool(value and GENERATION_ID_RE.match(value))
+
+@contextmanager
+def usage_scope(generation_id=None, post_id=None):
+    """Attribute Gemini calls made inside the block to a generation or a post"""
+    token = _scope.set({'generation_id': generation_id, 'post_id': post_id})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+def usage_tokens(usage_metadata):
+    """Extract (prompt, output, thought) token counts from a response's usage_metadata"""
+    if usage_metadata is None:
+        return 0, 0, 0
+    return (usage_metadata.prompt_token_count or 0,
+            usage_metadata.candidates_token_count or 0,
+            getattr(usage_metadata, 'thoughts_token_count', None) or 0)
+
+def record_call(method, model, outcome, latency_ms, attempts=1, usage_metadata=None):
+    """Append one row to gemini_calls; accounting never breaks the caller
+
+    Deferred until the request session's transaction ends when it holds
+    the SQLite writer.
+    """
+    if not has_app_context():
+        return
+    from app import db
+    from models.gemini_usage import GeminiCall
+    from utils.database import write_outside_session
+
+    prompt_tokens, output_tokens, thought_tokens = usage_tokens(usage_metadata)
+    row = dict(_scope.get())
+    row.update(
+        created_at=datetime.utcnow(),
+        method=method,
+        model=model,
+        outcome=outcome,
+        attempts=attempts,
+        latency_ms=int(latency_ms),
+        prompt_tokens=prompt_tokens,
+        output_tokens=output_tokens,
+        thought_tokens=thought_tokens,
+    )
+    try:
+        write_outside_session(db, lambda connection: connection.execute(insert(GeminiCall.__table__), [row]))
+    except Exception as e:
+        logging.error(f"Failed to record Gemini usage: {e}")
+
+def link_generation(generation_id, post_id):
+    """Attach the calls of a finished generation to the post saved from it"""
+    if not is_generation_id(generation_id):
+        return
+    from app import db
+    from models.gemini_usage import GeminiCall
+    from utils.database import write_engine
+
+    table = GeminiCall.__table__
+    try:
+        with write_engine(db).begin() as connection:
+            connection.execute(update(table).where(
+                table.c.generation_id == generation_id, table.c.post_id.is_(None)
+            ).values(post_id=post_id))
+    except Exception as e:
+        logging.error(f"Failed to link Gemini usage to post {post_id}: {e}")
+
+def estimate_cost(model, prompt_tokens, output_tokens, thought_tokens=0):
+    """Estimated USD cost from Config.GEMINI_PRICES, or None for unknown models"""
+    from config import Config
+    prices = Config.GEMINI_PRICES.get(model)
+    if not prices:
+        return None
+    return (prompt_tokens * prices[0] + (output_tokens + thought_tokens) * prices[1]) / 1_000_000
+
+def rollup_day(day):
+    """Recompute the gemini_usage_daily rows for one day from gemini_calls
+
+    Safe to run repeatedly; the day's rollup rows are replaced.
+    """
+    from app import db
+    from models.gemini_usage import GeminiCall, GeminiUsageDaily
+    from utils.database import write_engine
+
+    start = datetime.combine(day, datetime.min.time())
+    calls = GeminiCall.__table__
+    daily = GeminiUsageDaily.__table__
+
+    groups = defaultdict(lambda: {'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'output_tokens': 0,
+                                  'thought_tokens': 0, 'latencies': []})
+    with write_engine(db).begin() as connection:
+        rows = connection.execute(
+            select(
+                calls.c.method, calls.c.model, calls.c.outcome, calls.c.latency_ms,
+                calls.c.prompt_tokens, calls.c.output_tokens, calls.c.thought_tokens,
+            ).where(calls.c.created_at >= start, calls.c.created_at < start + timedelta(days=1))
+        )
+        for row in rows:
+            group = groups[(row.method, row.model)]
+            group['calls'] += 1
+            group['errors'] += row.outcome == 'error'
+            group['prompt_tokens'] += row.prompt_tokens or 0
+            group['output_tokens'] += row.output_tokens or 0
+            group['thought_tokens'] += row.thought_tokens or 0
+            group['latencies'].append(row.latency_ms or 0)
+
+        connection.execute(delete(daily).where(daily.c.day == day))
+        if groups:
+            connection.execute(insert(daily), [{
+                'day': day,
+                'method': method,
+                'model': model,
+                'calls': group['calls'],
+                'errors': group['errors'],
+                'prompt_tokens': group['prompt_tokens'],
+                'output_tokens': group['output_tokens'],
+                'thought_tokens': group['thought_tokens'],
+                'latency_ms_total': sum(group['latencies']),
+                'latency_p95_ms': percentile(group['latencies'], 95),
+            } for (method, model), group in groups.items()])
+    return len(groups)
+
+def prune_calls(keep_days):
+    """Delete raw call rows older than keep_days; their days must be rolled up first"""
+    from app import db
+    from models.gemini_usage import GeminiCall
+    from utils.database import write_engine
+
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=keep_days), datetime.min.time())
+    table = GeminiCall.__table__
+    with write_engine(db).begin() as connection:
+        return connection.execute(delete(table).where(table.c.created_at < cutoff)).rowcount
+
+def method_report(since):
+    """Calls, tokens, estimated cost and latency percentiles per method since a datetime"""
+    from models.gemini_usage import GeminiCall
+
+    rows = GeminiCall.query.with_entities(
+        GeminiCall.method, GeminiCall.model, GeminiCall.outcome, GeminiCall.latency_ms,
+        GeminiCall.prompt_tokens, GeminiCall.output_tokens, GeminiCall.thought_tokens,
+    ).filter(GeminiCall.created_at >= since).all()
+
+    groups = defaultdict(lambda: {'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'output_tokens': 0,
+                                  'thought_tokens': 0, 'cost': 0.0, 'latencies': []})
+    for row in rows:
+        group = groups[row.method]
+        group['calls'] += 1
+        group['errors'] += row.outcome == 'error'
+        group['prompt_tokens'] += row.prompt_tokens or 0
+        group['output_tokens'] += row.output_tokens or 0
+        group['thought_tokens'] += row.thought_tokens or 0
+        group['cost'] += estimate_cost(row.model, row.prompt_tokens or 0, row.output_tokens or 0,
+                                       row.thought_tokens or 0) or 0
+        if row.outcome == 'ok':
+            group['latencies'].append(row.latency_ms or 0)
+
+    report = []
+    for method, group in sorted(groups.items()):
+        latencies = group.pop('latencies')
+        ok_calls = len(latencies)
+        group.update(
+            method=method,
+            p50_ms=percentile(latencies, 50),
+            p95_ms=percentile(latencies, 95),
+            avg_tokens=round((group['prompt_tokens'] + group['output_tokens'] + group['thought_tokens'])
+                             / ok_calls) if ok_calls else 0,
+        )
+        report.append(group)
+    return report
+
+def article_report(since, limit=20):
+    """Most expensive posts by tokens spent on them since a datetime"""
+    from app import db
+    from models.gemini_usage import GeminiCall
+    from models.post import Post
+
+    tokens = func.sum(GeminiCall.prompt_tokens + GeminiCall.output_tokens + GeminiCall.thought_tokens)
+    rows = db.session.query(
+        GeminiCall.post_id,
+        Post.title_uz,
+        func.count(GeminiCall.id),
+        func.sum(GeminiCall.prompt_tokens),
+        func.sum(GeminiCall.output_tokens + GeminiCall.thought_tokens),
+        func.sum(GeminiCall.latency_ms),
+        func.min(GeminiCall.model),
+    ).join(Post, Post.id == GeminiCall.post_id).filter(
+        GeminiCall.created_at >= since
+    ).group_by(GeminiCall.post_id, Post.title_uz).order_by(tokens.desc()).limit(limit).all()
+
+    return [{
+        'post_id': post_id,
+        'title': title,
+        'calls': calls,
+        'prompt_tokens': prompt_tokens or 0,
+        'output_tokens': output_tokens or 0,
+        'latency_ms': latency_ms or 0,
+        'cost': estimate_cost(model, prompt_tokens or 0, output_tokens or 0),
+    } for post_id, title, calls, prompt_tokens, output_tokens, latency_ms, model in rows]
+
+def daily_report(days):
+    """Rolled-up daily totals for the last `days` days"""
+    from models.gemini_usage import GeminiUsageDaily
+
+    since = datetime.utcnow().date() - timedelta(days=days)
+    return GeminiUsageDaily.query.filter(GeminiUsageDaily.day >= since).order_by(
+        GeminiUsageDaily.day.desc(), GeminiUsageDaily.method
+    ).all()
@@ -0,0 +1,149 @@
+import os
+import glob
+import fcntl
+import time
+import struct
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# post_id, unix time, language, referrer class: 10 bytes per view
+RECORD = struct.Struct('<IIBB')
+
+LANGUAGES = ('uz', 'ru')
+
+LOCK = '.compact.lock'
+CLAIMED = '.compacting'
+
+REFERRER_CLASSES = ('direct', 'internal', 'search', 'social', 'telegram', 'other')
+
+SEARCH_HOSTS = ('google.', 'yandex.', 'bing.', 'duckduckgo.', 'yahoo.', 'mail.ru')
+SOCIAL_HOSTS = ('facebook.', 'instagram.', 'twitter.', 'x.com', 'vk.com', 'ok.ru', 'linkedin.', 'youtube.')
+TELEGRAM_HOSTS = ('t.me', 'telegram.', 'web.telegram.org')
+
+def classify_referrer(referrer, own_host=None):
+    """Map a Referer header to one of REFERRER_CLASSES"""
+    if not referrer:
+        return 'direct'
+    host = (urlparse(referrer).hostname or '').lower()
+    if not host:
+        return 'other'
+    if own_host and host == own_host.split(':')[0].lower():
+        return 'internal'
+    if any(host.endswith(name) or host.startswith(name) for name in TELEGRAM_HOSTS):
+        return 'telegram'
+    if any(name in host for name in SEARCH_HOSTS):
+        return 'search'
+    if any(name in host for name in SOCIAL_HOSTS):
+        return 'social'
+    return 'other'
+
+class ViewLog:
+    """Append-only binary log of post views on local disk
+
+    Every process appends fixed-size records with a single O_APPEND write to
+    its own segment file, named after the rotation period it belongs to:
+    ``views-<period start>-<pid>.bin``. Segments whose period ended more than
+    ``grace`` seconds ago are complete and can be compacted and deleted.
+    Compaction claims them by renaming to ``*.bin.compacting`` while holding
+    an flock on the directory.
+    """
+
+    def __init__(self, directory, rotate_seconds=300, grace=60):
+        self.directory = directory
+        self.rotate_seconds = rotate_seconds
+        self.grace = grace
+        self._fd = None
+        self._segment = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def record(self, post_id, language='uz', referrer_class='direct', when=None):
+        when = int(when or time.time())
+        data = RECORD.pack(
+            post_id,
+            when,
+            LANGUAGES.index(language) if language in LANGUAGES else 0,
+            REFERRER_CLASSES.index(referrer_class) if referrer_class in REFERRER_CLASSES else len(REFERRER_CLASSES) - 1,
+        )
+        segment = when - when % self.rotate_seconds
+        try:
+            with self._lock:
+                # Reopen after a fork and when the rotation period changes
+                if self._fd is None or segment != self._segment or self._pid != os.getpid():
+                    self._open(segment)
+                os.write(self._fd, data)
+        except OSError as e:
+            logging.error(f"Failed to write view log: {e}")
+
+    def _open(self, segment):
+        if self._fd is not None and self._pid == os.getpid():
+            os.close(self._fd)
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._segment = segment
+        path = os.path.join(self.directory, f"views-{segment}-{self._pid}.bin")
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def sealed_segments(self, now=None):
+        """Segment files no process will write to any more, oldest first"""
+        cutoff = (now or time.time()) - self.rotate_seconds - self.grace
+        sealed = []
+        for path in glob.glob(os.path.join(self.directory, 'views-*-*.bin')):
+            try:
+                segment = int(os.path.basename(path).split('-')[1])
+            except (IndexError, ValueError):
+                continue
+            if segment <= cutoff:
+                sealed.append((segment, path))
+        return [path for _, path in sorted(sealed)]
+
+    @staticmethod
+    def read(path):
+        """Yield (post_id, timestamp, language, referrer_class) records of a segment"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        usable = len(data) - len(data) % RECORD.size
+        for post_id, when, language, referrer in RECORD.iter_unpack(data[:usable]):
+            yield (post_id, when, LANGUAGES[language] if language < len(LANGUAGES) else 'uz',
+                   REFERRER_CLASSES[referrer] if referrer < len(REFERRER_CLASSES) else 'other')
+
+    def claimed_segments(self):
+        """Segments claimed by a compaction that did not finish, oldest first"""
+        return sorted(glob.glob(os.path.join(self.directory, f'views-*-*.bin{CLAIMED}')))
+
+    def claim(self, max_segments, now=None):
+        """Rename sealed segments to *.compacting; returns the claimed paths
+
+        Leftovers of an interrupted compaction come first. Call with
+        compaction_lock() held.
+        """
+        paths = self.claimed_segments()[:max_segments]
+        for path in self.sealed_segments(now)[:max_segments - len(paths)]:
+            try:
+                os.rename(path, path + CLAIMED)
+            except FileNotFoundError:
+                continue
+            paths.append(path + CLAIMED)
+        return paths
+
+    @staticmethod
+    def segment_name(path):
+        """The segment file name without the claim suffix"""
+        return os.path.basename(path).removesuffix(CLAIMED)
+
+    @contextmanager
+    def compaction_lock(self):
+        """Yield whether this process got the directory's compaction lock"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
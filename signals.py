@@ -0,0 +1,11 @@
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent once per publish batch with the list of newly published posts.
+# Receivers that cache listings should invalidate them here.
+posts_published = _signals.signal('posts-published')
+
+# Sent once per admin change that is not a publish (bulk actions, edits) with
+# the action name and the post ids (deleted posts no longer exist by then).
+posts_changed = _signals.signal('posts-changed')
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a fresh SQLite file, with every on-disk cache under tmp_path"""
+    from app import create_app
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'RATE_LIMIT_ENABLED': False,
+        'LOAD_SHED_ENABLED': False,
+        'VIEW_LOG_DIR': str(tmp_path / 'viewlog'),
+        'FRAGMENT_CACHE_STAMP': str(tmp_path / 'fragment-cache.stamp'),
+        'JINJA_BYTECODE_CACHE_DIR': '',
+        'PROFILING_DIR': str(tmp_path / 'profiles'),
+        'STATIC_EXPORT_DIR': str(tmp_path / 'static-export'),
+    })
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def make_post(app):
+    """Create and commit a post; keyword arguments override the defaults"""
+    from app import db
+    from models.post import Post
+
+    def make_post(**fields):
+        fields.setdefault('title_uz', f"Maqola {Post.query.count() + 1}")
+        fields.setdefault('content_uz', 'Matn')
+        fields.setdefault('category', 'Texnologiya')
+        fields.setdefault('author_id', 1)
+        fields.setdefault('published', True)
+        post = Post(**fields)
+        db.session.add(post)
+        db.session.commit()
+        return post
+
+    return make_post
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.archive_service import archive_posts, restore_posts
+from services.counter_service import dashboard_stats
+
+
+@pytest.fixture
+def old_post(make_post):
+    return make_post(title_uz="Eski maqola", content_uz="Eski matn", keywords='Tarix',
+                     created_at=datetime.utcnow() - timedelta(days=400), views=3)
+
+
+def test_archive_and_restore_round_trip(app, old_post, make_post):
+    from app import db
+    from models.archived_post import ArchivedPost
+    from models.post import Post
+    from models.tag import Tag
+
+    recent = make_post(keywords='Tarix')
+    post_id, slug = old_post.id, old_post.slug
+    db.session.expire_all()
+
+    assert archive_posts(app, db, older_than_days=365, max_views=10) == [post_id]
+    assert db.session.get(Post, post_id) is None
+    archived = db.session.get(ArchivedPost, post_id)
+    assert (archived.slug, archived.views, archived.archived_at is not None) == (slug, 3, True)
+    assert Tag.query.filter_by(slug='tarix').one().post_count == 1
+    assert dashboard_stats()['total_posts'] == 1
+
+    assert restore_posts(app, db, [post_id]) == [post_id]
+    db.session.expire_all()
+    restored = db.session.get(Post, post_id)
+    assert (restored.slug, restored.title_uz, restored.views) == (slug, "Eski maqola", 3)
+    assert [tag.slug for tag in restored.tags] == ['tarix']
+    assert Tag.query.filter_by(slug='tarix').one().post_count == 2
+    assert ArchivedPost.query.count() == 0
+    assert dashboard_stats()['total_posts'] == 2
+    assert recent.id != post_id
+
+
+def test_dry_run_and_thresholds_leave_posts_in_place(app, old_post, make_post):
+    from app import db
+    from models.archived_post import ArchivedPost
+
+    make_post(created_at=datetime.utcnow() - timedelta(days=400), views=50)
+    make_post(created_at=datetime.utcnow() - timedelta(days=400), published=False)
+
+    assert archive_posts(app, db, older_than_days=365, max_views=10, dry_run=True) == [old_post.id]
+    assert ArchivedPost.query.count() == 0
+
+
+def test_archived_post_is_still_served_and_its_id_is_not_reused(app, old_post, make_post):
+    from app import db
+
+    post_id, url = old_post.id, old_post.get_absolute_url()
+    archive_posts(app, db, older_than_days=365, max_views=10)
+
+    assert app.test_client().get(url).status_code == 200
+    assert make_post().id != post_id
+
+
+def test_restore_skips_unknown_ids(app):
+    from app import db
+
+    assert restore_posts(app, db, [12345]) == []
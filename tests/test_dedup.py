@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.dedup_service import (DuplicateDetector, LSHIndex, MinHasher, content_shingles, normalize,
+                                    title_shingles)
+
+BODY = ("Toshkent shahrida yangi metro bekati foydalanishga topshirildi. Bekat Yunusobod tumanida joylashgan "
+        "va kuniga o'n ming yo'lovchiga xizmat ko'rsatadi. Qurilish ishlari ikki yil davom etdi.")
+
+
+def jaccard(left, right):
+    return len(left & right) / len(left | right)
+
+
+def test_apostrophe_variants_normalize_alike():
+    assert normalize("O‘zbekiston") == normalize("Oʻzbekiston") == normalize("O'zbekiston") == "o'zbekiston"
+    assert title_shingles("O‘zbek") == title_shingles("o'zbek")
+
+
+def test_signature_similarity_tracks_jaccard():
+    hasher = MinHasher(num_perm=128)
+    left = content_shingles(BODY)
+    right = content_shingles(BODY.replace("ikki yil", "uch yil"))
+    estimate = MinHasher.similarity(hasher.signature(left), hasher.signature(right))
+    assert estimate == pytest.approx(jaccard(left, right), abs=0.15)
+
+
+def test_lsh_query_applies_the_threshold():
+    hasher = MinHasher()
+    index = LSHIndex(bands=32)
+    index.add(1, hasher.signature(title_shingles("Toshkentda yangi metro bekati ochildi")))
+    index.add(2, hasher.signature(title_shingles("Samarqandda xalqaro festival boshlandi")))
+
+    near = hasher.signature(title_shingles("Toshkentda yangi metro bekati ochildi!"))
+    assert [key for key, _ in index.query(near, 0.6)] == [1]
+    assert index.query(hasher.signature(title_shingles("Futbol bo'yicha jahon chempionati")), 0.6) == []
+
+    index.remove(1)
+    assert index.query(near, 0.6) == []
+
+
+def test_detector_thresholds_separate_rewrites_from_new_stories(app, make_post):
+    detector = DuplicateDetector(title_threshold=0.6, content_threshold=0.5)
+    post = make_post(title_uz="Toshkentda yangi metro bekati ochildi", content_uz=BODY)
+    detector.add_post(post)
+
+    rewrite = detector.find_similar("Toshkentda yangi metro bekati ochildi", BODY.replace("ikki", "uch"))
+    assert [post_id for post_id, _ in rewrite] == [post.id]
+    assert rewrite[0][1] >= 0.6
+    assert detector.find_similar("Samarqandda xalqaro festival boshlandi",
+                                 "Festival uch kun davom etadi va unda o'ttiz davlat qatnashadi.") == []
+    assert detector.find_similar(post.title_uz, BODY, exclude_id=post.id) == []
+
+
+def test_detector_ignores_posts_outside_the_window(app, make_post):
+    detector = DuplicateDetector(window_days=30)
+    post = make_post(title_uz="Eski yangilik sarlavhasi", created_at=datetime.utcnow() - timedelta(days=45))
+    detector.add_post(post)
+
+    assert detector.find_similar_topic("Eski yangilik sarlavhasi") == []
+
+
+def test_detector_loads_signatures_stored_by_another_process(app, make_post):
+    post = make_post(title_uz="Buxoroda qadimiy masjid ta'mirlandi", content_uz=BODY)
+    DuplicateDetector().add_post(post)
+
+    fresh = DuplicateDetector()
+    assert [post_id for post_id, _ in fresh.find_similar_topic("Buxoroda qadimiy masjid ta'mirlandi")] == [post.id]
@@ -0,0 +1,93 @@
+import json
+from types import SimpleNamespace
+
+from services.batch_service import BatchGenerator, save_drafts, summarize_results
+from services.fakes import FakeGeminiClient, FakeTelegramBot, LatencyProfile, gemini_client_from_config
+from services.gemini_service import GeminiService
+from services.telegram_fanout import Channel, ChannelRegistry, FanoutSender
+from services.telegram_service import TelegramService
+
+INSTANT = LatencyProfile(median_ms=0)
+
+
+def items(count):
+    return [{'topic': f"Mavzu {i}", 'category': 'Texnologiya', 'region': None} for i in range(count)]
+
+
+def generate(app, client, count=6):
+    generator = BatchGenerator(GeminiService(client=client), concurrency=3, rpm=6000, tpm=10_000_000, app=app)
+    return generator.run(items(count))
+
+
+def test_batch_generation_with_the_fake_client_saves_drafts(app):
+    client = FakeGeminiClient(latency=INSTANT, seed=1)
+    results = generate(app, client)
+
+    assert [result['index'] for result in results] == list(range(6))
+    assert all(result['ok'] for result in results)
+    assert results[0]['content']['title_uz'].startswith("Mavzu 0")
+
+    posts = save_drafts(results, author_id=1)
+    assert len({post.slug for post in posts}) == 6
+    assert not any(post.published for post in posts)
+    assert summarize_results(results, 1.0)['succeeded'] == 6
+
+
+def test_server_errors_are_retried(app):
+    client = FakeGeminiClient(latency=INSTANT, server_error_rate=0.3, seed=3)
+    results = generate(app, client, count=10)
+
+    assert client.calls['server_error'] > 0
+    assert sum(result['ok'] for result in results) >= 10 - client.calls['server_error']
+    assert client.calls['article'] > 10
+
+
+def test_malformed_replies_fail_the_item_not_the_batch(app):
+    client = FakeGeminiClient(latency=INSTANT, malformed_rate=1.0, seed=1)
+    results = generate(app, client, count=3)
+
+    assert len(results) == 3
+    assert not any(result['ok'] for result in results)
+    assert all(result['error'] for result in results)
+
+
+def test_recordings_are_replayed(app):
+    recorded = {'title_uz': "Yozib olingan sarlavha", 'content_uz': "Yozib olingan matn",
+                'title_ru': "Записанный заголовок", 'content_ru': "Записанный текст", 'telegram_uz': "",
+                'meta_title': "", 'meta_description': "", 'keywords': ""}
+    client = FakeGeminiClient(recordings=[{'kind': 'article', 'text': json.dumps(recorded)}], latency=INSTANT)
+    results = generate(app, client, count=2)
+
+    assert [result['content']['title_uz'] for result in results] == ["Yozib olingan sarlavha"] * 2
+
+
+def test_fake_client_from_config_passes_the_fault_rates():
+    config = SimpleNamespace(FAKE_SERVICES=['gemini'], FAKE_GEMINI_RECORDINGS='', FAKE_GEMINI_LATENCY_MS=0,
+                             FAKE_GEMINI_LATENCY_SIGMA=0.5, FAKE_GEMINI_RATE_LIMIT_RATE=0.1,
+                             FAKE_GEMINI_SERVER_ERROR_RATE=0.2, FAKE_GEMINI_MALFORMED_RATE=0.3, FAKE_SEED=7)
+    client = gemini_client_from_config(config)
+
+    assert (client.rate_limit_rate, client.server_error_rate, client.malformed_rate) == (0.1, 0.2, 0.3)
+    assert gemini_client_from_config(SimpleNamespace(**{**vars(config), 'FAKE_SERVICES': []})) is None
+
+
+def test_generated_drafts_are_announced_through_the_fake_bot(app):
+    from app import db
+    from models.telegram_delivery import TelegramDelivery
+
+    posts = save_drafts(generate(app, FakeGeminiClient(latency=INSTANT, seed=2), count=3), author_id=1)
+    for post in posts:
+        post.published = True
+    db.session.commit()
+
+    bot = FakeTelegramBot(latency=INSTANT)
+    fanout = FanoutSender(TelegramService(bot=bot), ChannelRegistry([Channel('@fake_uz'), Channel('@fake_ru', 'ru')]),
+                          chat_interval=0)
+    sent = fanout.deliver(posts, 'http://localhost:5000')
+
+    assert sent == {post.id for post in posts}
+    assert {message['chat_id'] for message in bot.sent} == {'@fake_uz', '@fake_ru'}
+    assert TelegramDelivery.query.filter_by(status='sent').count() == 6
+    # A second run only retries what failed, so nothing is sent twice
+    fanout.deliver(posts, 'http://localhost:5000')
+    assert len(bot.sent) == 6
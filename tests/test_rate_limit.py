@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from utils.rate_limit import LatencyMonitor, TokenBucketStore, parse_rate_limits
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TokenBucketStore(str(tmp_path / 'ratelimit.db'))
+
+
+def test_bucket_allows_capacity_then_refuses(store):
+    results = [store.take('main.search:1.2.3.4', 3, 0.001)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+
+def test_refused_take_reports_seconds_until_the_next_token(store):
+    for _ in range(2):
+        store.take('key', 2, 0.5)
+    assert store.take('key', 2, 0.5) == (False, 2)
+
+
+def test_bucket_refills_with_time(store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    assert store.take('key', 1, 1.0) == (True, 0)
+    assert store.take('key', 1, 1.0)[0] is False
+    now[0] += 1.0
+    assert store.take('key', 1, 1.0) == (True, 0)
+
+
+def test_refill_never_exceeds_capacity(store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    store.take('key', 2, 1.0)
+    now[0] += 3600
+    assert [store.take('key', 2, 1.0)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_keys_and_stores_share_buckets_by_key(store, tmp_path):
+    other = TokenBucketStore(store.path)
+    assert store.take('a', 1, 0.001)[0]
+    assert not other.take('a', 1, 0.001)[0]
+    assert other.take('b', 1, 0.001)[0]
+
+
+def test_broken_store_fails_open(tmp_path):
+    (tmp_path / 'file').write_text('')
+    store = TokenBucketStore(str(tmp_path / 'file' / 'ratelimit.db'))
+    assert store.take('key', 1, 1.0) == (True, 0)
+
+
+def test_parse_rate_limits_skips_malformed_entries():
+    assert parse_rate_limits('main.search=20/60, broken, main.index=60/30') == {
+        'main.search': (20, 20 / 60), 'main.index': (60, 2.0)}
+
+
+def test_latency_monitor_forgets_old_samples(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    monitor = LatencyMonitor(threshold_ms=100, alpha=1.0, window=5)
+    monitor.record(500)
+    assert monitor.overloaded()
+    now[0] += 6
+    assert not monitor.overloaded()
@@ -0,0 +1,68 @@
+import pytest
+
+from services.tag_service import parse_keywords
+
+
+@pytest.fixture
+def tagged(make_post):
+    """Ids of the published posts tagged 'Iqtisod', in creation order, among untagged and draft ones"""
+    ids = []
+    for i in range(23):
+        post = make_post(keywords='Iqtisod, Bozor' if i % 3 else 'Sport', published=i % 5 != 4)
+        if i % 3 and i % 5 != 4:
+            ids.append(post.id)
+    return ids
+
+
+def walk(tag, per_page):
+    from routes import tag_page
+
+    pages, before = [], None
+    while True:
+        posts, before = tag_page(tag, before, per_page=per_page)
+        pages.append([post.id for post in posts])
+        if before is None:
+            return pages
+
+
+def test_parse_keywords_dedupes_by_slug():
+    assert parse_keywords(" Iqtisod ,iqtisod, Bozor  narxlari,, ") == [
+        ('iqtisod', 'Iqtisod'), ('bozor-narxlari', 'Bozor narxlari')]
+
+
+def test_cursor_walk_returns_every_published_post_once_newest_first(app, tagged):
+    from models.tag import Tag
+
+    tag = Tag.query.filter_by(slug='iqtisod').one()
+    pages = walk(tag, per_page=4)
+
+    assert [post_id for page in pages for post_id in page] == sorted(tagged, reverse=True)
+    assert all(len(page) == 4 for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= 4
+
+
+def test_exact_multiple_of_the_page_size_has_no_empty_last_page(app, make_post):
+    from models.tag import Tag
+
+    for _ in range(6):
+        make_post(keywords='Bozor')
+    pages = walk(Tag.query.filter_by(slug='bozor').one(), per_page=3)
+
+    assert [len(page) for page in pages] == [3, 3]
+
+
+def test_tag_page_links_to_the_next_cursor(app, tagged):
+    from routes import TAG_PER_PAGE
+
+    client = app.test_client()
+    first = client.get('/teg/iqtisod')
+    assert first.status_code == 200
+    assert 'noindex' not in first.get_data(as_text=True)
+    assert 'Iqtisod mavzusidagi yangiliklar' in first.get_data(as_text=True)
+    if len(tagged) > TAG_PER_PAGE:
+        cursor = sorted(tagged, reverse=True)[TAG_PER_PAGE - 1]
+        assert f'/teg/iqtisod?before={cursor}' in first.get_data(as_text=True)
+    second = client.get(f'/teg/iqtisod?before={min(tagged)}')
+    assert second.status_code == 200
+    assert 'noindex' in second.get_data(as_text=True)
+    assert client.get('/teg/mavjud-emas').status_code == 404
@@ -0,0 +1,40 @@
+from services.translation_memory import (TranslationMemoryStore, normalize_segment, segment_hash,
+                                         split_paragraphs)
+
+
+def test_whitespace_and_dash_edits_keep_the_hash():
+    assert segment_hash("Toshkentda  yangi\tmetro bekati — ochildi") == \
+        segment_hash("Toshkentda yangi metro bekati - ochildi")
+    assert normalize_segment("  bir   ikki\n uch ") == "bir ikki uch"
+
+
+def test_wording_changes_change_the_hash():
+    assert segment_hash("Narxlar oshdi") != segment_hash("Narxlar tushdi")
+    assert len(segment_hash("Narxlar oshdi")) == 64
+
+
+def test_split_paragraphs_keeps_blank_lines_for_the_layout():
+    assert split_paragraphs("Bir\n\nIkki") == ['Bir', '', 'Ikki']
+    assert split_paragraphs(None) == ['']
+
+
+def test_store_then_lookup_by_normalized_hash(app):
+    memory = TranslationMemoryStore()
+    memory.store([("Salom  dunyo", "Привет, мир")])
+
+    assert memory.lookup({segment_hash("Salom dunyo")}) == {segment_hash("Salom dunyo"): "Привет, мир"}
+    assert memory.lookup({segment_hash("Xayr dunyo")}) == {}
+
+
+def test_storing_a_known_segment_keeps_the_first_translation(app):
+    memory = TranslationMemoryStore()
+    memory.store([("Salom", "Привет")])
+    memory.store([("Salom", "Здравствуйте")])
+
+    assert memory.lookup({segment_hash("Salom")}) == {segment_hash("Salom"): "Привет"}
+
+
+def test_memory_is_inert_outside_an_app_context():
+    memory = TranslationMemoryStore()
+    assert memory.lookup({segment_hash("Salom")}) == {}
+    memory.store([("Salom", "Привет")])
@@ -0,0 +1,70 @@
+import os
+import shutil
+import time
+
+from services.analytics_service import compact_view_log
+from services.view_log import ViewLog
+
+
+def sealed_log(directory, post_id, views):
+    """A view log with `views` records of `post_id` in a segment that is already sealed"""
+    log = ViewLog(str(directory), rotate_seconds=60, grace=0)
+    when = time.time() - 3600
+    for _ in range(views):
+        log.record(post_id, language='ru', referrer_class='search', when=when)
+    return log
+
+
+def test_compaction_folds_views_into_rollups_and_removes_segments(app, make_post, tmp_path):
+    from app import db
+    from models.analytics import ViewStatDaily, ViewStatHourly
+
+    post = make_post()
+    log = sealed_log(tmp_path / 'views', post.id, 5)
+
+    assert compact_view_log(log) == (1, 5)
+    assert not log.sealed_segments() and not log.claimed_segments()
+    hourly = ViewStatHourly.query.one()
+    assert (hourly.post_id, hourly.language, hourly.referrer, hourly.views) == (post.id, 'ru', 'search', 5)
+    assert ViewStatDaily.query.one().views == 5
+    db.session.refresh(post)
+    assert post.views == 5
+
+
+def test_compaction_skips_while_another_run_holds_the_lock(app, make_post, tmp_path):
+    post = make_post()
+    log = sealed_log(tmp_path / 'views', post.id, 3)
+
+    with ViewLog(log.directory).compaction_lock() as locked:
+        assert locked
+        assert compact_view_log(log) == (0, 0)
+    assert len(log.sealed_segments()) == 1
+    assert compact_view_log(log) == (1, 3)
+
+
+def test_segment_left_behind_after_commit_is_not_counted_twice(app, make_post, tmp_path):
+    from app import db
+
+    post = make_post()
+    log = sealed_log(tmp_path / 'views', post.id, 4)
+    segment = log.sealed_segments()[0]
+    shutil.copy(segment, tmp_path / 'copy.bin')
+
+    assert compact_view_log(log) == (1, 4)
+    # A crash between the commit and the unlink leaves the claimed file
+    shutil.copy(tmp_path / 'copy.bin', segment + '.compacting')
+
+    assert compact_view_log(log) == (0, 0)
+    assert not os.path.exists(segment + '.compacting')
+    db.session.refresh(post)
+    assert post.views == 4
+
+
+def test_claimed_segment_of_an_interrupted_run_is_resumed(app, make_post, tmp_path):
+    post = make_post()
+    log = sealed_log(tmp_path / 'views', post.id, 2)
+    with log.compaction_lock():
+        claimed = log.claim(10)
+    assert [path.endswith('.bin.compacting') for path in claimed] == [True]
+
+    assert compact_view_log(log) == (1, 2)
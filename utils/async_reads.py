@@ -0,0 +1,170 @@
+import os
+import asyncio
+import logging
+import threading
+
+from sqlalchemy import func, select
+from flask_sqlalchemy.pagination import Pagination
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+}
+
+def async_database_url(url):
+    """Map a sync database URL to its async driver (aiosqlite/asyncpg)"""
+    scheme, sep, rest = url.partition('://')
+    dialect = scheme.split('+')[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {dialect} URLs")
+    return ASYNC_DRIVERS[dialect] + sep + rest
+
+class ResultPagination(Pagination):
+    """Flask-SQLAlchemy pagination over items and a total fetched elsewhere"""
+
+    def _query_items(self):
+        return self._query_args['items']
+
+    def _query_count(self):
+        return self._query_args['total']
+
+def count_statement(statement):
+    return select(func.count()).select_from(statement.order_by(None).subquery())
+
+class SessionReader:
+    """Runs read statements one after another on the request's db.session
+
+    Same interface as AsyncReader, so views have one code path.
+    """
+
+    def all(self, statement):
+        from app import db
+        return lambda: db.session.execute(statement).scalars().all()
+
+    def scalar(self, statement):
+        from app import db
+        return lambda: db.session.execute(statement).scalar()
+
+    def gather(self, *calls):
+        return [call() for call in calls]
+
+    def paginate(self, statement, page, per_page):
+        from app import db
+        return db.paginate(statement, page=page, per_page=per_page, error_out=False)
+
+class AsyncReader:
+    """Read-only queries on async SQLAlchemy engines in a background event loop
+
+    Views stay synchronous: they pass independent statements to `gather`,
+    which issues them concurrently over the async pool and waits for all of
+    them, so a page costs its slowest query instead of the sum. Like
+    RoutingSession, views marked with ``use_read_replica`` read from the
+    async twin of the replica the ReplicaPool picks, everything else from
+    the primary. The loop and engines are created on first use in each
+    process and never cross a fork.
+    Returned objects are detached; only column attributes may be used.
+    """
+
+    def __init__(self, url, pool_size=10, timeout=10, replica_urls=None):
+        self.urls = {None: async_database_url(url)}
+        self.urls.update((key, async_database_url(replica_url)) for key, replica_url in (replica_urls or {}).items())
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pid = None
+        self._loop = None
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, url, pool_size=10, timeout=10, replica_urls=None):
+        """An AsyncReader, or None when the async driver is not installed"""
+        try:
+            reader = cls(url, pool_size, timeout, replica_urls)
+            for async_url in reader.urls.values():
+                reader._create_engine(async_url)
+            return reader
+        except (ImportError, ValueError) as e:
+            logging.warning(f"Async reads disabled (ASYNC_READS needs aiosqlite/asyncpg and greenlet): {e}")
+            return None
+
+    def _create_engine(self, url):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        options = {}
+        if not url.startswith('sqlite'):
+            # Every aiosqlite call is a hop to the connection's thread, so only
+            # server databases pay for the ping on checkout
+            options.update(pool_pre_ping=True, pool_size=self.pool_size, max_overflow=self.pool_size)
+        return create_async_engine(url, **options)
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='async-reads', daemon=True).start()
+            self._engines = {key: self._create_engine(url) for key, url in self.urls.items()}
+            self._loop = loop
+            self._pid = os.getpid()
+
+    def _choose_engine(self):
+        """The engine RoutingSession would read from in this request"""
+        from flask import current_app, has_app_context
+
+        primary = self._engines[None]
+        if len(self._engines) == 1 or not has_app_context():
+            return primary
+        replicas = current_app.extensions.get('read_replicas')
+        sqlalchemy = current_app.extensions['sqlalchemy']
+        if replicas is None or not sqlalchemy.session.info.get('use_replica'):
+            return primary
+        return self._engines.get(replicas.choose_key(sqlalchemy.engines), primary)
+
+    async def _execute(self, engine, statement, scalar):
+        from sqlalchemy.ext.asyncio import AsyncSession
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            result = await session.execute(statement)
+            return result.scalar() if scalar else result.scalars().all()
+
+    def all(self, statement):
+        return statement, False
+
+    def scalar(self, statement):
+        return statement, True
+
+    def gather(self, *calls):
+        self._start()
+        engine = self._choose_engine()
+
+        async def run():
+            return await asyncio.gather(*(self._execute(engine, statement, scalar) for statement, scalar in calls))
+
+        return asyncio.run_coroutine_threadsafe(run(), self._loop).result(self.timeout)
+
+    def paginate(self, statement, page, per_page):
+        page = max(page, 1)
+        items, total = self.gather(
+            self.all(statement.limit(per_page).offset((page - 1) * per_page)),
+            self.scalar(count_statement(statement)),
+        )
+        return ResultPagination(page=page, per_page=per_page, error_out=False, items=items, total=total)
+
+    def dispose(self):
+        """Close pooled connections and stop the loop; the next gather starts them again
+
+        Called by dispose_engines(close=True) after the warm-up request in
+        the gunicorn master and when a worker exits.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            try:
+                for engine in self._engines.values():
+                    asyncio.run_coroutine_threadsafe(engine.dispose(), self._loop).result(self.timeout)
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._engines = {}
+                self._loop = None
+                self._pid = None
@@ -0,0 +1,255 @@
+import time
+import logging
+import itertools
+import threading
+from functools import wraps
+from flask import current_app
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql.dml import UpdateBase
+from flask_sqlalchemy.session import Session
+
+WRITER_BIND = 'writer'
+REPLICA_BIND_PREFIX = 'replica_'
+
+def is_sqlite_file(uri):
+    """Check if a database URI points to an on-disk SQLite database"""
+    return uri.startswith('sqlite') and ':memory:' not in uri and uri.rstrip('/') not in ('sqlite:', 'sqlite+pysqlite:')
+
+def sqlite_writer_bind(uri, config):
+    """Engine options for the dedicated SQLite writer bind
+
+    A pool of exactly one connection serializes writers inside a process;
+    ``busy_timeout`` serializes them across worker processes.
+    """
+    return {
+        'url': uri,
+        'pool_size': 1,
+        'max_overflow': 0,
+        'pool_timeout': config['SQLITE_WRITER_TIMEOUT'],
+    }
+
+def configure_sqlite_engine(engine, config):
+    """Apply the production PRAGMA profile to every new SQLite connection"""
+    pragmas = [
+        ('journal_mode', 'WAL'),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', int(config['SQLITE_BUSY_TIMEOUT_MS'])),
+        ('mmap_size', int(config['SQLITE_MMAP_SIZE'])),
+        # Negative values are KiB rather than pages
+        ('cache_size', -int(config['SQLITE_CACHE_SIZE_KB'])),
+        ('temp_store', 'MEMORY'),
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    logging.info(f"SQLite production profile enabled for {engine.url}")
+
+def write_engine(db):
+    """Engine that writes should use outside the request session"""
+    return db.engines.get(WRITER_BIND, db.engine)
+
+def write_outside_session(db, write):
+    """Run `write(connection)` in its own transaction on the writer
+
+    While the session holds the single SQLite writer connection (it has
+    flushed and not committed yet) the write is queued and runs when that
+    transaction ends, instead of waiting for the connection it would never
+    get. Queued writes that fail are logged.
+    """
+    session = db.session
+    if WRITER_BIND in db.engines and session.info.get('wrote'):
+        session.info.setdefault('pending_writes', []).append(write)
+        return
+    with write_engine(db).begin() as connection:
+        write(connection)
+
+def insert_ignore(db, table, rows):
+    """Insert rows on a separate transaction, skipping unique-key conflicts"""
+    if not rows:
+        return
+    dialect = write_engine(db).dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy import insert
+    statement = insert(table)
+    if hasattr(statement, 'on_conflict_do_nothing'):
+        statement = statement.on_conflict_do_nothing()
+    write_outside_session(db, lambda connection: connection.execute(statement, rows))
+
+def add_missing_columns(db):
+    """Add nullable model columns that are missing from existing tables
+
+    create_all() only creates missing tables; this lets new optional columns
+    ship without a migration tool. Indexes on the new columns are created too.
+    """
+    engine = write_engine(db)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            added = False
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    logging.warning(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+                logging.info(f"Added column {table.name}.{column.name}")
+                added = True
+            if added:
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+
+def replica_binds(urls):
+    """Map read replica URLs to bind keys"""
+    return {f"{REPLICA_BIND_PREFIX}{i}": url for i, url in enumerate(urls)}
+
+class ReplicaPool:
+    """Round-robin selection over read replicas with passive health checks
+
+    A replica is pinged with ``SELECT 1`` at most once per ``check_interval``
+    seconds. Failed pings and disconnect errors take it out of rotation for
+    ``retry_after`` seconds; when no replica is usable reads fall back to the
+    primary.
+    """
+
+    def __init__(self, keys, check_interval=30, retry_after=60):
+        self.keys = list(keys)
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self._cycle = itertools.cycle(self.keys)
+        self._lock = threading.Lock()
+        self._down_until = {}
+        self._checked_at = {}
+
+    def watch(self, engines):
+        """Take a replica out of rotation when its connections start failing"""
+        for key in self.keys:
+            engine = engines[key]
+
+            @event.listens_for(engine, 'handle_error')
+            def on_replica_error(context, key=key):
+                if context.is_disconnect:
+                    self.mark_down(key, context.original_exception)
+
+    def choose(self, engines):
+        """Return the next healthy replica engine or None"""
+        key = self.choose_key(engines)
+        return engines[key] if key is not None else None
+
+    def choose_key(self, engines):
+        """Bind key of the next healthy replica or None"""
+        for _ in range(len(self.keys)):
+            with self._lock:
+                key = next(self._cycle)
+            if self._is_available(key, engines[key]):
+                return key
+        return None
+
+    def mark_down(self, key, error=None):
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.retry_after
+        logging.warning(f"Read replica {key} taken out of rotation: {error}")
+
+    def status(self):
+        now = time.monotonic()
+        return {key: self._down_until.get(key, 0) <= now for key in self.keys}
+
+    def _is_available(self, key, engine):
+        now = time.monotonic()
+        if self._down_until.get(key, 0) > now:
+            return False
+        if now - self._checked_at.get(key, 0) < self.check_interval:
+            return True
+
+        self._checked_at[key] = now
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except SQLAlchemyError as e:
+            self.mark_down(key, e)
+            return False
+        return True
+
+def use_read_replica(view):
+    """Serve a read-only view from a read replica when replicas are configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        session = current_app.extensions['sqlalchemy'].session
+        session.info['use_replica'] = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            session.info.pop('use_replica', None)
+    wrapper.use_read_replica = True
+    return wrapper
+
+def read_from_primary():
+    """Send the remaining reads of the current request to the primary"""
+    current_app.extensions['sqlalchemy'].session.info.pop('use_replica', None)
+
+class RoutingSession(Session):
+    """Session that routes statements between the primary, writer and replicas
+
+    Writes go to the writer bind when one is configured (SQLite profile) and
+    to the primary otherwise. Once the session flushes or executes a DML
+    statement the rest of the transaction stays there so it can read its own
+    changes. Reads inside views marked with ``use_read_replica`` go to a
+    healthy replica, everything else reads from the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+
+        engines = self._db.engines
+        if self._flushing or self.info.get('wrote') or isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+            writer = engines.get(WRITER_BIND)
+            if writer is not None:
+                return writer
+        elif self.info.get('use_replica'):
+            replicas = current_app.extensions.get('read_replicas')
+            engine = replicas.choose(engines) if replicas else None
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def reset_write_routing(session, transaction):
+    """Return to the read engine once the outermost transaction ends"""
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def run_pending_writes(session, transaction):
+    """Run the writes write_outside_session queued; the writer connection is back in the pool"""
+    if transaction.parent is not None:
+        return
+    writes = session.info.pop('pending_writes', None)
+    if not writes:
+        return
+    engine = write_engine(session._db)
+    for write in writes:
+        try:
+            with engine.begin() as connection:
+                write(connection)
+        except SQLAlchemyError as e:
+            logging.error(f"Deferred write failed: {e}")
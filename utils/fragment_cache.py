@@ -0,0 +1,143 @@
+import os
+import time
+import logging
+import threading
+
+from flask import has_request_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+class FragmentCache:
+    """Rendered template fragments kept in process memory with a TTL
+
+    `invalidate()` empties this process's cache and touches `stamp_path`;
+    other processes on the host notice the new mtime (checked at most every
+    `check_interval` seconds) and empty theirs too.
+    """
+
+    def __init__(self, default_ttl=60, stamp_path=None, check_interval=1.0, max_entries=1000):
+        self.default_ttl = default_ttl
+        self.stamp_path = stamp_path
+        self.check_interval = check_interval
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stamp = self._read_stamp()
+        self._stamp_checked = time.monotonic()
+
+    def get(self, key):
+        self._check_stamp()
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (expires, value)
+
+    def invalidate(self, *args, **kwargs):
+        """Drop every fragment here and in the other processes; usable as a signal receiver"""
+        with self._lock:
+            self._entries.clear()
+        if not self.stamp_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.stamp_path), exist_ok=True)
+            with open(self.stamp_path, 'a'):
+                os.utime(self.stamp_path, None)
+            self._stamp = self._read_stamp()
+        except OSError as e:
+            logging.error(f"Failed to touch fragment cache stamp: {e}")
+
+    def _read_stamp(self):
+        if not self.stamp_path:
+            return None
+        try:
+            return os.stat(self.stamp_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _check_stamp(self):
+        if not self.stamp_path or time.monotonic() - self._stamp_checked < self.check_interval:
+            return
+        self._stamp_checked = time.monotonic()
+        stamp = self._read_stamp()
+        if stamp != self._stamp:
+            self._stamp = stamp
+            with self._lock:
+                self._entries.clear()
+
+class Deferred:
+    """A list loaded on first use, for data only shown inside a ``{% cache %}`` block
+
+    While the fragment is cached the block body is not rendered, so the
+    list is never touched and the queries behind it are skipped.
+    """
+
+    def __init__(self, load):
+        self._load = load
+        self._items = None
+
+    @property
+    def items(self):
+        if self._load is not None:
+            self._items = list(self._load())
+            self._load = None
+        return self._items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+def language_key():
+    """Key suffix that keeps Uzbek and Russian renders apart"""
+    from utils.helpers import get_current_language
+    return get_current_language() if has_request_context() else ''
+
+class FragmentCacheExtension(Extension):
+    """``{% cache key[, ttl] %}...{% endcache %}`` backed by environment.fragment_cache
+
+    The key may be any expression (a string or a tuple of values); the
+    current language is appended to it. With no cache configured the block
+    is rendered every time.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None, fragment_cache_key=language_key)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, name, ttl, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        parts = name if isinstance(name, (tuple, list)) else (name,)
+        key = ':'.join(str(part) for part in (*parts, self.environment.fragment_cache_key()))
+        value = cache.get(key)
+        if value is None:
+            value = caller()
+            cache.set(key, value, ttl)
+        return value
@@ -8,6 +8,18 @@ def get_uzbek_timezone():
     """Get Tashkent timezone"""
     return pytz.timezone('Asia/Tashkent')
 
+def tashkent_to_utc(date_obj):
+    """Convert a naive Tashkent time (e.g. from a form) to naive UTC for storage"""
+    if not date_obj:
+        return None
+    return get_uzbek_timezone().localize(date_obj).astimezone(pytz.utc).replace(tzinfo=None)
+
+def utc_to_tashkent(date_obj):
+    """Convert a stored naive UTC time to naive Tashkent time for forms"""
+    if not date_obj:
+        return None
+    return pytz.utc.localize(date_obj).astimezone(get_uzbek_timezone()).replace(tzinfo=None)
+
 def format_uzbek_date(date_obj):
     """Format date for Uzbek locale"""
     if not date_obj:
@@ -264,3 +276,10 @@ class UzbekTextProcessor:
         # Sort by frequency and return top keywords
         sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
         return [word for word, freq in sorted_words[:max_keywords]]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
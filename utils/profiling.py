@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import random
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+PROFILE_MODES = ('stack', 'cprofile')
+
+class StackSampler:
+    """Samples the stacks of registered threads every `interval` seconds
+
+    Stacks are aggregated as folded lines ("root;...;leaf count"), the input
+    format of flamegraph.pl and speedscope. The sampling thread only runs
+    while at least one thread is registered.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._threads = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._runner = None
+
+    def add_thread(self, thread_id):
+        with self._lock:
+            self._threads.add(thread_id)
+            if self._runner is None or not self._runner.is_alive():
+                self._runner = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._runner.start()
+            self._wake.notify()
+
+    def remove_thread(self, thread_id):
+        with self._lock:
+            self._threads.discard(thread_id)
+
+    def folded(self):
+        with self._lock:
+            return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def clear(self):
+        with self._lock:
+            self.stacks.clear()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._threads:
+                    self._wake.wait()
+                threads = set(self._threads)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id in threads:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self.stacks[fold(frame)] += 1
+            time.sleep(self.interval)
+
+def fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class RequestProfiler:
+    """Profile a sample of requests to one endpoint, switched on from the admin area
+
+    The session is described by a control file in `directory`, so every
+    worker process picks it up; workers look at its mtime at most once per
+    `check_interval` seconds, which is all a request pays while profiling
+    is off. Each worker writes its own result file, rewritten after every
+    profiled request: folded stacks for 'stack' mode, pstats for 'cprofile'.
+    cProfile hooks the whole interpreter (and refuses a second active profiler
+    on Python 3.12+), so 'cprofile' mode profiles one request per process at
+    a time and skips the rest.
+    """
+
+    CONTROL = 'profiling.json'
+
+    def __init__(self, directory, sample_interval=0.005, check_interval=1.0):
+        self.directory = directory
+        self.sampler = StackSampler(sample_interval)
+        self.check_interval = check_interval
+        self.session = None
+        self._control_mtime = None
+        self._checked_at = 0.0
+        self._profiled = 0
+        self._stats = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+
+    def start(self, endpoint, rate=0.1, duration=300, mode='stack', max_requests=500):
+        """Begin a session on every worker; returns its description"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode {mode}")
+        session = {
+            'id': datetime.utcnow().strftime('%Y%m%d-%H%M%S'),
+            'endpoint': endpoint,
+            'rate': min(max(float(rate), 0.0), 1.0),
+            'mode': mode,
+            'until': time.time() + duration,
+            'max_requests': max_requests,
+        }
+        self._write_control(session)
+        return session
+
+    def stop(self):
+        self._write_control(None)
+
+    def current(self):
+        """The running session, if any"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._reload()
+        session = self.session
+        if session is None or time.time() > session['until'] or self._profiled >= session['max_requests']:
+            return None
+        return session
+
+    def begin_request(self, endpoint):
+        session = self.current()
+        if session is None or endpoint != session['endpoint'] or random.random() >= session['rate']:
+            return
+        if session['mode'] == 'cprofile':
+            if not self._cprofile_lock.acquire(blocking=False):
+                return
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Another profiler (e.g. a debugger) owns the interpreter hook
+                self._cprofile_lock.release()
+                logging.error(f"Skipping profiled request: {e}")
+                return
+            self._local.active = (session, profile)
+        else:
+            self.sampler.add_thread(threading.get_ident())
+            self._local.active = (session, None)
+
+    def end_request(self):
+        active = getattr(self._local, 'active', None)
+        if active is None:
+            return
+        self._local.active = None
+        session, profile = active
+        if profile is not None:
+            profile.disable()
+            self._cprofile_lock.release()
+        else:
+            self.sampler.remove_thread(threading.get_ident())
+        try:
+            with self._lock:
+                self._profiled += 1
+                self._save(session, profile)
+        except Exception as e:
+            logging.error(f"Failed to save profile: {e}")
+
+    def _save(self, session, profile):
+        name = f"profile-{session['id']}-{session['endpoint']}-{os.getpid()}"
+        if profile is not None:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            path = os.path.join(self.directory, f"{name}.pstats")
+            self._stats.dump_stats(f"{path}.{os.getpid()}.tmp")
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+            return
+        atomic_write(os.path.join(self.directory, f"{name}.folded"), self.sampler.folded())
+
+    def _reload(self):
+        path = os.path.join(self.directory, self.CONTROL)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._control_mtime:
+            return
+        self._control_mtime = mtime
+        session = None
+        if mtime is not None:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    session = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Failed to read profiling control file: {e}")
+        # A new session starts from empty aggregates in every worker
+        with self._lock:
+            if (session or {}).get('id') != (self.session or {}).get('id'):
+                self._profiled = 0
+                self._stats = None
+                self.sampler.clear()
+            self.session = session
+
+    def _write_control(self, session):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write(os.path.join(self.directory, self.CONTROL), json.dumps(session))
+        self._checked_at = 0.0
+
+class MemoryTracer:
+    """tracemalloc snapshots of this worker process, saved with a diff against the previous one"""
+
+    def __init__(self, directory, frames=25, top=50):
+        self.directory = directory
+        self.frames = frames
+        self.top = top
+        self._previous = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        tracemalloc.stop()
+        self._previous = None
+
+    def snapshot(self):
+        """Dump a snapshot and a text report; returns the report's file name"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        name = f"memory-{os.getpid()}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
+        snapshot.dump(os.path.join(self.directory, f"{name}.snapshot"))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"pid {os.getpid()}: traced {current / 1024 / 1024:.1f} MiB, peak {peak / 1024 / 1024:.1f} MiB\n"]
+        if self._previous is not None:
+            lines.append(f"\nGrowth since the previous snapshot (top {self.top}):\n")
+            lines += [f"{stat}\n" for stat in snapshot.compare_to(self._previous, 'traceback')[:self.top]
+                      if stat.size_diff]
+        lines.append(f"\nLargest allocations (top {self.top}):\n")
+        lines += [f"{stat}\n" for stat in snapshot.statistics('lineno')[:self.top]]
+        atomic_write(os.path.join(self.directory, f"{name}.txt"), ''.join(lines))
+        self._previous = snapshot
+        return f"{name}.txt"
+
+def atomic_write(path, text):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+def list_profiles(directory):
+    """[(name, size, modified)] of result files, newest first"""
+    try:
+        names = [name for name in os.listdir(directory)
+                 if name.startswith(('profile-', 'memory-')) and not name.endswith('.tmp')]
+    except FileNotFoundError:
+        return []
+    files = []
+    for name in names:
+        stat = os.stat(os.path.join(directory, name))
+        files.append((name, stat.st_size, datetime.utcfromtimestamp(stat.st_mtime)))
+    return sorted(files, key=lambda item: item[2], reverse=True)
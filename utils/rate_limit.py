@@ -0,0 +1,126 @@
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+def parse_rate_limits(spec):
+    """'main.search=30/60,main.post_detail=120/60' -> {endpoint: (capacity, tokens per second)}"""
+    limits = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        try:
+            endpoint, budget = part.split('=')
+            count, seconds = budget.split('/')
+            limits[endpoint.strip()] = (int(count), int(count) / float(seconds))
+        except ValueError:
+            logging.warning(f"Ignoring malformed rate limit {part!r}")
+    return limits
+
+class TokenBucketStore:
+    """Token buckets in an SQLite file shared by every worker process
+
+    Each take is a single UPSERT ... RETURNING, so the refill and the
+    decrement are atomic across processes without an explicit lock. Errors
+    fail open: a broken store must not take the site down with it.
+    """
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS buckets (
+        key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, allowed INTEGER NOT NULL)"""
+
+    TAKE = """
+        INSERT INTO buckets (key, tokens, updated, allowed) VALUES (:key, :capacity - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = MIN(:capacity, tokens + (:now - updated) * :rate)
+                     - (MIN(:capacity, tokens + (:now - updated) * :rate) >= 1),
+            allowed = MIN(:capacity, tokens + (:now - updated) * :rate) >= 1,
+            updated = :now
+        RETURNING allowed, tokens"""
+
+    def __init__(self, path, prune_every=1000, idle_seconds=3600):
+        self.path = path
+        self.prune_every = prune_every
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(self.SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def take(self, key, capacity, rate):
+        """(allowed, seconds until the next token)"""
+        now = time.time()
+        try:
+            connection = self._connection()
+            allowed, tokens = connection.execute(
+                self.TAKE, {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}).fetchone()
+            self._takes += 1
+            if self._takes % self.prune_every == 0:
+                connection.execute('DELETE FROM buckets WHERE updated < ?', (now - self.idle_seconds,))
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Rate limit store failed: {e}")
+            return True, 0
+        return bool(allowed), 0 if allowed else math.ceil((1 - tokens) / rate)
+
+class LatencyMonitor:
+    """Exponentially weighted average of public page response time in this process
+
+    Fed per request by the app for the rate-limited read-only views, so the
+    writer, background threads and admin pages never count. Overloaded while
+    the average is above `threshold_ms`. Samples older than `window` seconds
+    do not count, so once shed requests stop reaching the database the next
+    ones get through and measure it again.
+    """
+
+    def __init__(self, threshold_ms=1000, alpha=0.1, window=5):
+        self.threshold_ms = threshold_ms
+        self.alpha = alpha
+        self.window = window
+        self.average_ms = 0.0
+        self.sampled_at = 0.0
+
+    def record(self, elapsed_ms):
+        self.average_ms += self.alpha * (elapsed_ms - self.average_ms)
+        self.sampled_at = time.monotonic()
+
+    def overloaded(self):
+        return self.average_ms > self.threshold_ms and time.monotonic() - self.sampled_at < self.window
+
+class StaleCache:
+    """Last good response per URL, served while the database is overloaded
+
+    Only store responses that are the same for every anonymous visitor:
+    nothing flashed into them and no cookie set by them.
+    """
+
+    def __init__(self, max_entries=200):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, mimetype):
+        with self._lock:
+            self._entries[key] = (body, mimetype)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)